@@ -1,16 +1,6 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import oracledb
 from datetime import datetime
 
-# Use st.secrets instead of os.getenv for cloud deployment
-connection = oracledb.connect(
-    user=st.secrets["DB_USER"],
-    password=st.secrets["DB_PASSWORD"],
-    dsn=st.secrets["DB_DSN"]
-)
-
 # Page configuration
 st.set_page_config(
     page_title="Anime Analytics Dashboard",
@@ -18,32 +8,69 @@ st.set_page_config(
     layout="wide"
 )
 
+def get_connect_kwargs():
+    """Read Oracle credentials from st.secrets, falling back to local XE"""
+    try:
+        return {
+            "user": st.secrets["DB_USER"],
+            "password": st.secrets["DB_PASSWORD"],
+            "dsn": st.secrets["DB_DSN"]
+        }
+    except Exception:
+        return {"user": 'system', "password": '241108', "dsn": 'localhost:1521/XE'}
+
 # Database connection
 @st.cache_resource
 def init_connection():
-    """Initialize Oracle database connection"""
-    try:
-        connection = oracledb.connect(
-            user='system',
-            password='241108',
-            dsn='localhost:1521/XE'
-        )
-        return connection
-    except Exception as e:
-        st.error(f"Failed to connect to Oracle: {e}")
-        return None
+    """Create the shared data source; Oracle connects in the background"""
+    # Imported here so the page header renders before pandas/pyarrow load
+    from Dashboard_Data import DashboardDataSource
+    from Query_Cache import QueryCache
+    return DashboardDataSource(connect_kwargs=get_connect_kwargs(),
+                               query_cache=QueryCache()).start()
 
 @st.cache_data(ttl=600)  # Cache for 10 minutes
-def run_query(query):
-    """Run SQL query and return as DataFrame"""
-    conn = init_connection()
-    if conn:
-        try:
-            return pd.read_sql(query, conn)
-        except Exception as e:
-            st.error(f"Query failed: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+def run_query(name, live):
+    """Return a named dashboard query as a DataFrame.
+
+    ``live`` is part of the cache key so snapshot results are not served
+    once the Oracle connection becomes available.
+    """
+    return init_connection().fetch(name)
+
+@st.cache_data(ttl=600)
+def run_chart(name, live, filters, **options):
+    """Return a bounded chart payload from Chart_Data for the given filters"""
+    import Chart_Data
+    chart = getattr(Chart_Data, name)
+    return chart(init_connection(), **options, **filters)
+
+@st.cache_data(ttl=600)
+def similar_titles(anime_id, kind):
+    """Most similar anime by audience or genre overlap, from the ETL indexes"""
+    return init_connection().similar_titles(anime_id, kind)
+
+@st.fragment(run_every=2)
+def rerun_when_connected(source, failing):
+    """Poll the background connection (which retries with backoff) and rerun
+    the app once it is live or starts/stops failing"""
+    if source.is_live or (source.connect_error is not None) != failing:
+        st.rerun(scope="app")
+
+def sidebar_filters(type_df):
+    """Collect the user's filters; values are passed to queries as bind variables"""
+    st.sidebar.header("🔎 Filters")
+    type_options = ["All"] + (list(type_df['TYPE']) if not type_df.empty else [])
+    anime_type = st.sidebar.selectbox("Type", type_options)
+    genre = st.sidebar.text_input("Genre contains", "").strip()
+    min_members, max_members = st.sidebar.slider(
+        "Members (thousands)", 0, 1000, (0, 1000), step=10)
+    return {
+        "anime_type": None if anime_type == "All" else anime_type,
+        "genre": genre or None,
+        "min_members": min_members * 1000 if min_members > 0 else None,
+        "max_members": max_members * 1000 if max_members < 1000 else None,
+    }
 
 def main():
     # Logo before title
@@ -63,26 +90,26 @@ def main():
     
     st.markdown("---")
     
-    # Check database connection
-    conn = init_connection()
-    if not conn:
-        st.error("⚠️ Cannot connect to Oracle database. Please check your connection settings.")
-        return
+    # Serve the last ETL snapshot until the live connection is ready
+    source = init_connection()
+    live = source.is_live
+    if not live:
+        if source.snapshot is None:
+            if source.connect_error is not None:
+                st.error("⚠️ Cannot connect to Oracle database. Please check your connection settings. Retrying...")
+            else:
+                st.info("Connecting to Oracle database...")
+            rerun_when_connected(source, source.connect_error is not None)
+            return
+        elif source.connect_error is not None:
+            st.warning("⚠️ Oracle is unavailable - showing data from the last ETL run.")
+        else:
+            st.info("Showing data from the last ETL run while connecting to Oracle...")
     
     # Get real-time metrics from database
     st.header("📊 Database Metrics")
     
-    # Query for metrics
-    metrics_query = """
-        SELECT 
-            (SELECT COUNT(*) FROM anime) as anime_count,
-            (SELECT COUNT(*) FROM ratings) as ratings_count,
-            (SELECT ROUND(AVG(rating), 2) FROM ratings WHERE rating IS NOT NULL) as avg_rating,
-            (SELECT COUNT(DISTINCT user_id) FROM ratings) as unique_users
-        FROM dual
-    """
-    
-    metrics_df = run_query(metrics_query)
+    metrics_df = run_query("metrics", live)
     
     if not metrics_df.empty:
         col1, col2, col3, col4 = st.columns(4)
@@ -101,22 +128,18 @@ def main():
     
     st.markdown("---")
     
+    # Imported after the first metrics render so cold starts show data sooner
+    import plotly.express as px
+    
+    type_df = run_query("type_distribution", live)
+    filters = sidebar_filters(type_df)
+    
     # Two columns for charts
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📺 Anime Distribution by Type")
         
-        # Real data from database
-        type_query = """
-            SELECT type, COUNT(*) as count, ROUND(AVG(rating), 2) as avg_rating
-            FROM anime
-            WHERE type IS NOT NULL AND type != 'Unknown'
-            GROUP BY type
-            ORDER BY count DESC
-        """
-        type_df = run_query(type_query)
-        
         if not type_df.empty:
             fig1 = px.pie(type_df, values='COUNT', names='TYPE', hole=0.3,
                          title="Anime Count by Type")
@@ -137,19 +160,7 @@ def main():
     # Top Anime Section
     st.header("🏆 Top 10 Highest Rated Anime")
     
-    top_anime_query = """
-        SELECT a.name, a.type, a.genre, ROUND(AVG(r.rating), 2) as avg_rating, 
-               COUNT(r.rating) as rating_count
-        FROM anime a
-        JOIN ratings r ON a.anime_id = r.anime_id
-        WHERE r.rating IS NOT NULL
-        GROUP BY a.anime_id, a.name, a.type, a.genre
-        HAVING COUNT(r.rating) > 10
-        ORDER BY avg_rating DESC
-        FETCH FIRST 10 ROWS ONLY
-    """
-    
-    top_anime_df = run_query(top_anime_query)
+    top_anime_df = run_query("top_anime", live)
     
     if not top_anime_df.empty:
         fig3 = px.bar(top_anime_df, y='NAME', x='AVG_RATING', 
@@ -171,16 +182,7 @@ def main():
     
     with col1:
         st.subheader("Most Common Genres")
-        
-        genre_query = """
-            SELECT genre, COUNT(*) as anime_count
-            FROM anime
-            WHERE genre IS NOT NULL AND genre != 'Unknown'
-            GROUP BY genre
-            ORDER BY anime_count DESC
-            FETCH FIRST 15 ROWS ONLY
-        """
-        genre_df = run_query(genre_query)
+        genre_df = run_chart("genre_top_n", live, filters, n=15)
         
         if not genre_df.empty:
             fig4 = px.bar(genre_df, x='GENRE', y='ANIME_COUNT',
@@ -192,22 +194,43 @@ def main():
     
     with col2:
         st.subheader("Rating Distribution")
-        
-        rating_dist_query = """
-            SELECT rating, COUNT(*) as count
-            FROM ratings
-            WHERE rating IS NOT NULL
-            GROUP BY rating
-            ORDER BY rating
-        """
-        rating_dist_df = run_query(rating_dist_query)
+        rating_dist_df = run_chart("rating_histogram", live, filters, bins=10)
         
         if not rating_dist_df.empty:
-            fig5 = px.line(rating_dist_df, x='RATING', y='COUNT',
+            fig5 = px.line(rating_dist_df, x='BIN_MIN', y='COUNT',
                           title="Distribution of User Ratings",
-                          labels={'RATING': 'Rating', 'COUNT': 'Number of Ratings'})
+                          labels={'BIN_MIN': 'Rating', 'COUNT': 'Number of Ratings'})
             st.plotly_chart(fig5, use_container_width=True)
     
+    st.subheader("Members vs Rating")
+    members_df = run_chart("members_rating_series", live, filters, max_points=500)
+    
+    if not members_df.empty:
+        fig6 = px.scatter(members_df, x='MEMBERS', y='RATING', hover_name='NAME',
+                          title="Community Size vs Average Rating", log_x=True,
+                          labels={'MEMBERS': 'Members', 'RATING': 'Rating'})
+        st.plotly_chart(fig6, use_container_width=True)
+    
+    st.markdown("---")
+    
+    # Similar titles from the ETL's MinHash/LSH indexes
+    st.header("🔗 Similar Titles")
+    
+    titles_df = run_query("anime_titles", live)
+    
+    if not titles_df.empty:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            anime_id = st.selectbox("Anime", titles_df['ANIME_ID'],
+                                    format_func=dict(zip(titles_df['ANIME_ID'], titles_df['NAME'])).get)
+        with col2:
+            kind = st.radio("Similar by", ["audience", "genre"], horizontal=True)
+        similar_df = similar_titles(int(anime_id), kind)
+        if not similar_df.empty:
+            st.dataframe(similar_df, use_container_width=True)
+        else:
+            st.info("No similar titles found (run the ETL pipeline to build the similarity indexes)")
+    
     st.markdown("---")
     
     # Recent Activity / Sample Data
@@ -216,12 +239,12 @@ def main():
     tab1, tab2 = st.tabs(["Anime Sample", "Ratings Sample"])
     
     with tab1:
-        anime_sample = run_query("SELECT * FROM anime WHERE ROWNUM <= 10")
+        anime_sample = run_chart("raw_sample", live, filters, table="anime", limit=10)
         if not anime_sample.empty:
             st.dataframe(anime_sample, use_container_width=True)
     
     with tab2:
-        ratings_sample = run_query("SELECT * FROM ratings WHERE ROWNUM <= 10")
+        ratings_sample = run_chart("raw_sample", live, filters, table="ratings", limit=10)
         if not ratings_sample.empty:
             st.dataframe(ratings_sample, use_container_width=True)
     
@@ -248,8 +271,8 @@ def main():
     st.header("💡 Key Insights from Live Data")
     
     # Get some real insights
-    insight1 = run_query("SELECT name FROM anime WHERE rating = (SELECT MAX(rating) FROM anime) AND ROWNUM = 1")
-    insight2 = run_query("SELECT type, COUNT(*) as cnt FROM anime GROUP BY type ORDER BY cnt DESC FETCH FIRST 1 ROWS ONLY")
+    insight1 = run_query("top_anime_name", live)
+    insight2 = run_query("top_type", live)
     
     # Default values in case queries fail
     top_anime_name = insight1['NAME'].iloc[0] if not insight1.empty else "Kimi no Na wa."
@@ -302,7 +325,12 @@ def main():
     st.markdown("---")
     st.success("🎉 **PROJECT COMPLETED SUCCESSFULLY!** All data engineering requirements met and demonstrated with live Oracle data.")
     st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    st.caption("Data Source: Oracle Database - Live Queries")
+    st.caption("Data Source: Oracle Database - Live Queries" if live
+               else "Data Source: Last ETL snapshot (local_storage)")
+    
+    # Upgrade to live data on a rerun once the background connection is ready
+    if not live:
+        rerun_when_connected(source, source.connect_error is not None)
 
 if __name__ == "__main__":
     main()
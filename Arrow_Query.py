@@ -0,0 +1,108 @@
+# Arrow_Query.py - Columnar (Arrow) query execution for Oracle and the local stand-in
+import pyarrow as pa
+import pandas as pd
+
+# Rows per round trip; prefetchrows = arraysize + 1 lets small results finish in one trip
+DEFAULT_ARRAYSIZE = 10000
+
+def _tune_cursor(cursor, arraysize):
+    cursor.arraysize = arraysize
+    cursor.prefetchrows = arraysize + 1
+
+def _common_type(types):
+    """Arrow type that every per-batch inferred type can be cast to"""
+    types = {t for t in types if not pa.types.is_null(t)}
+    if not types:
+        return pa.null()
+    if len(types) == 1:
+        return types.pop()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        # Oracle NUMBER comes back as int or float depending on the value
+        return pa.float64()
+    return pa.string()
+
+def _rows_to_batch(rows, names):
+    """Transpose one fetchmany() block into an Arrow record batch"""
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays([pa.array(column) for column in columns], names=names)
+
+def _cursor_batches(cursor, batch_rows):
+    names = [col[0] for col in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        yield _rows_to_batch(rows, names)
+
+def _empty_table(cursor):
+    names = [col[0] for col in cursor.description] if cursor.description else []
+    return pa.table({name: pa.array([], type=pa.null()) for name in names})
+
+def _unify_batches(batches):
+    """Concatenate batches whose inferred column types may differ"""
+    names = batches[0].schema.names
+    schema = pa.schema([
+        (name, _common_type([batch.column(i).type for batch in batches]))
+        for i, name in enumerate(names)
+    ])
+    return pa.Table.from_batches([batch.cast(schema) for batch in batches], schema=schema)
+
+def _oracle_df_to_arrow(odf):
+    """Convert an oracledb 3.x OracleDataFrame to an Arrow table without copying"""
+    if hasattr(odf, "column_arrays"):
+        return pa.Table.from_arrays(odf.column_arrays(), names=odf.column_names())
+    return pa.table(odf)
+
+def fetch_arrow(connection, sql, params=None, arraysize=DEFAULT_ARRAYSIZE):
+    """Run a query and return the whole result as a pyarrow.Table.
+
+    Oracle connections use oracledb's native ``fetch_df_all`` (oracledb 3.x,
+    as pinned in requirements.txt). Connections without it, such as the
+    SQLite stand-in, fetch in ``arraysize`` blocks on a tuned cursor and
+    build Arrow columns from each block.
+    """
+    if hasattr(connection, "fetch_df_all"):
+        odf = connection.fetch_df_all(statement=sql, parameters=params or [], arraysize=arraysize)
+        return _oracle_df_to_arrow(odf)
+
+    cursor = connection.cursor()
+    try:
+        _tune_cursor(cursor, arraysize)
+        cursor.execute(sql, params or {})
+        batches = list(_cursor_batches(cursor, arraysize))
+        if not batches:
+            return _empty_table(cursor)
+        return _unify_batches(batches)
+    finally:
+        cursor.close()
+
+def arrow_to_pandas(table, arrow_dtypes=False):
+    """Hand an Arrow table to pandas with as few copies as possible.
+
+    ``arrow_dtypes=True`` keeps the Arrow buffers (pd.ArrowDtype, zero-copy);
+    otherwise numeric columns without nulls are converted without copying
+    and each column gets its own block (no consolidation copy).
+    """
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def fetch_dataframe(connection, sql, params=None, arraysize=DEFAULT_ARRAYSIZE, arrow_dtypes=False):
+    """Drop-in replacement for pd.read_sql(sql, connection) using the Arrow path"""
+    return arrow_to_pandas(fetch_arrow(connection, sql, params, arraysize), arrow_dtypes)
+
+def iter_dataframes(connection, sql, params=None, batch_rows=100000, arrow_dtypes=False):
+    """Stream a large result as DataFrames of at most ``batch_rows`` rows"""
+    if hasattr(connection, "fetch_df_batches"):
+        for odf in connection.fetch_df_batches(statement=sql, parameters=params or [], size=batch_rows):
+            yield arrow_to_pandas(_oracle_df_to_arrow(odf), arrow_dtypes)
+        return
+
+    cursor = connection.cursor()
+    try:
+        _tune_cursor(cursor, min(batch_rows, DEFAULT_ARRAYSIZE))
+        cursor.execute(sql, params or {})
+        for batch in _cursor_batches(cursor, batch_rows):
+            yield arrow_to_pandas(pa.Table.from_batches([batch]), arrow_dtypes)
+    finally:
+        cursor.close()
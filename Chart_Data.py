@@ -0,0 +1,196 @@
+# Chart_Data.py - Bounded-size chart payloads for the dashboard
+import numpy as np
+import pandas as pd
+
+# Upper bounds applied to every payload, whatever the caller asks for
+MAX_BINS = 100
+MAX_TOP_N = 50
+MAX_POINTS = 2000
+MAX_SAMPLE_ROWS = 200
+
+def _clamp(value, upper):
+    return max(1, min(int(value), upper))
+
+def build_anime_filters(alias="a", anime_type=None, genre=None, min_members=None, max_members=None):
+    """Build a WHERE fragment and bind dict for the dashboard's user filters"""
+    clauses = []
+    binds = {}
+    if anime_type:
+        clauses.append(f"{alias}.type = :anime_type")
+        binds["anime_type"] = anime_type
+    if genre:
+        clauses.append(f"{alias}.genre LIKE '%' || :genre || '%'")
+        binds["genre"] = genre
+    if min_members is not None:
+        clauses.append(f"{alias}.members >= :min_members")
+        binds["min_members"] = min_members
+    if max_members is not None:
+        clauses.append(f"{alias}.members <= :max_members")
+        binds["max_members"] = max_members
+    return " AND ".join(clauses) or "1 = 1", binds
+
+def filter_anime_frame(anime_df, anime_type=None, genre=None, min_members=None, max_members=None):
+    """Apply the same filters as build_anime_filters to a snapshot frame"""
+    mask = pd.Series(True, index=anime_df.index)
+    if anime_type:
+        mask &= anime_df['type'] == anime_type
+    if genre:
+        mask &= anime_df['genre'].fillna('').str.contains(genre, regex=False)
+    if min_members is not None:
+        mask &= anime_df['members'] >= min_members
+    if max_members is not None:
+        mask &= anime_df['members'] <= max_members
+    return anime_df[mask]
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns selected indices"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])[:threshold]
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    prev = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket is the third triangle vertex
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev])
+                      - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+def rating_histogram(source, bins=10, **filters):
+    """Histogram of user ratings (-1, "not rated", excluded) with at most ``bins`` rows"""
+    bins = _clamp(bins, MAX_BINS)
+    if source.is_live:
+        where, binds = build_anime_filters("a", **filters)
+        binds["bins"] = bins
+        query = f"""
+            SELECT rating_bin, MIN(rating) as bin_min, MAX(rating) as bin_max, COUNT(*) as count
+            FROM (
+                SELECT WIDTH_BUCKET(r.rating, 1, 11, :bins) as rating_bin, r.rating
+                FROM ratings r
+                JOIN anime a ON a.anime_id = r.anime_id
+                WHERE r.rating IS NOT NULL AND r.rating != -1 AND {where}
+            )
+            GROUP BY rating_bin
+            ORDER BY rating_bin
+        """
+        return source.run_sql(query, binds)
+
+    snapshot = source.snapshot
+    if not snapshot:
+        return pd.DataFrame()
+    # The ETL's per-anime rating counts (Dashboard_Data.RatingBins), not the ratings themselves
+    anime = filter_anime_frame(snapshot["anime"], **filters)
+    counts = snapshot["rating_bins"]
+    counts = counts[counts['ANIME_ID'].isin(anime['anime_id'])]
+    values = counts['RATING'].to_numpy(dtype=np.float64)
+    # WIDTH_BUCKET(rating, 1, 11, bins): 0 below the range, bins + 1 at or above its top
+    bin_ids = np.where(values < 1, 0,
+                       np.where(values >= 11, bins + 1, ((values - 1) * bins / 10).astype(np.int64) + 1))
+    grouped = counts.groupby(bin_ids).agg(BIN_MIN=('RATING', 'min'), BIN_MAX=('RATING', 'max'),
+                                          COUNT=('COUNT', 'sum'))
+    return grouped.rename_axis('RATING_BIN').reset_index()
+
+def genre_top_n(source, n=15, **filters):
+    """Most common genres, truncated to ``n`` rows in the query"""
+    n = _clamp(n, MAX_TOP_N)
+    if source.is_live:
+        where, binds = build_anime_filters("a", **filters)
+        binds["top_n"] = n
+        query = f"""
+            SELECT a.genre, COUNT(*) as anime_count
+            FROM anime a
+            WHERE a.genre IS NOT NULL AND a.genre != 'Unknown' AND {where}
+            GROUP BY a.genre
+            ORDER BY anime_count DESC
+            FETCH FIRST :top_n ROWS ONLY
+        """
+        return source.run_sql(query, binds)
+
+    snapshot = source.snapshot
+    if not snapshot:
+        return pd.DataFrame()
+    anime = filter_anime_frame(snapshot["anime"], **filters)
+    anime = anime[anime['genre'].notna() & (anime['genre'] != 'Unknown')]
+    return (anime['genre'].value_counts().head(n)
+            .rename_axis('GENRE').reset_index(name='ANIME_COUNT'))
+
+def members_rating_series(source, max_points=500, **filters):
+    """Members vs rating series downsampled to at most ``max_points`` points.
+
+    The database reduces the series to the min and max rating per members
+    bucket (NTILE), then LTTB picks the final points from that bounded set.
+    """
+    max_points = _clamp(max_points, MAX_POINTS)
+    if source.is_live:
+        where, binds = build_anime_filters("a", **filters)
+        binds["buckets"] = max_points
+        query = f"""
+            SELECT members, rating, name FROM (
+                SELECT b.members, b.rating, b.name,
+                       ROW_NUMBER() OVER (PARTITION BY b.bucket ORDER BY b.rating) as rn_lo,
+                       ROW_NUMBER() OVER (PARTITION BY b.bucket ORDER BY b.rating DESC) as rn_hi
+                FROM (
+                    SELECT a.members, a.rating, a.name,
+                           NTILE(:buckets) OVER (ORDER BY a.members) as bucket
+                    FROM anime a
+                    WHERE a.members IS NOT NULL AND a.rating IS NOT NULL AND {where}
+                ) b
+            )
+            WHERE rn_lo = 1 OR rn_hi = 1
+            ORDER BY members
+        """
+        series = source.run_sql(query, binds)
+    else:
+        snapshot = source.snapshot
+        if not snapshot:
+            return pd.DataFrame()
+        anime = filter_anime_frame(snapshot["anime"], **filters)
+        anime = anime[anime['members'].notna() & anime['rating'].notna()]
+        series = (anime.sort_values('members')[['members', 'rating', 'name']]
+                  .rename(columns=str.upper))
+
+    if series.empty:
+        return series
+    keep = lttb(series['MEMBERS'], series['RATING'], max_points)
+    return series.iloc[keep].reset_index(drop=True)
+
+def raw_sample(source, table="anime", limit=10, **filters):
+    """Bounded raw-row preview of ``anime`` or ``ratings``"""
+    if table not in ("anime", "ratings"):
+        raise ValueError(f"Unknown table: {table}")
+    limit = _clamp(limit, MAX_SAMPLE_ROWS)
+    if source.is_live:
+        where, binds = build_anime_filters("a", **filters)
+        binds["row_limit"] = limit
+        if table == "anime":
+            query = f"SELECT a.* FROM anime a WHERE {where} FETCH FIRST :row_limit ROWS ONLY"
+        else:
+            query = f"""
+                SELECT r.* FROM ratings r JOIN anime a ON a.anime_id = r.anime_id
+                WHERE {where} FETCH FIRST :row_limit ROWS ONLY
+            """
+        return source.run_sql(query, binds)
+
+    snapshot = source.snapshot
+    if not snapshot:
+        return pd.DataFrame()
+    anime = filter_anime_frame(snapshot["anime"], **filters)
+    if table == "anime":
+        return anime.head(limit).rename(columns=str.upper)
+    # Only the leading rows of the ratings backup are in the snapshot
+    ratings = snapshot["ratings_head"]
+    return ratings[ratings['anime_id'].isin(anime['anime_id'])].head(limit).rename(columns=str.upper)
@@ -0,0 +1,158 @@
+# Checkpoint.py - Fingerprinted Arrow IPC checkpoints for resumable ETL stages
+import os
+import json
+import time
+import shutil
+import inspect
+import hashlib
+import logging
+from datetime import datetime
+import pyarrow as pa
+
+MANIFEST = "manifest.json"
+# A run directory without a manifest may belong to a run still writing its
+# first stage; gc only treats it as abandoned once untouched for this long
+INCOMPLETE_GRACE_SECONDS = 6 * 60 * 60
+
+def fingerprint(*parts):
+    """Stable hash of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def input_fingerprint(paths):
+    """Fingerprint input files by path, size and modification time"""
+    entries = []
+    for path in sorted(paths):
+        info = os.stat(path)
+        entries.append([os.path.abspath(path), info.st_size, info.st_mtime_ns])
+    return fingerprint(entries)
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        # No source available (e.g. interactive or frozen): fall back to bytecode
+        code = getattr(obj, "__code__", None)
+        return code.co_code.hex() if code else getattr(obj, "__name__", repr(obj))
+
+def code_fingerprint(*objects):
+    """Fingerprint the source of the functions or modules a stage runs"""
+    return fingerprint([_source(obj) for obj in objects])
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+class CheckpointStore:
+    """Per-run stage outputs under ``base_path/<run_id>/``.
+
+    Each stage saves its DataFrames as uncompressed Arrow IPC files next to
+    a manifest recording the stage fingerprint, so a later run with the same
+    inputs and code can load them memory-mapped instead of recomputing.
+    """
+
+    def __init__(self, base_path="local_storage/checkpoints", run_id=None, keep_runs=3,
+                 incomplete_grace=INCOMPLETE_GRACE_SECONDS):
+        self.base_path = base_path
+        self.run_id = run_id or new_run_id()
+        self.keep_runs = keep_runs
+        self.incomplete_grace = incomplete_grace
+        self.run_path = os.path.join(base_path, self.run_id)
+
+    def _read_manifest(self, run_path):
+        try:
+            with open(os.path.join(run_path, MANIFEST), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"stages": {}}
+
+    def _write_manifest(self, manifest):
+        path = os.path.join(self.run_path, MANIFEST)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def _runs(self):
+        """Run directories, newest first"""
+        if not os.path.isdir(self.base_path):
+            return []
+        runs = [os.path.join(self.base_path, name) for name in os.listdir(self.base_path)]
+        return sorted((r for r in runs if os.path.isdir(r)), reverse=True)
+
+    def find(self, stage, stage_fingerprint):
+        """Newest completed checkpoint of stage with a matching fingerprint, or None"""
+        for run_path in self._runs():
+            entry = self._read_manifest(run_path)["stages"].get(stage)
+            if not entry or entry["fingerprint"] != stage_fingerprint:
+                continue
+            files = entry.get("files", {})
+            if all(os.path.exists(os.path.join(run_path, name)) for name in files.values()):
+                return dict(entry, run_path=run_path)
+        return None
+
+    def save(self, stage, stage_fingerprint, frames=None, meta=None):
+        """Persist a stage's DataFrames and record it as completed"""
+        os.makedirs(self.run_path, exist_ok=True)
+        files = {}
+        for name, df in (frames or {}).items():
+            filename = f"{stage}.{name}.arrow"
+            path = os.path.join(self.run_path, filename)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(f"{path}.tmp", "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(f"{path}.tmp", path)
+            files[name] = filename
+
+        manifest = self._read_manifest(self.run_path)
+        manifest["run_id"] = self.run_id
+        manifest["stages"][stage] = {
+            "fingerprint": stage_fingerprint,
+            "files": files,
+            "rows": {name: len(df) for name, df in (frames or {}).items()},
+            "meta": meta or {},
+            "completed": datetime.now().isoformat(),
+        }
+        self._write_manifest(manifest)
+        logging.info(f"Checkpointed stage '{stage}' ({stage_fingerprint}) in run {self.run_id}")
+        return manifest["stages"][stage]
+
+    def load(self, entry):
+        """Load a checkpoint's DataFrames, memory-mapping the Arrow files"""
+        frames = {}
+        for name, filename in entry["files"].items():
+            source = pa.memory_map(os.path.join(entry["run_path"], filename), "r")
+            frames[name] = pa.ipc.open_file(source).read_all().to_pandas()
+        return frames
+
+    def _last_modified(self, run_path):
+        """Newest modification time of a run directory or any file in it"""
+        times = [os.path.getmtime(run_path)]
+        for name in os.listdir(run_path):
+            try:
+                times.append(os.path.getmtime(os.path.join(run_path, name)))
+            except FileNotFoundError:
+                pass  # renamed or removed while we looked
+        return max(times)
+
+    def gc(self):
+        """Delete all but the newest ``keep_runs`` runs (never the current one).
+
+        Runs without a manifest are deleted only once nothing in them has
+        changed for ``incomplete_grace`` seconds, so a concurrent run that is
+        still writing its first stage keeps its directory.
+        """
+        removed = []
+        runs = self._runs()
+        complete = [r for r in runs if os.path.exists(os.path.join(r, MANIFEST))]
+        cutoff = time.time() - self.incomplete_grace
+        abandoned = {r for r in set(runs) - set(complete) if self._last_modified(r) < cutoff}
+        stale = set(complete[self.keep_runs:]) | abandoned
+        for run_path in sorted(stale):
+            if os.path.abspath(run_path) == os.path.abspath(self.run_path):
+                continue
+            shutil.rmtree(run_path, ignore_errors=True)
+            removed.append(os.path.basename(run_path))
+        if removed:
+            logging.info(f"Removed {len(removed)} old checkpoint runs")
+        return removed
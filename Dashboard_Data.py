@@ -0,0 +1,414 @@
+# Dashboard_Data.py - Lazily connected data source for the Streamlit dashboard
+import os
+import glob
+import json
+import time
+import threading
+import logging
+import pandas as pd
+
+from Arrow_Query import fetch_dataframe
+
+# Named dashboard queries. Column aliases match what Oracle returns (upper case)
+# so the snapshot frames below can be used interchangeably with live results.
+QUERIES = {
+    "metrics": """
+        SELECT
+            (SELECT COUNT(*) FROM anime) as anime_count,
+            (SELECT COUNT(*) FROM ratings) as ratings_count,
+            (SELECT ROUND(AVG(rating), 2) FROM ratings WHERE rating IS NOT NULL) as avg_rating,
+            (SELECT COUNT(DISTINCT user_id) FROM ratings) as unique_users
+        FROM dual
+    """,
+    "type_distribution": """
+        SELECT type, COUNT(*) as count, ROUND(AVG(rating), 2) as avg_rating
+        FROM anime
+        WHERE type IS NOT NULL AND type != 'Unknown'
+        GROUP BY type
+        ORDER BY count DESC
+    """,
+    # Ranking columns stored on anime by the loaders: sorted, never re-aggregated
+    "top_anime": """
+        SELECT a.name, a.type, a.genre, ROUND(a.ratings_mean, 2) as avg_rating,
+               a.ratings_count as rating_count, ROUND(a.weighted_rating, 2) as weighted_rating
+        FROM anime a
+        WHERE a.ratings_count > 0
+        ORDER BY a.weighted_rating DESC, a.anime_id
+        FETCH FIRST 10 ROWS ONLY
+    """,
+    "genre_counts": """
+        SELECT genre, COUNT(*) as anime_count
+        FROM anime
+        WHERE genre IS NOT NULL AND genre != 'Unknown'
+        GROUP BY genre
+        ORDER BY anime_count DESC
+        FETCH FIRST 15 ROWS ONLY
+    """,
+    "rating_distribution": """
+        SELECT rating, COUNT(*) as count
+        FROM ratings
+        WHERE rating IS NOT NULL
+        GROUP BY rating
+        ORDER BY rating
+    """,
+    "anime_sample": "SELECT * FROM anime WHERE ROWNUM <= 10",
+    "ratings_sample": "SELECT * FROM ratings WHERE ROWNUM <= 10",
+    "top_anime_name": "SELECT name FROM anime WHERE rating = (SELECT MAX(rating) FROM anime) AND ROWNUM = 1",
+    "top_type": "SELECT type, COUNT(*) as cnt FROM anime GROUP BY type ORDER BY cnt DESC FETCH FIRST 1 ROWS ONLY",
+    "anime_titles": "SELECT anime_id, name, type, genre FROM anime ORDER BY name",
+}
+
+def _latest_file(directory, pattern):
+    """Return the most recently written file matching pattern, or None"""
+    matches = glob.glob(os.path.join(directory, pattern))
+    if not matches:
+        return None
+    return max(matches, key=os.path.getmtime)
+
+# Leading rows of the ratings backup kept for raw previews; the snapshot never reads it in full
+SNAPSHOT_RATINGS_ROWS = 10000
+
+def _frame_payload(df):
+    """A small DataFrame as JSON-ready {"columns": [...], "data": [[...]]}"""
+    return json.loads(df.to_json(orient="split", index=False, date_format="iso"))
+
+def _payload_frame(payload):
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+class RatingBins:
+    """Per-anime count of each rating value, accumulated one ratings chunk at a time.
+
+    Size is bounded by anime x distinct rating values, never by rows; the
+    ETL writes it so snapshot charts need not read the ratings backup.
+    """
+
+    def __init__(self):
+        self._counts = None
+
+    def add(self, ratings_df):
+        rated = ratings_df[ratings_df['rating'].notna() & (ratings_df['rating'] != -1)]
+        counts = rated.groupby(['anime_id', 'rating']).size()
+        self._counts = counts if self._counts is None else self._counts.add(counts, fill_value=0)
+        return self
+
+    def frame(self):
+        """ANIME_ID, RATING, COUNT sorted by anime_id and rating"""
+        if self._counts is None:
+            return pd.DataFrame({"ANIME_ID": pd.Series(dtype="int64"), "RATING": pd.Series(dtype="int64"),
+                                 "COUNT": pd.Series(dtype="int64")})
+        return (self._counts.astype("int64").sort_index()
+                .rename_axis(['ANIME_ID', 'RATING']).reset_index(name='COUNT'))
+
+def summary_frames(anime_df, bins, ratings_count, unique_users):
+    """The named dashboard frames the ETL precomputes from anime and RatingBins.frame()"""
+    known_type = anime_df[anime_df['type'].notna() & (anime_df['type'] != 'Unknown')]
+    known_genre = anime_df[anime_df['genre'].notna() & (anime_df['genre'] != 'Unknown')]
+    rated = int(bins['COUNT'].sum())
+
+    frames = {}
+    frames["metrics"] = pd.DataFrame([{
+        "ANIME_COUNT": len(anime_df),
+        "RATINGS_COUNT": int(ratings_count),
+        "AVG_RATING": round(float((bins['RATING'] * bins['COUNT']).sum() / rated), 2) if rated else 0.0,
+        "UNIQUE_USERS": int(unique_users),
+    }])
+
+    type_df = (known_type.groupby('type')
+               .agg(COUNT=('anime_id', 'size'), AVG_RATING=('rating', 'mean'))
+               .reset_index()
+               .rename(columns={'type': 'TYPE'})
+               .sort_values('COUNT', ascending=False))
+    type_df['AVG_RATING'] = type_df['AVG_RATING'].round(2)
+    frames["type_distribution"] = type_df.reset_index(drop=True)
+
+    # Same ranking as the live query: the Ranking columns the ETL stores on anime
+    top = (anime_df[anime_df['ratings_count'] > 0]
+           .sort_values(['weighted_rating', 'anime_id'], ascending=[False, True]).head(10))
+    top = top.rename(columns={'ratings_mean': 'AVG_RATING', 'ratings_count': 'RATING_COUNT',
+                              'weighted_rating': 'WEIGHTED_RATING'})
+    top['AVG_RATING'] = top['AVG_RATING'].round(2)
+    top['WEIGHTED_RATING'] = top['WEIGHTED_RATING'].round(2)
+    frames["top_anime"] = (top.rename(columns={'name': 'NAME', 'type': 'TYPE', 'genre': 'GENRE'})
+                           [['NAME', 'TYPE', 'GENRE', 'AVG_RATING', 'RATING_COUNT', 'WEIGHTED_RATING']]
+                           .reset_index(drop=True))
+
+    frames["genre_counts"] = (known_genre['genre'].value_counts().head(15)
+                              .rename_axis('GENRE').reset_index(name='ANIME_COUNT'))
+
+    frames["rating_distribution"] = (bins.groupby('RATING')['COUNT'].sum()
+                                     .reset_index())
+
+    if anime_df['rating'].notna().any():
+        best = anime_df.loc[anime_df['rating'].idxmax(), 'name']
+        frames["top_anime_name"] = pd.DataFrame({"NAME": [best]})
+    else:
+        frames["top_anime_name"] = pd.DataFrame(columns=["NAME"])
+    type_counts = anime_df['type'].value_counts()
+    frames["top_type"] = (type_counts.head(1).rename_axis('TYPE').reset_index(name='CNT'))
+    return {name: _frame_payload(df) for name, df in frames.items()}
+
+def write_dashboard_summary(writer, storage, anime_df, bins, ratings_count, unique_users):
+    """Submit the dashboard_summary and rating_bins artifacts of an ETL run to an OutputWriter"""
+    bins_frame = bins.frame()
+    writer.submit("rating_bins", storage.save_dataframe, bins_frame, "rating_bins.parquet", "summaries")
+    return writer.submit("dashboard_summary", storage.save_json,
+                         summary_frames(anime_df, bins_frame, ratings_count, unique_users),
+                         "dashboard_summary.json", "summaries")
+
+SNAPSHOT_ARTIFACTS = ("anime", "ratings", "dashboard_summary", "rating_bins")
+
+def _published_artifacts(storage_path):
+    """Paths of SNAPSHOT_ARTIFACTS from the newest complete run manifest"""
+    manifest_file = _latest_file(os.path.join(storage_path, "manifests"), "run_*.json")
+    if not manifest_file:
+        return None
+    with open(manifest_file, 'r') as f:
+        artifacts = json.load(f).get("artifacts", {})
+    paths = [artifacts.get(name, {}).get("path") for name in SNAPSHOT_ARTIFACTS]
+    if not all(path and os.path.exists(path) for path in paths):
+        return None
+    return paths
+
+def similarity_index_path(storage_path, kind):
+    """Newest published Similarity index of ``kind``, else the newest one on disk"""
+    manifest_file = _latest_file(os.path.join(storage_path, "manifests"), "run_*.json")
+    if manifest_file:
+        with open(manifest_file, 'r') as f:
+            path = json.load(f).get("artifacts", {}).get(f"similar_{kind}", {}).get("path")
+        if path and os.path.exists(path):
+            return path
+    return _latest_file(os.path.join(storage_path, "features"), f"similar_{kind}_*.npz")
+
+def _read_head(parquet_file, rows):
+    """First ``rows`` rows of a parquet file, reading only the row groups needed"""
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(parquet_file)
+    batch = next(parquet.iter_batches(batch_size=rows), None)
+    return (batch if batch is not None else parquet.schema_arrow.empty_table()).to_pandas()
+
+def load_snapshot(storage_path="local_storage"):
+    """Load the last ETL run's precomputed dashboard frames as a snapshot.
+
+    Charts use the run's rating_bins; the ratings backup is only read for
+    its first SNAPSHOT_RATINGS_ROWS rows (raw previews).
+    """
+    artifacts = _published_artifacts(storage_path)
+    if artifacts:
+        anime_file, ratings_file, summary_file, bins_file = artifacts
+    else:
+        backups = os.path.join(storage_path, "backups")
+        summaries = os.path.join(storage_path, "summaries")
+        anime_file = _latest_file(backups, "anime_transformed_*.parquet")
+        ratings_file = _latest_file(backups, "ratings_transformed_*.parquet")
+        summary_file = _latest_file(summaries, "dashboard_summary_*.json")
+        bins_file = _latest_file(summaries, "rating_bins_*.parquet")
+    if not all((anime_file, ratings_file, summary_file, bins_file)):
+        return None
+
+    with open(summary_file, 'r') as f:
+        frames = {name: _payload_frame(payload) for name, payload in json.load(f).items()}
+    anime_df = pd.read_parquet(anime_file)
+    ratings_head = _read_head(ratings_file, SNAPSHOT_RATINGS_ROWS)
+    frames["anime_sample"] = anime_df.head(10).rename(columns=str.upper)
+    frames["ratings_sample"] = ratings_head.head(10).rename(columns=str.upper)
+    frames["anime_titles"] = (anime_df[['anime_id', 'name', 'type', 'genre']].sort_values('name')
+                              .rename(columns=str.upper).reset_index(drop=True))
+    return {
+        "frames": frames,
+        "anime": anime_df,
+        "ratings_head": ratings_head,
+        "rating_bins": pd.read_parquet(bins_file),
+        "source_files": [anime_file, ratings_file, summary_file, bins_file],
+        "created": os.path.getmtime(summary_file),
+    }
+
+class DashboardDataSource:
+    """Dashboard data source that serves a snapshot until Oracle is ready"""
+
+    def __init__(self, connect_kwargs=None, storage_path="local_storage", connect_factory=None,
+                 query_cache=None, retry_delay=1.0, max_retry_delay=60.0):
+        self.connect_kwargs = connect_kwargs or {}
+        self.query_cache = query_cache
+        self.storage_path = storage_path
+        self.connect_factory = connect_factory
+        # Failed connects are retried with exponential backoff; connect_error
+        # holds the latest failure until an attempt succeeds
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.connect_error = None
+        self.connect_attempts = 0
+        self._attempted = threading.Event()
+        self._connection = None
+        self._snapshot = None
+        self._snapshot_loaded = False
+        self._similarity = {}
+        self._lock = threading.Lock()
+        self._connect_thread = None
+        # A single connection serves every session; these expose the contention
+        self._query_lock = threading.Lock()
+        self.queries_run = 0
+        self.lock_wait_seconds = 0.0
+        # Live queries that raised and were answered from the snapshot instead
+        self.live_query_failures = 0
+
+    def _open(self):
+        if self.connect_factory is not None:
+            return self.connect_factory()
+        # Imported here so a cold start never pays for the driver
+        import oracledb
+        return oracledb.connect(**self.connect_kwargs)
+
+    def _connect(self):
+        """Open the database connection, retrying with backoff (runs on a background thread)"""
+        delay = self.retry_delay
+        while True:
+            self.connect_attempts += 1
+            try:
+                connection = self._open()
+                if connection is None:
+                    raise ConnectionError("connection factory returned no connection")
+                with self._lock:
+                    self._connection = connection
+                    self.connect_error = None
+                self._attempted.set()
+                return
+            except Exception as e:
+                self.connect_error = e
+                logging.error(f"Dashboard connection attempt {self.connect_attempts} failed, "
+                              f"retrying in {delay:.0f}s: {e}")
+            self._attempted.set()
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def start(self):
+        """Start connecting in the background; safe to call repeatedly"""
+        with self._lock:
+            if self._connect_thread is None:
+                self._connect_thread = threading.Thread(target=self._connect, daemon=True)
+                self._connect_thread.start()
+        return self
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the first connection attempt finishes; returns is_live"""
+        self.start()
+        self._attempted.wait(timeout)
+        return self.is_live
+
+    @property
+    def is_live(self):
+        return self._connection is not None
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def snapshot(self):
+        """Snapshot from the last ETL run, loaded once on first access"""
+        if not self._snapshot_loaded:
+            try:
+                self._snapshot = load_snapshot(self.storage_path)
+            except Exception as e:
+                logging.error(f"Failed to load dashboard snapshot: {e}")
+                self._snapshot = None
+            self._snapshot_loaded = True
+        return self._snapshot
+
+    def similarity_index(self, kind):
+        """Similarity index of ``kind`` from the last ETL run (None if absent), loaded once"""
+        if kind not in self._similarity:
+            # Imported here so a cold start never pays for it
+            import Similarity
+            path = similarity_index_path(self.storage_path, kind)
+            try:
+                self._similarity[kind] = Similarity.SimilarityIndex.load(path) if path else None
+            except Exception as e:
+                logging.error(f"Failed to load {kind} similarity index: {e}")
+                self._similarity[kind] = None
+        return self._similarity[kind]
+
+    def similar_titles(self, anime_id, kind="audience", k=10):
+        """NAME, TYPE, GENRE, JACCARD of the k anime most similar to anime_id"""
+        index = self.similarity_index(kind)
+        if index is None:
+            return pd.DataFrame()
+        try:
+            similar = index.similar(anime_id, k)
+        except KeyError:
+            return pd.DataFrame()
+        titles = self.fetch("anime_titles")
+        if titles.empty:
+            return pd.DataFrame()
+        similar = similar.rename(columns=str.upper).merge(titles, on='ANIME_ID', how='left')
+        similar['JACCARD'] = similar['JACCARD'].round(3)
+        return similar[['NAME', 'TYPE', 'GENRE', 'JACCARD']]
+
+    def run_sql(self, query, params=None):
+        """Run SQL on the live connection and return a DataFrame"""
+        if not self.is_live:
+            return pd.DataFrame()
+        wait_start = time.perf_counter()
+        with self._query_lock:
+            self.lock_wait_seconds += time.perf_counter() - wait_start
+            self.queries_run += 1
+            if self.query_cache is not None:
+                df = self.query_cache.fetch_dataframe(self._connection, query, params)
+            else:
+                df = fetch_dataframe(self._connection, query, params)
+        return df.rename(columns=str.upper)
+
+    def fetch(self, name):
+        """Return the named dashboard frame from live data, else the snapshot"""
+        if self.is_live:
+            try:
+                return self.run_sql(QUERIES[name])
+            except Exception as e:
+                with self._lock:
+                    self.live_query_failures += 1
+                logging.error(f"Live query '{name}' failed, using snapshot: {e}")
+        snapshot = self.snapshot
+        if snapshot and name in snapshot["frames"]:
+            return snapshot["frames"][name]
+        return pd.DataFrame()
+
+def measure_cold_start(storage_path="local_storage", runs=3):
+    """Time a fresh interpreter importing this module, loading the snapshot and
+    rendering the first page's frames.
+
+    Raises if ``storage_path`` holds no snapshot, so an empty directory is
+    never mistaken for a fast start.
+    """
+    import subprocess
+    import sys
+
+    script = (
+        "import json, time; t0 = time.perf_counter();"
+        "import Dashboard_Data as d; t1 = time.perf_counter();"
+        f"src = d.DashboardDataSource(storage_path={storage_path!r});"
+        "snap = src.snapshot; t2 = time.perf_counter();"
+        "[src.fetch(name) for name in ('metrics', 'type_distribution', 'top_anime', 'rating_distribution')];"
+        "t3 = time.perf_counter();"
+        "print(json.dumps({'found': snap is not None, 'import_s': t1 - t0,"
+        " 'snapshot_s': t2 - t1, 'frames_s': t3 - t2, 'first_frame_s': t3 - t0}))"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", script], cwd=here,
+                             capture_output=True, text=True, check=True)
+        timing = json.loads(out.stdout.strip().splitlines()[-1])
+        if not timing.pop("found"):
+            raise FileNotFoundError(f"No dashboard snapshot under {storage_path}; run the ETL first")
+        timing["process_s"] = time.perf_counter() - start
+        timings.append(timing)
+    return timings
+
+def print_cold_start(timings):
+    for i, timing in enumerate(timings, 1):
+        print(f"Run {i}: first frame in {timing['first_frame_s']:.3f}s "
+              f"(import {timing['import_s']:.3f}s, snapshot {timing['snapshot_s']:.3f}s, "
+              f"frames {timing['frames_s']:.3f}s, process {timing['process_s']:.3f}s)")
+
+if __name__ == "__main__":
+    print_cold_start(measure_cold_start())
@@ -0,0 +1,129 @@
+# Dedup.py - Duplicate (user_id, anime_id) ratings detection on packed int64 keys
+import numpy as np
+
+import Validation
+
+DUPLICATE_RULE = "user_anime_duplicate"
+KEEP_POLICIES = ("first", "last", "max", "min")
+DEFAULT_KEEP = "first"
+# The streaming deduper only sees each row once, so it can only keep the first
+STREAMING_KEEP_POLICIES = ("first",)
+
+def pack_keys(user_ids, anime_ids):
+    """One int64 per (user_id, anime_id): user in the high 32 bits, anime in the low 32"""
+    users = np.asarray(user_ids, dtype=np.int64)
+    anime = np.asarray(anime_ids, dtype=np.int64)
+    return (users << np.int64(32)) | (anime & np.int64(0xFFFFFFFF))
+
+def keep_mask(keys, keep=DEFAULT_KEEP, ratings=None):
+    """True for the one row kept per key.
+
+    keep is "first"/"last" (by row order) or "max"/"min" (by rating, ties
+    to the earlier row). One unstable sort groups equal keys; the policy is
+    applied only to the rows of groups with more than one member, which
+    are few.
+    """
+    if keep not in KEEP_POLICIES:
+        raise ValueError(f"keep must be one of {KEEP_POLICIES}, got {keep!r}")
+    keys = np.asarray(keys)
+    n = len(keys)
+    mask = np.zeros(n, dtype=bool)
+    if not n:
+        return mask
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    repeated = np.repeat(sizes > 1, sizes)
+    mask[order[~repeated]] = True
+
+    rows = order[repeated]
+    if len(rows):
+        if keep in ("first", "last"):
+            preference = -rows if keep == "last" else rows
+        else:
+            rating = np.asarray(ratings, dtype=np.float64)[rows]
+            preference = -rating if keep == "max" else rating
+        # Within each repeated key: preferred row first, ties to the earlier row
+        chosen = rows[np.lexsort((rows, preference, keys[rows]))]
+        chosen_keys = keys[chosen]
+        mask[chosen[np.r_[True, chosen_keys[1:] != chosen_keys[:-1]]]] = True
+    return mask
+
+def _split(df, kept):
+    duplicates = df[~kept].copy()
+    duplicates[Validation.FAILED_COLUMN] = DUPLICATE_RULE
+    return df[kept], duplicates
+
+def dedupe(df, keep=DEFAULT_KEEP):
+    """Split ratings into (one row per user/anime pair, duplicate rows tagged for quarantine).
+
+    A rated row always wins over an unrated (-1) one; ``keep`` chooses
+    among the rated rows, or among the unrated ones of a pair never rated.
+    """
+    keys = pack_keys(df['user_id'].to_numpy(), df['anime_id'].to_numpy())
+    ratings = df['rating'].to_numpy()
+    rated = ratings != -1
+    kept = np.zeros(len(df), dtype=bool)
+    policy_ratings = ratings if keep in ("max", "min") else None
+    for rows in (np.flatnonzero(rated), np.flatnonzero(~rated)):
+        kept[rows] = keep_mask(keys[rows], keep, None if policy_ratings is None else policy_ratings[rows])
+    unrated = np.flatnonzero(~rated & kept)
+    kept[unrated] = ~np.isin(keys[unrated], keys[rated])
+    return _split(df, kept)
+
+class SeenKeys:
+    """Set of int64 keys as a few sorted runs (log-structured merge).
+
+    A new run is merged with the previous one while it is at least half its
+    size, so there are O(log n) runs; membership is a binary search per run.
+    Costs 8 bytes per key, against ~70 for a Python set of ints.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs)
+
+    def contains(self, keys):
+        # Sorted queries walk each run in order, which is far more cache friendly
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, sorted_keys), len(run) - 1)
+            found[order] |= run[positions] == sorted_keys
+        return found
+
+    def add(self, keys):
+        """Add keys not already present"""
+        if not len(keys):
+            return
+        self.runs.append(np.sort(keys))
+        while len(self.runs) > 1 and 2 * len(self.runs[-1]) >= len(self.runs[-2]):
+            newest = self.runs.pop()
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], newest]), kind="stable")
+
+class StreamingDeduper:
+    """Drop (user_id, anime_id) pairs already seen in this chunk or an earlier one"""
+
+    def __init__(self, keep=DEFAULT_KEEP):
+        if keep not in STREAMING_KEEP_POLICIES:
+            raise ValueError(f"Streaming dedup supports keep={STREAMING_KEEP_POLICIES}, got {keep!r}")
+        self.keep = keep
+        self.seen = SeenKeys()
+        self.duplicates = 0
+
+    def dedupe(self, chunk):
+        """Split a chunk like dedupe(); earlier chunks' pairs count as already kept"""
+        keys = pack_keys(chunk['user_id'].to_numpy(), chunk['anime_id'].to_numpy())
+        kept = keep_mask(keys, self.keep)
+        kept[kept] = ~self.seen.contains(keys[kept])
+        self.seen.add(keys[kept])
+        self.duplicates += int((~kept).sum())
+        return _split(chunk, kept)
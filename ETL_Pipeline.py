@@ -2,17 +2,23 @@ import pandas as pd
 import logging
 from datetime import datetime
 import os
+import sys
 import json
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('etl_pipeline.log'),
-        logging.StreamHandler()
-    ]
-)
+import CSV_Reader
+import Shard_Input
+import Group_Aggregate
+import Checkpoint
+import Output_Writer
+import Log_Setup
+import Validation
+import Integrity
+import Dedup
+import Sampling
+import Ranking
+import User_Profiles
+import Similarity
+import Dashboard_Data
 
 class LocalStorageManager:
     """Simple local storage manager for ETL outputs"""
@@ -22,15 +28,16 @@ class LocalStorageManager:
         self.backups_path = os.path.join(base_path, "backups")
         self.reports_path = os.path.join(base_path, "reports")
         self.summaries_path = os.path.join(base_path, "summaries")
+        self.manifests_path = os.path.join(base_path, "manifests")
         
         # Create directories if they don't exist
         self._create_directories()
     
     def _create_directories(self):
         """Create necessary local directories"""
-        for path in [self.backups_path, self.reports_path, self.summaries_path]:
+        for path in [self.backups_path, self.reports_path, self.summaries_path, self.manifests_path]:
             os.makedirs(path, exist_ok=True)
-            logging.info(f"Ensured directory exists: {path}")
+            logging.debug(f"Ensured directory exists: {path}")
     
     def save_dataframe(self, df, filename, subfolder="backups", format="parquet"):
         """Save dataframe to local storage"""
@@ -53,11 +60,11 @@ class LocalStorageManager:
             if format == "parquet":
                 dest_filename = f"{name}_{timestamp}.parquet"
                 dest_path = os.path.join(dest_dir, dest_filename)
-                df.to_parquet(dest_path, index=False)
+                Output_Writer.atomic_write(dest_path, lambda tmp: df.to_parquet(tmp, index=False))
             else:  # csv
                 dest_filename = f"{name}_{timestamp}.csv"
                 dest_path = os.path.join(dest_dir, dest_filename)
-                df.to_csv(dest_path, index=False)
+                Output_Writer.atomic_write(dest_path, lambda tmp: df.to_csv(tmp, index=False))
             
             logging.info(f"Saved {len(df)} records to {dest_path}")
             
@@ -72,6 +79,25 @@ class LocalStorageManager:
             logging.error(f"Failed to save file: {str(e)}")
             return {"status": "failed", "error": str(e)}
     
+    def save_index(self, index, filename, subfolder="features"):
+        """Save a Similarity index (.npz) to local storage"""
+        try:
+            dest_dir = os.path.join(self.base_path, subfolder)
+            os.makedirs(dest_dir, exist_ok=True)
+            name, ext = os.path.splitext(filename)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            dest_path = index.save(os.path.join(dest_dir, f"{name}_{timestamp}{ext}"))
+            logging.info(f"Saved similarity index of {len(index)} anime to {dest_path}")
+            return {
+                "status": "success",
+                "path": dest_path,
+                "records": len(index),
+                "size": os.path.getsize(dest_path)
+            }
+        except Exception as e:
+            logging.error(f"Failed to save index: {str(e)}")
+            return {"status": "failed", "error": str(e)}
+    
     def save_json(self, data, filename, subfolder="summaries"):
         """Save JSON data to local storage"""
         try:
@@ -87,8 +113,11 @@ class LocalStorageManager:
             dest_filename = f"{name}_{timestamp}.json"
             dest_path = os.path.join(dest_dir, dest_filename)
             
-            with open(dest_path, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+            def write(tmp_path):
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=2, default=str)
+            
+            Output_Writer.atomic_write(dest_path, write)
             
             logging.info(f"Saved JSON to {dest_path}")
             
@@ -102,8 +131,17 @@ class LocalStorageManager:
             logging.error(f"Failed to save JSON: {str(e)}")
             return {"status": "failed", "error": str(e)}
 
-def extract():
-    """Extract data from source CSV files"""
+# Ratings kept by extract(); Load_Data's smaller sample is a subset of these rows
+RATINGS_SAMPLE_SIZE = 100000
+
+def extract(ratings_source='rating.csv', workers=None, sample_size=RATINGS_SAMPLE_SIZE):
+    """Extract data from source CSV files.
+
+    ``ratings_source`` may be rating.csv, a directory or a glob of
+    rating_*.csv[.gz|.zst] shards, which are read in parallel processes.
+    Ratings are sampled with Sampling's seeded hash of (user_id, anime_id);
+    a single CSV is sampled block by block without loading it whole.
+    """
     logging.info("EXTRACT: Reading source CSV files...")
     
     try:
@@ -112,20 +150,26 @@ def extract():
             logging.error("anime.csv not found in current directory")
             raise FileNotFoundError("anime.csv is missing")
         
-        if not os.path.exists('rating.csv'):
-            logging.error("rating.csv not found in current directory")
-            raise FileNotFoundError("rating.csv is missing")
+        sharded = Shard_Input.is_sharded(ratings_source)
+        if not sharded and not os.path.exists(ratings_source):
+            logging.error(f"{ratings_source} not found in current directory")
+            raise FileNotFoundError(f"{ratings_source} is missing")
         
         # Read anime data
-        anime_df = pd.read_csv('anime.csv')
+        anime_df = CSV_Reader.read_csv('anime.csv')
         logging.info(f"Extracted {len(anime_df)} anime records")
         
-        # Read ratings data
-        ratings_df = pd.read_csv('rating.csv')
-        
-        # Take a sample for ETL demonstration (optional - remove if you want all data)
-        ratings_sample = ratings_df.sample(n=min(100000, len(ratings_df)), random_state=42)
-        logging.info(f"Extracted {len(ratings_sample)} ratings records (sampled from {len(ratings_df)} total)")
+        # Read and sample ratings data (sample_size=None keeps every row)
+        if sharded:
+            ratings_df, _ = Shard_Input.read_shards(ratings_source, workers=workers)
+            total = len(ratings_df)
+            ratings_sample = Sampling.sample_frame(ratings_df, n=sample_size) if sample_size else ratings_df
+        elif sample_size:
+            ratings_sample, total = Sampling.sample_source(ratings_source, n=sample_size)
+        else:
+            ratings_sample = CSV_Reader.read_csv(ratings_source)
+            total = len(ratings_sample)
+        logging.info(f"Extracted {len(ratings_sample)} ratings records (sampled from {total} total)")
         
         return anime_df, ratings_sample
         
@@ -133,11 +177,17 @@ def extract():
         logging.error(f"Extraction failed: {e}")
         raise
 
-def transform(anime_df, ratings_df):
-    """Transform and clean the data"""
-    logging.info("TRANSFORM: Cleaning and transforming data...")
-    
-    # Anime data transformations
+def clean_numeric(value):
+    """Convert a numeric-looking value to float, anything else to None"""
+    try:
+        if pd.notna(value) and str(value).replace('.', '').replace('-', '').isdigit():
+            return float(value)
+        return None
+    except:
+        return None
+
+def transform_anime(anime_df):
+    """Clean anime records and add calculated columns"""
     anime_clean = anime_df.copy()
     
     # Handle missing values
@@ -145,14 +195,6 @@ def transform(anime_df, ratings_df):
     anime_clean['type'] = anime_clean['type'].fillna('Unknown')
     
     # Clean numeric columns
-    def clean_numeric(value):
-        try:
-            if pd.notna(value) and str(value).replace('.', '').replace('-', '').isdigit():
-                return float(value)
-            return None
-        except:
-            return None
-    
     anime_clean['episodes'] = anime_clean['episodes'].apply(clean_numeric)
     anime_clean['rating'] = anime_clean['rating'].apply(clean_numeric)
     anime_clean['members'] = anime_clean['members'].apply(clean_numeric)
@@ -163,24 +205,78 @@ def transform(anime_df, ratings_df):
     
     # Add transformation timestamp
     anime_clean['etl_processed_date'] = datetime.now().date()
-    
-    # Ratings data transformations
-    ratings_clean = ratings_df.copy()
-    
+    return anime_clean
+
+def drop_unrated(ratings_df):
+    """Ratings other than -1 (watched but not rated).
+
+    Applied before dedup too, so an unrated row never wins over a real
+    rating of the same (user_id, anime_id) pair.
+    """
+    return ratings_df[ratings_df['rating'] != -1]
+
+def transform_ratings(ratings_df):
+    """Clean ratings records; works on the full frame or on one streamed chunk"""
     # Filter out invalid ratings (-1 typically means "no rating")
-    ratings_clean = ratings_clean[ratings_clean['rating'] != -1]
+    ratings_clean = drop_unrated(ratings_df).copy()
     
     # Add data quality flags
     ratings_clean['is_high_rating'] = ratings_clean['rating'] >= 8
     ratings_clean['rating_date'] = datetime.now().date()  # Simulate rating date
+    return ratings_clean
+
+def transform(anime_df, ratings_df, keep=Dedup.DEFAULT_KEEP):
+    """Validate, then transform and clean the data.
+
+    Rows failing a Validation rule, ratings whose anime_id is not a valid
+    anime (orphans) and repeated (user_id, anime_id) ratings other than the
+    one chosen by ``keep`` are set aside rather than cleaned; unrated (-1)
+    rows are dropped before dedup, so they never displace a real rating. Anime get
+    Ranking features computed from the cleaned ratings. Returns
+    (anime_clean, ratings_clean, quarantine) where quarantine maps "anime"
+    and "ratings" to those rows.
+    """
+    logging.info("TRANSFORM: Cleaning and transforming data...")
+    
+    anime_valid, anime_quarantine = Validation.validate(anime_df, Validation.ANIME_RULES)
+    anime_keys = Integrity.anime_keys(anime_valid['anime_id'])
+    ratings_valid, ratings_quarantine = Validation.validate(ratings_df, Integrity.ratings_rules(anime_keys))
+    ratings_valid, duplicates = Dedup.dedupe(drop_unrated(ratings_valid), keep)
+    ratings_quarantine = pd.concat([ratings_quarantine, duplicates])
+    for name, rows, quarantined in (("anime", len(anime_df), anime_quarantine),
+                                    ("ratings", len(ratings_df), ratings_quarantine)):
+        if len(quarantined):
+            logging.warning(f"Quarantined {len(quarantined)} of {rows} {name} records: "
+                            f"{Validation.rule_counts(quarantined)}")
+    
+    ratings_clean = transform_ratings(ratings_valid)
+    anime_clean = Ranking.add_ranking_features(transform_anime(anime_valid), ratings_clean)
     
     logging.info(f"Transformed {len(anime_clean)} anime records")
     logging.info(f"Transformed {len(ratings_clean)} ratings records")
     
-    return anime_clean, ratings_clean
+    return anime_clean, ratings_clean, {"anime": anime_quarantine, "ratings": ratings_quarantine}
+
+def _group_summary(stats):
+    """Distribution of per-group statistics for the quality report"""
+    if stats.empty:
+        return {"groups": 0}
+    return {
+        "groups": len(stats),
+        "median_ratings_per_group": float(stats['count'].median()),
+        "mean_of_group_means": round(float(stats['mean'].mean()), 3),
+        "mean_group_std": round(float(stats['std'].mean()), 3),
+        "mean_high_rating_share": round(float(stats['high_share'].mean()), 3)
+    }
 
-def generate_quality_report(anime_df, ratings_df):
+def generate_quality_report(anime_df, ratings_df, memory_limit=Group_Aggregate.DEFAULT_MEMORY_LIMIT,
+                            quarantine=None):
     """Generate data quality report"""
+    # Per-group statistics stay within memory_limit, spilling to disk if needed
+    per_anime, anime_metrics = Group_Aggregate.aggregate_ratings(
+        ratings_df, "anime_id", memory_limit, exclude_unrated=False)
+    per_user, user_metrics = Group_Aggregate.aggregate_ratings(
+        ratings_df, "user_id", memory_limit, exclude_unrated=False)
     report = {
         "etl_timestamp": datetime.now().isoformat(),
         "data_summary": {
@@ -192,78 +288,109 @@ def generate_quality_report(anime_df, ratings_df):
             },
             "ratings": {
                 "total_records": len(ratings_df),
-                "unique_users": ratings_df['user_id'].nunique(),
-                "unique_anime": ratings_df['anime_id'].nunique(),
+                "unique_users": len(per_user),
+                "unique_anime": len(per_anime),
                 "rating_distribution": ratings_df['rating'].value_counts().head(10).to_dict()
-            }
+            },
+            "per_anime": _group_summary(per_anime),
+            "per_user": _group_summary(per_user)
         },
         "key_metrics": {
             "avg_anime_rating": float(anime_df['rating'].mean()),
             "avg_user_rating": float(ratings_df['rating'].mean()),
             "total_members_sum": int(anime_df['members'].sum()),
             "high_rated_anime": int((anime_df['rating'] >= 8).sum())
-        }
+        },
+        "aggregation": {"per_anime": anime_metrics, "per_user": user_metrics},
+        "validation": {name: Validation.summarize(rows) for name, rows in (quarantine or {}).items()},
+        "integrity": Integrity.orphan_summary((quarantine or {}).get("ratings"))
     }
     return report
 
-def load_local(anime_df, ratings_df, storage_manager):
-    """Load transformed data to local storage"""
+def load_local(anime_df, ratings_df, storage_manager, max_workers=4, quarantine=None):
+    """Load transformed data to local storage.
+
+    The backups, quarantined rows, user profile features, similar-anime
+    indexes, the quality report and the dashboard's summary frames are
+    written concurrently, each atomically; the run manifest is published
+    only after all of them.
+    """
     logging.info("LOAD: Saving data to local storage...")
     
-    try:
-        # 1. Save transformed data as backups
-        logging.info("Saving transformed data to backups...")
-        anime_result = storage_manager.save_dataframe(
-            anime_df, 
-            "anime_transformed.parquet", 
-            "backups",
-            format="parquet"
-        )
-        
-        ratings_result = storage_manager.save_dataframe(
-            ratings_df, 
-            "ratings_transformed.parquet", 
-            "backups",
-            format="parquet"
-        )
-        
-        # 2. Generate and save quality report
+    def write_quality_report():
         logging.info("Generating quality report...")
-        quality_report = generate_quality_report(anime_df, ratings_df)
-        
-        report_result = storage_manager.save_json(
-            quality_report,
-            "quality_report.json",
-            "reports"
-        )
-        
-        # 3. Create summary statistics
-        logging.info("Creating summary statistics...")
-        summary = {
-            "extraction": {
-                "timestamp": datetime.now().isoformat(),
-                "anime_records": len(anime_df),
-                "ratings_records": len(ratings_df),
-                "unique_anime": anime_df['anime_id'].nunique(),
-                "unique_users": ratings_df['user_id'].nunique()
-            },
-            "transformations": {
-                "anime_columns_added": ["popularity_score", "etl_processed_date"],
-                "ratings_columns_added": ["is_high_rating", "rating_date"],
-                "invalid_ratings_removed": len(ratings_df) - len(ratings_df[ratings_df['rating'] != -1])
-            },
-            "storage": {
-                "anime_backup": anime_result,
-                "ratings_backup": ratings_result,
-                "quality_report": report_result
+        quality_report = generate_quality_report(anime_df, ratings_df, quarantine=quarantine)
+        return storage_manager.save_json(quality_report, "quality_report.json", "reports")
+    
+    def write_user_profiles():
+        profiles = User_Profiles.user_profiles(anime_df, ratings_df)
+        return storage_manager.save_dataframe(profiles, "user_profiles.parquet", "features")
+    
+    def write_similarity_index(kind):
+        index = Similarity.build_index(kind, anime_df, ratings_df)
+        return storage_manager.save_index(index, f"similar_{kind}.npz", "features")
+    
+    try:
+        with Output_Writer.OutputWriter(storage_manager.manifests_path, run_id=Log_Setup.get_run_id(),
+                                        max_workers=max_workers) as writer:
+            # 1. Save transformed data as backups and the quality report, concurrently
+            logging.info("Saving transformed data to backups...")
+            writer.submit("anime", storage_manager.save_dataframe,
+                          anime_df, "anime_transformed.parquet", "backups", format="parquet")
+            writer.submit("ratings", storage_manager.save_dataframe,
+                          ratings_df, "ratings_transformed.parquet", "backups", format="parquet")
+            for name, rows in (quarantine or {}).items():
+                if len(rows):
+                    writer.submit(f"{name}_quarantine", storage_manager.save_dataframe,
+                                  rows, f"{name}_quarantine.parquet", "quarantine", format="parquet")
+            writer.submit("user_profiles", write_user_profiles)
+            for kind in Similarity.INDEX_KINDS:
+                writer.submit(f"similar_{kind}", write_similarity_index, kind)
+            writer.submit("quality_report", write_quality_report)
+            Dashboard_Data.write_dashboard_summary(writer, storage_manager, anime_df,
+                                                   Dashboard_Data.RatingBins().add(ratings_df),
+                                                   len(ratings_df), ratings_df['user_id'].nunique())
+            written = writer.wait()
+            anime_result = written["anime"]
+            ratings_result = written["ratings"]
+            report_result = written["quality_report"]
+            profiles_result = written["user_profiles"]
+            similarity_results = {kind: written[f"similar_{kind}"] for kind in Similarity.INDEX_KINDS}
+            
+            # 2. Create summary statistics
+            logging.info("Creating summary statistics...")
+            summary = {
+                "extraction": {
+                    "timestamp": datetime.now().isoformat(),
+                    "run_id": writer.run_id,
+                    "anime_records": len(anime_df),
+                    "ratings_records": len(ratings_df),
+                    "unique_anime": anime_df['anime_id'].nunique(),
+                    "unique_users": ratings_df['user_id'].nunique()
+                },
+                "transformations": {
+                    "anime_columns_added": ["popularity_score", "etl_processed_date"] + Ranking.RANKING_COLUMNS,
+                    "ratings_columns_added": ["is_high_rating", "rating_date"],
+                    "invalid_ratings_removed": len(ratings_df) - len(ratings_df[ratings_df['rating'] != -1]),
+                    "rows_quarantined": {name: len(rows) for name, rows in (quarantine or {}).items()}
+                },
+                "storage": {
+                    "anime_backup": anime_result,
+                    "ratings_backup": ratings_result,
+                    "user_profiles": profiles_result,
+                    "similarity_indexes": similarity_results,
+                    "quality_report": report_result
+                }
             }
-        }
+            
+            summary_result = writer.submit("summary", storage_manager.save_json,
+                                           summary, "etl_summary.json", "summaries").result()
+            
+            # 3. Publish the manifest once every artifact is durable
+            manifest_result = writer.publish()
         
-        summary_result = storage_manager.save_json(
-            summary,
-            "etl_summary.json",
-            "summaries"
-        )
+        if manifest_result["status"] != "success":
+            return {"success": False, "error": manifest_result["error"]}
         
         logging.info("All data successfully saved to local storage")
         
@@ -273,38 +400,138 @@ def load_local(anime_df, ratings_df, storage_manager):
                 "anime": anime_result,
                 "ratings": ratings_result
             },
+            "features": {"user_profiles": profiles_result, "similarity_indexes": similarity_results},
             "reports": {
                 "quality": report_result,
                 "summary": summary_result
-            }
+            },
+            "manifest": manifest_result
         }
         
     except Exception as e:
         logging.error(f"Load to local storage failed: {e}")
         return {"success": False, "error": str(e)}
 
-def main():
-    """Main ETL pipeline function"""
+def stage_fingerprints(ratings_source='rating.csv', keep=Dedup.DEFAULT_KEEP):
+    """Chained fingerprints of each stage's inputs and code"""
+    inputs = Checkpoint.input_fingerprint(['anime.csv'] + Shard_Input.discover_shards(ratings_source))
+    extract_fp = Checkpoint.fingerprint(
+        "extract", inputs, Checkpoint.code_fingerprint(extract, CSV_Reader, Shard_Input, Sampling))
+    transform_fp = Checkpoint.fingerprint(
+        "transform", extract_fp, keep,
+        Checkpoint.code_fingerprint(transform, transform_anime, transform_ratings, drop_unrated, clean_numeric,
+                                    Validation, Integrity, Dedup, Ranking))
+    load_fp = Checkpoint.fingerprint(
+        "load", transform_fp, Checkpoint.code_fingerprint(load_local, generate_quality_report, User_Profiles, Similarity,
+                                                       Dashboard_Data))
+    return {"extract": extract_fp, "transform": transform_fp, "load": load_fp}
+
+def run_stage(checkpoints, stage, stage_fingerprint, resume, fn):
+    """Run a stage returning named DataFrames, or load its checkpoint on resume"""
+    if resume:
+        entry = checkpoints.find(stage, stage_fingerprint)
+        if entry:
+            logging.info(f"RESUME: Loading '{stage}' checkpoint from {entry['run_path']}")
+            return checkpoints.load(entry)
+    frames = fn()
+    try:
+        checkpoints.save(stage, stage_fingerprint, frames)
+    except Exception as e:
+        logging.error(f"Failed to checkpoint stage '{stage}': {e}")
+    return frames
+
+def main(stream=False, ratings_source='rating.csv', workers=None, resume=False, key_filter="exact",
+         keep=Dedup.DEFAULT_KEEP):
+    """Main ETL pipeline function.
+
+    ``stream=True`` runs the overlapped reader/transformer/writer pipeline
+    over the full ratings input instead of the in-memory phases.
+    ``key_filter`` ("exact" or "bloom") is the streaming orphan check and
+    ``keep`` the duplicate-rating policy (see Dedup.KEEP_POLICIES).
+    ``resume=True`` skips stages whose checkpoint matches the current
+    inputs and code. ``workers`` (shard reader processes) applies to the
+    in-memory phases only. Returns True if the run succeeded.
+    """
+    if stream and workers:
+        raise ValueError("workers applies to the in-memory pipeline; "
+                         "the streaming pipeline reads shards with one reader thread")
+    run_id = Log_Setup.set_run_id(Checkpoint.new_run_id())
     logging.info("=" * 50)
-    logging.info("Starting ETL Pipeline (Local Storage Mode)")
+    logging.info("Starting ETL Pipeline (Local Storage Mode)", extra={"event": "run_start"})
     logging.info("=" * 50)
     
     # Initialize local storage
     storage = LocalStorageManager(base_path="local_storage")
     
+    if stream:
+        import Streaming_ETL  # imports this module, so resolve lazily
+        try:
+            result = Streaming_ETL.run_streaming(ratings_source, storage, key_filter=key_filter, keep=keep)
+            if not result["success"]:
+                logging.error(f"Streaming ETL Pipeline failed: {result['error']}", extra={"event": "run_failed"})
+                print(f"\n❌ Error: {result['error']}")
+                print("Check etl_pipeline.log for details")
+                return False
+            logging.info("=" * 50)
+            logging.info("Streaming ETL Pipeline completed successfully!", extra={"event": "run_end"})
+            logging.info("=" * 50)
+            print("\n" + "=" * 60)
+            print("📊 STREAMING ETL EXECUTION SUMMARY")
+            print("=" * 60)
+            print(f"   • Anime: {result['anime_records']:,} records")
+            print(f"   • Ratings read: {result['ratings_read']:,}, written: {result['ratings_written']:,}")
+            for name, stage in result["stages"].items():
+                print(f"   • {name:<9} {stage['rows_per_second']:>12,.0f} rows/s "
+                      f"(waiting {stage['wait_seconds']}s)")
+            print("=" * 60)
+            return True
+        except Exception as e:
+            logging.error(f"Streaming ETL Pipeline failed: {e}", extra={"event": "run_failed"})
+            print(f"\n❌ Error: {e}")
+            print("Check etl_pipeline.log for details")
+            return False
+    
+    checkpoints = Checkpoint.CheckpointStore(os.path.join(storage.base_path, "checkpoints"), run_id)
+    
     try:
+        fingerprints = stage_fingerprints(ratings_source, keep)
+        
         # EXTRACT
-        anime_data, ratings_data = extract()
+        with Log_Setup.stage_timer("extract") as stage:
+            extracted = run_stage(checkpoints, "extract", fingerprints["extract"], resume,
+                                  lambda: dict(zip(("anime", "ratings"), extract(ratings_source, workers))))
+            anime_data, ratings_data = extracted["anime"], extracted["ratings"]
+            stage["rows"] = len(anime_data) + len(ratings_data)
         
         # TRANSFORM
-        anime_clean, ratings_clean = transform(anime_data, ratings_data)
+        with Log_Setup.stage_timer("transform") as stage:
+            def run_transform():
+                anime_clean, ratings_clean, quarantine = transform(anime_data, ratings_data, keep)
+                return {"anime": anime_clean, "ratings": ratings_clean,
+                        "anime_quarantine": quarantine["anime"],
+                        "ratings_quarantine": quarantine["ratings"]}
+            transformed = run_stage(checkpoints, "transform", fingerprints["transform"], resume, run_transform)
+            anime_clean, ratings_clean = transformed["anime"], transformed["ratings"]
+            quarantine = {"anime": transformed["anime_quarantine"],
+                          "ratings": transformed["ratings_quarantine"]}
+            stage["rows"] = len(anime_clean) + len(ratings_clean)
         
         # LOAD (to local storage)
-        result = load_local(anime_clean, ratings_clean, storage)
+        with Log_Setup.stage_timer("load") as stage:
+            done = checkpoints.find("load", fingerprints["load"]) if resume else None
+            if done:
+                logging.info(f"RESUME: Load already completed in {done['run_path']}, nothing to do")
+                result = done["meta"]
+            else:
+                result = load_local(anime_clean, ratings_clean, storage, quarantine=quarantine)
+                if result["success"]:
+                    checkpoints.save("load", fingerprints["load"], meta=result)
+                    stage["rows"] = len(anime_clean) + len(ratings_clean)
         
         if result["success"]:
+            checkpoints.gc()
             logging.info("=" * 50)
-            logging.info("ETL Pipeline completed successfully!")
+            logging.info("ETL Pipeline completed successfully!", extra={"event": "run_end"})
             logging.info("=" * 50)
             
             # Print summary to console
@@ -318,6 +545,8 @@ def main():
             print(f"   • Cleaned anime: {len(anime_clean):,} records")
             print(f"   • Cleaned ratings: {len(ratings_clean):,} records")
             print(f"   • Added popularity scores & quality flags")
+            print(f"   • Quarantined: {len(quarantine['anime']):,} anime, "
+                  f"{len(quarantine['ratings']):,} ratings (local_storage/quarantine/)")
             print(f"\n✅ LOAD (Local Storage):")
             print(f"   • Backups: local_storage/backups/")
             print(f"   • Reports: local_storage/reports/")
@@ -328,14 +557,37 @@ def main():
             print("   2. Check subfolders: backups/, reports/, summaries/")
             print("   3. View logs: etl_pipeline.log")
             print("=" * 60)
-            
-        else:
-            logging.error(f"ETL Pipeline failed: {result.get('error', 'Unknown error')}")
+            return True
+        
+        logging.error(f"ETL Pipeline failed: {result.get('error', 'Unknown error')}",
+                      extra={"event": "run_failed"})
+        return False
             
     except Exception as e:
-        logging.error(f"ETL Pipeline failed: {e}")
+        logging.error(f"ETL Pipeline failed: {e}", extra={"event": "run_failed"})
         print(f"\n❌ Error: {e}")
         print("Check etl_pipeline.log for details")
+        return False
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Anime ETL pipeline (local storage)")
+    parser.add_argument("--ratings", default="rating.csv",
+                        help="rating.csv, or a directory/glob of rating shards")
+    parser.add_argument("--workers", type=int, default=None, help="Shard reader processes")
+    parser.add_argument("--stream", action="store_true",
+                        help="Overlapped streaming pipeline over the full ratings input")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip stages whose checkpoint matches the current inputs and code")
+    parser.add_argument("--key-filter", choices=("exact", "bloom"), default="exact",
+                        help="Orphan check for --stream: exact sorted keys or a Bloom filter")
+    parser.add_argument("--keep", choices=Dedup.KEEP_POLICIES, default=Dedup.DEFAULT_KEEP,
+                        help="Which of several ratings of one anime by one user to keep "
+                             "(--stream supports 'first' only)")
+    args = parser.parse_args()
+    if args.stream and args.workers:
+        parser.error("--workers applies to the in-memory pipeline, not --stream")
+    Log_Setup.configure_logging()
+    ok = main(stream=args.stream, ratings_source=args.ratings, workers=args.workers, resume=args.resume,
+              key_filter=args.key_filter, keep=args.keep)
+    sys.exit(0 if ok else 1)
\ No newline at end of file
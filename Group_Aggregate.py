@@ -0,0 +1,197 @@
+# Group_Aggregate.py - Out-of-core grouped rating statistics with hash-partitioned disk spill
+import os
+import time
+import shutil
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import Shard_Input
+import Integrity
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+DEFAULT_PARTITIONS = 16
+HIGH_RATING = 8
+# Partitions that still do not fit are re-split with a new salt up to this depth
+MAX_DEPTH = 3
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def partition_of(keys, partitions, salt=0):
+    """Stable hash partition number for each integer key.
+
+    The salt is folded into the key before a full splitmix64 finalizer, so
+    keys that shared a partition at one depth spread over all partitions
+    at the next.
+    """
+    with np.errstate(over="ignore"):
+        salted = np.asarray(keys).astype(np.uint64) ^ (np.uint64(salt) * _GOLDEN)
+    mixed = Integrity.mix64(salted, _GOLDEN)
+    return ((mixed >> np.uint64(32)) % np.uint64(partitions)).astype(np.int64)
+
+def aggregate_frame(df, key, value="rating", high_threshold=HIGH_RATING):
+    """In-memory per-key count, mean, std, min, max and high-rating share"""
+    values = df[value]
+    grouped = df.assign(_high=(values >= high_threshold)).groupby(key, sort=True)
+    result = grouped[value].agg(['count', 'mean', 'std', 'min', 'max'])
+    result['high_share'] = grouped['_high'].mean()
+    return result
+
+class GroupAggregator:
+    """Grouped rating statistics under a memory budget.
+
+    Chunks are buffered in memory until ``memory_limit`` bytes; beyond that
+    the buffer is hash-partitioned on ``key`` into Arrow IPC files. Each
+    partition holds a disjoint key set, so it is aggregated on its own and
+    the results are concatenated. Feed chunks with add(), then call result().
+    """
+
+    def __init__(self, key, value="rating", memory_limit=DEFAULT_MEMORY_LIMIT,
+                 partitions=DEFAULT_PARTITIONS, high_threshold=HIGH_RATING, spill_dir=None,
+                 _depth=0):
+        self.key = key
+        self.value = value
+        self.memory_limit = memory_limit
+        self.partitions = partitions
+        self.high_threshold = high_threshold
+        self.spill_dir = spill_dir
+        self._depth = _depth
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._writers = None
+        self._paths = None
+        self._tmp_dir = None
+        self.metrics = {
+            "rows": 0,
+            "groups": 0,
+            "spill_events": 0,
+            "spilled_rows": 0,
+            "spilled_bytes": 0,
+            "partitions": 0,
+            "repartitions": 0,
+            "peak_buffer_bytes": 0,
+            "seconds": 0.0,
+        }
+
+    @property
+    def spilled(self):
+        return self._writers is not None
+
+    def add(self, df):
+        """Add a chunk of rows; spills to disk once the buffer exceeds the budget"""
+        start = time.perf_counter()
+        df = df[[self.key, self.value]]
+        self._buffer.append(df)
+        self._buffer_bytes += int(df.memory_usage(index=False).sum())
+        self.metrics["rows"] += len(df)
+        self.metrics["peak_buffer_bytes"] = max(self.metrics["peak_buffer_bytes"], self._buffer_bytes)
+        if self._buffer_bytes > self.memory_limit:
+            self._spill()
+        self.metrics["seconds"] += time.perf_counter() - start
+
+    def _open_partitions(self):
+        self._tmp_dir = tempfile.mkdtemp(prefix="anime_agg_", dir=self.spill_dir)
+        self._paths = [os.path.join(self._tmp_dir, f"part_{i:03d}.arrow") for i in range(self.partitions)]
+        self._writers = [None] * self.partitions
+        self.metrics["partitions"] = self.partitions
+
+    def _spill(self):
+        """Hash-partition the buffered rows into the partition files"""
+        if not self._buffer:
+            return
+        if self._writers is None:
+            self._open_partitions()
+        buffered = pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        self._buffer_bytes = 0
+
+        parts = partition_of(buffered[self.key].to_numpy(), self.partitions, self._depth)
+        order = np.argsort(parts, kind="stable")
+        bounds = np.searchsorted(parts[order], np.arange(self.partitions + 1))
+        table = pa.Table.from_pandas(buffered, preserve_index=False)
+        for i in range(self.partitions):
+            lo, hi = bounds[i], bounds[i + 1]
+            if lo == hi:
+                continue
+            piece = table.take(pa.array(order[lo:hi]))
+            if self._writers[i] is None:
+                self._writers[i] = pa.ipc.new_stream(self._paths[i], piece.schema)
+            self._writers[i].write_table(piece)
+            self.metrics["spilled_bytes"] += piece.nbytes
+        self.metrics["spill_events"] += 1
+        self.metrics["spilled_rows"] += len(buffered)
+        logging.info(f"Aggregation spill {self.metrics['spill_events']}: {len(buffered):,} rows "
+                     f"into {self.partitions} partitions")
+
+    def _aggregate_partition(self, path):
+        """Aggregate one partition file, re-splitting it if it is over budget"""
+        if os.path.getsize(path) > self.memory_limit and self._depth < MAX_DEPTH:
+            nested = GroupAggregator(self.key, self.value, self.memory_limit, self.partitions,
+                                     self.high_threshold, self._tmp_dir, self._depth + 1)
+            with pa.OSFile(path, "rb") as f:
+                for batch in pa.ipc.open_stream(f):
+                    nested.add(batch.to_pandas())
+            result = nested.result()
+            self.metrics["repartitions"] += 1 + nested.metrics["repartitions"]
+            self.metrics["spilled_bytes"] += nested.metrics["spilled_bytes"]
+            return result
+        with pa.OSFile(path, "rb") as f:
+            df = pa.ipc.open_stream(f).read_all().to_pandas()
+        return aggregate_frame(df, self.key, self.value, self.high_threshold)
+
+    def result(self):
+        """Per-key statistics indexed by key: count, mean, std, min, max, high_share"""
+        start = time.perf_counter()
+        try:
+            if not self.spilled:
+                frame = (pd.concat(self._buffer, ignore_index=True) if self._buffer
+                         else pd.DataFrame(columns=[self.key, self.value]))
+                self._buffer = []
+                result = aggregate_frame(frame, self.key, self.value, self.high_threshold)
+            else:
+                self._spill()
+                for writer in self._writers:
+                    if writer is not None:
+                        writer.close()
+                results = [self._aggregate_partition(path)
+                           for path, writer in zip(self._paths, self._writers) if writer is not None]
+                result = pd.concat(results).sort_index() if results else aggregate_frame(
+                    pd.DataFrame(columns=[self.key, self.value]), self.key, self.value)
+        finally:
+            if self._tmp_dir:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+                self._tmp_dir = None
+        self.metrics["groups"] = len(result)
+        self.metrics["seconds"] = round(self.metrics["seconds"] + time.perf_counter() - start, 3)
+        return result
+
+def aggregate_chunks(chunks, key, value="rating", memory_limit=DEFAULT_MEMORY_LIMIT,
+                     partitions=DEFAULT_PARTITIONS, high_threshold=HIGH_RATING):
+    """Aggregate an iterable of DataFrames; returns (stats, metrics)"""
+    aggregator = GroupAggregator(key, value, memory_limit, partitions, high_threshold)
+    for chunk in chunks:
+        aggregator.add(chunk)
+    return aggregator.result(), aggregator.metrics
+
+def aggregate_ratings(ratings, key, memory_limit=DEFAULT_MEMORY_LIMIT, partitions=DEFAULT_PARTITIONS,
+                      exclude_unrated=True, block_size=8 * 1024 * 1024):
+    """Per-anime or per-user rating statistics from a DataFrame or a ratings source.
+
+    ``ratings`` is a DataFrame, or a rating.csv path / shard directory that
+    is streamed block by block. ``-1`` ("watched, not rated") is dropped
+    unless ``exclude_unrated`` is False.
+    """
+    if isinstance(ratings, pd.DataFrame):
+        step = max(1, len(ratings) // 16)
+        chunks = (ratings.iloc[i:i + step] for i in range(0, len(ratings), step))
+    else:
+        chunks = Shard_Input.iter_chunks(ratings, block_size=block_size)
+    if exclude_unrated:
+        chunks = (chunk[chunk['rating'] != -1] for chunk in chunks)
+    stats, metrics = aggregate_chunks(chunks, key, "rating", memory_limit, partitions)
+    logging.info(f"Aggregated {metrics['rows']:,} ratings into {metrics['groups']:,} {key} groups "
+                 f"in {metrics['seconds']}s ({metrics['spill_events']} spills, "
+                 f"{metrics['spilled_bytes'] / (1024 * 1024):.1f} MB spilled)")
+    return stats, metrics
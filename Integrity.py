@@ -0,0 +1,163 @@
+# Integrity.py - Referential integrity of ratings.anime_id against the anime key set
+import math
+import numpy as np
+
+import Validation
+
+ORPHAN_RULE = "anime_id_orphan"
+
+# Key sets spanning at most this many ids per key get a dense lookup table
+DENSE_SPAN_PER_KEY = 64
+
+class KeySet:
+    """Exact membership over a sorted, de-duplicated key array.
+
+    Dense key ranges (anime_id spans ~35k ids for ~12k keys) are looked up
+    in a boolean table indexed by id; sparse ones by binary search.
+    """
+
+    kind = "exact"
+
+    def __init__(self, keys):
+        keys = np.unique(np.asarray(keys, dtype=np.int64))
+        # anime_id fits int32: half the memory and cache footprint of int64
+        if len(keys) and keys[0] >= np.iinfo(np.int32).min and keys[-1] <= np.iinfo(np.int32).max:
+            keys = keys.astype(np.int32)
+        self.keys = keys
+        self._table = None
+        if len(keys):
+            self.low, self.high = int(keys[0]), int(keys[-1])
+            if self.high - self.low + 1 <= DENSE_SPAN_PER_KEY * len(keys):
+                self._table = np.zeros(self.high - self.low + 1, dtype=bool)
+                self._table[keys.astype(np.int64) - self.low] = True
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + (self._table.nbytes if self._table is not None else 0)
+
+    def contains(self, values):
+        values = np.asarray(values)
+        found = np.zeros(len(values), dtype=bool)
+        if not len(self.keys):
+            return found
+        # Anything outside [low, high] is absent; the rest fits the key dtype
+        candidates = np.flatnonzero((values >= self.low) & (values <= self.high))
+        inside = values[candidates].astype(self.keys.dtype)
+        if self._table is not None:
+            found[candidates] = self._table[inside.astype(np.int64) - self.low]
+        else:
+            positions = np.searchsorted(self.keys, inside)
+            found[candidates] = self.keys[np.minimum(positions, len(self.keys) - 1)] == inside
+        return found
+
+def mix64(keys, seed):
+    """splitmix64 finalizer over integer keys (as uint64) offset by ``seed``.
+
+    A bijection for a fixed seed; Bloom probes, Sampling hashes and
+    Group_Aggregate partitions all build on it.
+    """
+    with np.errstate(over="ignore"):
+        z = keys.astype(np.uint64) + np.uint64(seed)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+class BloomFilter:
+    """Approximate membership in a fixed-size bit array.
+
+    No false negatives; about ``error_rate`` of absent keys test present, so
+    that share of orphans can slip through. Its size depends only on
+    ``capacity`` - useful when the key set is large or has to be shipped to
+    worker processes.
+    """
+
+    kind = "bloom"
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        optimal_bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.hashes = max(int(round(optimal_bits / capacity * math.log(2))), 1)
+        # Power-of-two size: bit positions by mask instead of modulo
+        self.bits = 1 << max(int(math.ceil(math.log2(optimal_bits))), 3)
+        self.error_rate = error_rate
+        self.count = 0
+        self._array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def from_keys(cls, keys, error_rate=0.01):
+        keys = np.unique(np.asarray(keys, dtype=np.int64))
+        bloom = cls(len(keys), error_rate)
+        bloom.add(keys)
+        return bloom
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self._array.nbytes
+
+    def _hashes(self, keys):
+        """Two 32-bit hashes from one 64-bit mix, for double hashing"""
+        mixed = mix64(np.asarray(keys, dtype=np.int64), 0x9E3779B97F4A7C15)
+        return mixed & np.uint64(0xFFFFFFFF), (mixed >> np.uint64(32)) | np.uint64(1)
+
+    def _bit_positions(self, h1, h2):
+        """Bit position of each key for each of the ``hashes`` probes"""
+        mask = np.uint64(self.bits - 1)
+        for i in range(self.hashes):
+            yield (h1 + np.uint64(i) * h2) & mask
+
+    def add(self, keys):
+        h1, h2 = self._hashes(keys)
+        for positions in self._bit_positions(h1, h2):
+            np.bitwise_or.at(self._array, (positions >> np.uint64(3)).astype(np.int64),
+                             np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(h1)
+
+    def contains(self, values):
+        h1, h2 = self._hashes(values)
+        found = np.ones(len(h1), dtype=bool)
+        # One probe at a time keeps memory at O(len(values))
+        for positions in self._bit_positions(h1, h2):
+            bits = self._array[(positions >> np.uint64(3)).astype(np.int64)]
+            found &= ((bits >> (positions & np.uint64(7)).astype(np.uint8)) & 1).astype(bool)
+        return found
+
+def anime_keys(anime_ids, key_filter="exact", error_rate=0.01):
+    """Key set over anime ids: "exact" (sorted array) or "bloom" """
+    if key_filter == "bloom":
+        return BloomFilter.from_keys(anime_ids, error_rate)
+    if key_filter != "exact":
+        raise ValueError(f"Unknown key filter: {key_filter}")
+    return KeySet(anime_ids)
+
+def references(column, key_set):
+    """Validation rule: ``column`` must be present in key_set"""
+    def check(df):
+        values = df[column]
+        present = values.notna().to_numpy()
+        ok = np.zeros(len(values), dtype=bool)
+        ok[present] = key_set.contains(values[present].to_numpy(dtype=np.int64))
+        return ok
+    return Validation.Rule(f"{column}_orphan", check)
+
+def ratings_rules(key_set):
+    """RATINGS_RULES plus the anime_id reference check"""
+    return Validation.RATINGS_RULES + [references("anime_id", key_set)]
+
+def orphan_summary(ratings_quarantine, key_set=None):
+    """Integrity section for the quality report"""
+    summary = {"orphan_ratings": 0}
+    if ratings_quarantine is not None:
+        failed = ratings_quarantine[Validation.FAILED_COLUMN].astype(str)
+        orphans = ratings_quarantine[failed.str.contains(ORPHAN_RULE, regex=False).to_numpy(dtype=bool)]
+        summary = {"orphan_ratings": len(orphans),
+                   "orphan_anime_ids": int(orphans['anime_id'].nunique())}
+    if key_set is not None:
+        summary.update({"key_filter": key_set.kind, "anime_keys": len(key_set),
+                        "key_set_bytes": int(key_set.nbytes)})
+    return summary
@@ -1,7 +1,24 @@
+import os
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import oracledb
 import pandas as pd
 import numpy as np
 
+import CSV_Reader
+import Schema_Manager
+import Validation
+import Integrity
+import Dedup
+import Sampling
+import Output_Writer
+import Ranking
+from Group_Aggregate import HIGH_RATING
+
+QUARANTINE_DIR = os.path.join("local_storage", "quarantine")
+
 def get_connection():
     """Create connection to Oracle database"""
     try:
@@ -30,11 +47,116 @@ def clean_numeric_value(value):
     except (ValueError, TypeError):
         return None
 
+def _ranking_values(row):
+    """Ranking.RANKING_COLUMNS of an anime row (None where absent or NaN)"""
+    values = []
+    for column in Ranking.RANKING_COLUMNS:
+        value = getattr(row, column, None)
+        if value is None or pd.isna(value):
+            values.append(None)
+        else:
+            values.append(int(value) if column == "ratings_count" else float(value))
+    return tuple(values)
+
+def prepare_anime_rows(df, ranking=False):
+    """Clean anime rows into tuples ready for insertion.
+
+    With ``ranking``, each tuple also carries the Ranking.RANKING_COLUMNS.
+    """
+    data_tuples = []
+    success_count = 0
+    error_count = 0
+    
+    for row in df.itertuples(index=False):
+        try:
+            # Clean numeric values
+            cleaned_episodes = clean_numeric_value(row.episodes)
+            cleaned_rating = clean_numeric_value(row.rating)
+            cleaned_members = clean_numeric_value(row.members)
+            
+            # Handle text fields
+            name = row.name if pd.notna(row.name) else 'Unknown'
+            genre = row.genre if pd.notna(row.genre) else 'Unknown'
+            anime_type = row.type if pd.notna(row.type) else 'Unknown'
+            
+            data_tuples.append((
+                int(row.anime_id),
+                str(name)[:255],  # Limit to 255 chars for VARCHAR2
+                str(genre)[:500],
+                str(anime_type)[:50],
+                cleaned_episodes,
+                cleaned_rating,
+                cleaned_members
+            ) + (_ranking_values(row) if ranking else ()))
+            success_count += 1
+            
+        except Exception as e:
+            print(f"Error processing row {row.anime_id}: {e}")
+            error_count += 1
+            continue
+    
+    print(f"Processed {success_count} rows successfully, {error_count} errors")
+    return data_tuples
+
+def validate_rows(df, rules, name, quarantine_dir=QUARANTINE_DIR, keep=None):
+    """Drop rows failing Validation rules, keeping them in a quarantine parquet.
+
+    With ``keep``, repeated (user_id, anime_id) ratings are quarantined too,
+    except the one the Dedup policy keeps.
+    """
+    valid, quarantine = Validation.validate(df, rules)
+    if keep:
+        valid, duplicates = Dedup.dedupe(valid, keep)
+        quarantine = pd.concat([quarantine, duplicates])
+    if len(quarantine):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(quarantine_dir, exist_ok=True)
+        path = os.path.join(quarantine_dir, f"{name}_quarantine_{timestamp}.parquet")
+        Output_Writer.atomic_write(path, lambda tmp: quarantine.to_parquet(tmp, index=False))
+        print(f"Quarantined {len(quarantine)} {name} rows to {path}: "
+              f"{Validation.rule_counts(quarantine)}")
+    return valid
+
+def anime_key_set(connection):
+    """anime_id values already in the anime table (the ratings FK target)"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT anime_id FROM anime")
+    return Integrity.KeySet(np.array([row[0] for row in cursor.fetchall()], dtype=np.int64))
+
+def read_ratings_sample(sample_size=50000, rules=Validation.RATINGS_RULES):
+    """Sample rating.csv block by block and validate the sample against rules.
+
+    Uses the same seeded hash as ETL_Pipeline.extract(), so the rows loaded
+    here are a subset of the ETL's parquet backups.
+    """
+    df, total = Sampling.sample_source('rating.csv', n=sample_size)
+    print(f"Loaded ratings data: {total} rows")
+    print(f"Taking sample of {len(df)} rows")
+    return validate_rows(df, rules, "ratings", keep=Dedup.DEFAULT_KEEP)
+
+def prepare_ratings_rows(df):
+    """Clean ratings rows into tuples ready for insertion"""
+    data_tuples = []
+    for row in df.itertuples(index=False):
+        try:
+            # Clean rating value (handle -1 ratings which might mean "no rating")
+            rating = float(row.rating) if row.rating != -1 else None
+            
+            data_tuples.append((
+                int(row.user_id),
+                int(row.anime_id),
+                rating
+            ))
+        except Exception as e:
+            continue  # Skip problematic rows
+    return data_tuples
+
 def load_anime_data(connection):
     """Load anime CSV data into Oracle"""
     try:
-        df = pd.read_csv('anime.csv')
+        df = CSV_Reader.read_csv('anime.csv')
         print(f"Loaded anime data: {len(df)} rows")
+        df = validate_rows(df, Validation.ANIME_RULES, "anime")
         
         cursor = connection.cursor()
         
@@ -45,39 +167,7 @@ def load_anime_data(connection):
         """
         
         # Process data row by row with proper cleaning
-        data_tuples = []
-        success_count = 0
-        error_count = 0
-        
-        for row in df.itertuples(index=False):
-            try:
-                # Clean numeric values
-                cleaned_episodes = clean_numeric_value(row.episodes)
-                cleaned_rating = clean_numeric_value(row.rating)
-                cleaned_members = clean_numeric_value(row.members)
-                
-                # Handle text fields
-                name = row.name if pd.notna(row.name) else 'Unknown'
-                genre = row.genre if pd.notna(row.genre) else 'Unknown'
-                anime_type = row.type if pd.notna(row.type) else 'Unknown'
-                
-                data_tuples.append((
-                    int(row.anime_id),
-                    str(name)[:255],  # Limit to 255 chars for VARCHAR2
-                    str(genre)[:500],
-                    str(anime_type)[:50],
-                    cleaned_episodes,
-                    cleaned_rating,
-                    cleaned_members
-                ))
-                success_count += 1
-                
-            except Exception as e:
-                print(f"Error processing row {row.anime_id}: {e}")
-                error_count += 1
-                continue
-        
-        print(f"Processed {success_count} rows successfully, {error_count} errors")
+        data_tuples = prepare_anime_rows(df)
         
         if data_tuples:
             cursor.executemany(insert_sql, data_tuples)
@@ -96,32 +186,14 @@ def load_anime_data(connection):
 def load_ratings_data(connection):
     """Load ratings CSV data into Oracle"""
     try:
-        df = pd.read_csv('rating.csv')
-        print(f"Loaded ratings data: {len(df)} rows")
-        
-        # Take a smaller sample for development
-        sample_size = 50000
-        if len(df) > sample_size:
-            print(f"Taking sample of {sample_size} rows")
-            df = df.sample(n=sample_size, random_state=42)
+        # Orphans would fail the foreign key halfway through executemany
+        df = read_ratings_sample(rules=Integrity.ratings_rules(anime_key_set(connection)))
         
         cursor = connection.cursor()
         insert_sql = "INSERT INTO ratings (user_id, anime_id, rating) VALUES (:1, :2, :3)"
         
         # Process ratings data
-        data_tuples = []
-        for row in df.itertuples(index=False):
-            try:
-                # Clean rating value (handle -1 ratings which might mean "no rating")
-                rating = float(row.rating) if row.rating != -1 else None
-                
-                data_tuples.append((
-                    int(row.user_id),
-                    int(row.anime_id),
-                    rating
-                ))
-            except Exception as e:
-                continue  # Skip problematic rows
+        data_tuples = prepare_ratings_rows(df)
         
         cursor.executemany(insert_sql, data_tuples)
         connection.commit()
@@ -134,22 +206,363 @@ def load_ratings_data(connection):
         connection.rollback()
         return False
 
-def main():
+def partition_ratings(df, partitions):
+    """Split ratings into partitions by user_id hash (stable across runs)"""
+    buckets = df['user_id'].to_numpy() % partitions
+    return [df[buckets == i] for i in range(partitions)]
+
+def _load_partition(connect_factory, partition_id, df, batch_size, commit_every, progress):
+    """Load one ratings partition over its own connection"""
+    result = {"partition": partition_id, "rows": len(df), "loaded": 0,
+              "batches": 0, "status": "success", "error": None}
+    start = time.perf_counter()
+    connection = None
+    try:
+        connection = connect_factory()
+        if connection is None:
+            raise RuntimeError("no connection")
+        cursor = connection.cursor()
+        insert_sql = "INSERT INTO ratings (user_id, anime_id, rating) VALUES (:1, :2, :3)"
+        rows = prepare_ratings_rows(df)
+        pending = 0
+        for batch_start in range(0, len(rows), batch_size):
+            batch = rows[batch_start:batch_start + batch_size]
+            cursor.executemany(insert_sql, batch)
+            pending += len(batch)
+            result["batches"] += 1
+            if result["batches"] % commit_every == 0:
+                connection.commit()
+                result["loaded"] += pending
+                progress(pending)
+                pending = 0
+        connection.commit()
+        result["loaded"] += pending
+        progress(pending)
+    except Exception as e:
+        # Only this partition's uncommitted batches are lost
+        result["status"] = "failed"
+        result["error"] = str(e)
+        if connection is not None:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+    finally:
+        if connection is not None:
+            connection.close()
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+def load_ratings_parallel(connect_factory=None, df=None, workers=4, batch_size=5000, commit_every=4):
+    """Load ratings over ``workers`` connections, one user_id-hash partition each.
+
+    Each worker commits every ``commit_every`` batches; a failing partition
+    is reported without stopping the others. Returns a summary dict, with
+    success False (and no partitions) if ``df`` is None and no connection
+    could be opened to read the anime keys.
+    """
+    connect_factory = connect_factory or get_connection
+    if df is None:
+        connection = connect_factory()
+        if connection is None:
+            print("Parallel load: no connection to read anime keys, nothing loaded")
+            return {"workers": workers, "rows": 0, "loaded": 0, "seconds": 0.0, "rows_per_second": 0.0,
+                    "partitions": [], "success": False, "error": "no connection"}
+        try:
+            keys = anime_key_set(connection)
+        finally:
+            connection.close()
+        df = read_ratings_sample(rules=Integrity.ratings_rules(keys))
+    partitions = partition_ratings(df, workers)
+    total = len(df)
+
+    lock = threading.Lock()
+    done = {"rows": 0, "reported": 0}
+    start = time.perf_counter()
+
+    def progress(rows):
+        with lock:
+            done["rows"] += rows
+            # Report roughly every 10% of the total
+            if done["rows"] - done["reported"] >= max(total // 10, 1) or done["rows"] >= total:
+                done["reported"] = done["rows"]
+                elapsed = time.perf_counter() - start
+                print(f"Progress: {done['rows']:,}/{total:,} ratings "
+                      f"({done['rows'] / elapsed:,.0f} rows/s)")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_load_partition, connect_factory, i, part,
+                                   batch_size, commit_every, progress)
+                   for i, part in enumerate(partitions)]
+        results = [future.result() for future in futures]
+
+    elapsed = time.perf_counter() - start
+    loaded = sum(r["loaded"] for r in results)
+    failed = [r for r in results if r["status"] != "success"]
+    for r in failed:
+        print(f"Partition {r['partition']} failed after {r['loaded']} rows: {r['error']}")
+    print(f"Parallel load: {loaded:,}/{total:,} ratings in {elapsed:.2f}s "
+          f"with {workers} workers ({len(failed)} failed partitions)")
+    return {
+        "workers": workers,
+        "rows": total,
+        "loaded": loaded,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(loaded / elapsed, 1) if elapsed else 0.0,
+        "partitions": results,
+        "success": not failed,
+    }
+
+# Table layouts used by the incremental loader: key columns, then value columns
+TABLES = {
+    "anime": {
+        "keys": ["anime_id"],
+        "values": ["name", "genre", "type", "episodes", "rating", "members"] + Ranking.RANKING_COLUMNS,
+    },
+    "ratings": {
+        "keys": ["user_id", "anime_id"],
+        "values": ["rating"],
+    },
+}
+
+def _dialect(connection):
+    """SQL dialect of a connection; the SQLite stand-in reports 'sqlite'"""
+    return getattr(connection, "dialect", "oracle")
+
+def _ensure_stage_table(cursor, table, dialect="oracle"):
+    """Create <table>_stage with the same columns as table, and a unique index on its key.
+
+    Without the index every MERGE/delete probe of the stage table is a full
+    scan. Both statements are skipped if the object already exists (Oracle
+    has no CREATE ... IF NOT EXISTS); any other error is raised. A stage
+    table left over from before a schema change is rebuilt.
+    """
+    created = Schema_Manager.execute_ignoring_exists(
+        cursor, f"CREATE TABLE {table}_stage AS SELECT * FROM {table} WHERE 1 = 0")
+    if not created and (Schema_Manager.table_columns(cursor, dialect, f"{table}_stage")
+                        != Schema_Manager.table_columns(cursor, dialect, table)):
+        cursor.execute(f"DROP TABLE {table}_stage")
+        cursor.execute(f"CREATE TABLE {table}_stage AS SELECT * FROM {table} WHERE 1 = 0")
+    Schema_Manager.execute_ignoring_exists(
+        cursor, f"CREATE UNIQUE INDEX {table}_stage_key ON {table}_stage ({', '.join(TABLES[table]['keys'])})")
+
+def _dedupe_on_key(rows, key_len):
+    """Keep the last row for each key so the MERGE source is unique"""
+    unique = {}
+    for row in rows:
+        unique[row[:key_len]] = row
+    return list(unique.values())
+
+def _merge_sql_oracle(table, keys, values):
+    """MERGE that only updates rows whose values changed"""
+    on = " AND ".join(f"t.{k} = s.{k}" for k in keys)
+    changed = " OR ".join(f"DECODE(t.{v}, s.{v}, 0, 1) = 1" for v in values)
+    columns = keys + values
+    return f"""
+        MERGE INTO {table} t
+        USING {table}_stage s
+        ON ({on})
+        WHEN MATCHED THEN UPDATE SET {", ".join(f"t.{v} = s.{v}" for v in values)}
+            WHERE {changed}
+        WHEN NOT MATCHED THEN INSERT ({", ".join(columns)})
+            VALUES ({", ".join(f"s.{c}" for c in columns)})
+    """
+
+def _merge_sql_sqlite(table, keys, values):
+    """UPDATE ... FROM and INSERT ... SELECT equivalent of the Oracle MERGE"""
+    on = " AND ".join(f"{table}.{k} = s.{k}" for k in keys)
+    changed = " OR ".join(f"{table}.{v} IS NOT s.{v}" for v in values)
+    columns = keys + values
+    update_sql = f"""
+        UPDATE {table} SET {", ".join(f"{v} = s.{v}" for v in values)}
+        FROM {table}_stage s
+        WHERE {on} AND ({changed})
+    """
+    insert_sql = f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        SELECT {", ".join(f"s.{c}" for c in columns)} FROM {table}_stage s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {" AND ".join(f"t.{k} = s.{k}" for k in keys)})
+    """
+    return update_sql, insert_sql
+
+def _delete_missing_sql(table, keys):
+    """DELETE rows that are no longer present in the staged data"""
+    on = " AND ".join(f"s.{k} = {table}.{k}" for k in keys)
+    return f"DELETE FROM {table} WHERE NOT EXISTS (SELECT 1 FROM {table}_stage s WHERE {on})"
+
+def stage_rows(connection, table, rows, batch_size=10000):
+    """Replace the contents of <table>_stage with rows and commit"""
+    layout = TABLES[table]
+    columns = layout["keys"] + layout["values"]
+    cursor = connection.cursor()
+    _ensure_stage_table(cursor, table, _dialect(connection))
+    cursor.execute(f"DELETE FROM {table}_stage")
+    insert_sql = (f"INSERT INTO {table}_stage ({', '.join(columns)}) "
+                  f"VALUES ({', '.join(f':{i}' for i in range(1, len(columns) + 1))})")
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(insert_sql, rows[start:start + batch_size])
+    # Staging tables are never read by the dashboard, so committing here is safe
+    connection.commit()
+
+def merge_tables(connection, tables):
+    """Apply staged changes to every table in one transaction.
+
+    Readers see either the old data or the new data, never a mix. Only
+    tables the merge actually changed get their data_version bumped, so a
+    no-op load keeps cached query results valid.
+    Returns {table: {"merged"/"updated"/"inserted", "deleted"}} row counts.
+    """
+    cursor = connection.cursor()
+    counts = {}
+    try:
+        # Parents first for upserts, children first for deletes (FK order)
+        for table in tables:
+            layout = TABLES[table]
+            if _dialect(connection) == "sqlite":
+                update_sql, insert_sql = _merge_sql_sqlite(table, layout["keys"], layout["values"])
+                cursor.execute(update_sql)
+                updated = cursor.rowcount
+                cursor.execute(insert_sql)
+                counts[table] = {"updated": updated, "inserted": cursor.rowcount}
+            else:
+                cursor.execute(_merge_sql_oracle(table, layout["keys"], layout["values"]))
+                counts[table] = {"merged": cursor.rowcount}
+        for table in reversed(tables):
+            cursor.execute(_delete_missing_sql(table, TABLES[table]["keys"]))
+            counts[table]["deleted"] = cursor.rowcount
+        changed = [table for table in tables if any(counts[table].values())]
+        if changed:
+            Schema_Manager.bump_data_version(connection, changed)
+        connection.commit()
+        return counts
+    except Exception:
+        connection.rollback()
+        raise
+
+def incremental_load(connection, anime_df=None, ratings_df=None):
+    """Stage the source data and MERGE it into anime and ratings"""
+    if anime_df is None:
+        anime_df = CSV_Reader.read_csv('anime.csv')
+        print(f"Loaded anime data: {len(anime_df)} rows")
+    anime_df = validate_rows(anime_df, Validation.ANIME_RULES, "anime")
+    # The MERGE removes anime missing from the source, so it is the key set
+    ratings_rules = Integrity.ratings_rules(Integrity.KeySet(anime_df['anime_id']))
+    if ratings_df is None:
+        ratings_df = read_ratings_sample(rules=ratings_rules)
+    else:
+        ratings_df = validate_rows(ratings_df, ratings_rules, "ratings", keep=Dedup.DEFAULT_KEEP)
+    
+    # Ranking columns follow the staged ratings, so the MERGE updates (and versions) them too
+    anime_df = Ranking.add_ranking_features(anime_df, ratings_df)
+    anime_rows = _dedupe_on_key(prepare_anime_rows(anime_df, ranking=True), 1)
+    ratings_rows = _dedupe_on_key(prepare_ratings_rows(ratings_df), 2)
+    
+    stage_rows(connection, "anime", anime_rows)
+    stage_rows(connection, "ratings", ratings_rows)
+    print(f"Staged {len(anime_rows)} anime and {len(ratings_rows)} ratings rows")
+    
+    counts = merge_tables(connection, ["anime", "ratings"])
+    for table, table_counts in counts.items():
+        changes = ", ".join(f"{k}: {v}" for k, v in table_counts.items())
+        print(f"MERGE {table}: {changes}")
+    return counts
+
+def refresh_ranking_columns(connection):
+    """Recompute anime's Ranking columns from the ratings table and commit.
+
+    One GROUP BY over ratings feeds Ranking.ranking_features, so the values
+    (and the prior) are the ones the ETL computes. Returns rows updated.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT anime_id, type FROM anime")
+    anime_df = pd.DataFrame(cursor.fetchall(), columns=["anime_id", "type"])
+    cursor.execute(f"""
+        SELECT anime_id, COUNT(rating), SUM(rating),
+               SUM(CASE WHEN rating >= {HIGH_RATING} THEN 1 ELSE 0 END)
+        FROM ratings
+        WHERE rating IS NOT NULL AND rating != -1
+        GROUP BY anime_id
+    """)
+    grouped = pd.DataFrame(cursor.fetchall(), columns=["anime_id", "count", "sum", "high"])
+    totals = Ranking.RatingTotals(anime_df['anime_id'])
+    totals.add_totals(grouped['anime_id'], grouped['count'], grouped['sum'], grouped['high'])
+    ranked = Ranking.ranking_features(anime_df, totals)
+    assignments = ", ".join(f"{column} = :{i}" for i, column in enumerate(Ranking.RANKING_COLUMNS, 1))
+    rows = [_ranking_values(row) + (int(row.anime_id),) for row in ranked.itertuples(index=False)]
+    cursor.executemany(f"UPDATE anime SET {assignments} WHERE anime_id = :{len(Ranking.RANKING_COLUMNS) + 1}",
+                       rows)
+    connection.commit()
+    return len(rows)
+
+def full_reload(connection, workers=1, index_strategy="drop", partitioned=False):
+    """Clear both tables and reload everything (original load path).
+
+    Secondary indexes are dropped (or made unusable) for the bulk insert
+    and rebuilt afterwards, partition by partition when ratings is
+    hash-partitioned; see Schema_Manager.bulk_load. Returns a dict
+    with "success" (both tables fully loaded), per-table results, the
+    parallel "partitions" results (if any) and the phase "timings".
+    """
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM ratings")
+    cursor.execute("DELETE FROM anime")
+    connection.commit()
+    print("Cleared existing data from tables")
+    
+    result = {"anime": False, "ratings": False, "partitions": None}
+    
+    def load_all():
+        result["anime"] = load_anime_data(connection)
+        if not result["anime"]:
+            # Every rating references an anime row, so there is nothing to load
+            return
+        if workers > 1:
+            parallel = load_ratings_parallel(workers=workers)
+            result["ratings"] = parallel["success"]
+            result["partitions"] = parallel["partitions"]
+        else:
+            result["ratings"] = load_ratings_data(connection)
+    
+    timings = Schema_Manager.bulk_load(connection, load_all, strategy=index_strategy,
+                                       partitioned=partitioned)
+    print(f"Ranking columns refreshed for {refresh_ranking_columns(connection)} anime")
+    # The tables were cleared, so their contents changed even on failure
+    Schema_Manager.bump_data_version(connection, ["anime", "ratings"])
+    connection.commit()
+    print(f"Timings: indexes off {timings['disable_indexes']}s, "
+          f"load {timings['load']}s, index rebuild {timings['rebuild_indexes']}s")
+    
+    result["success"] = result["anime"] and result["ratings"]
+    result["timings"] = timings
+    if not result["success"]:
+        print(f"Full reload incomplete: anime {'loaded' if result['anime'] else 'FAILED'}, "
+              f"ratings {'loaded' if result['ratings'] else 'FAILED'}")
+        if result["partitions"]:
+            committed = [r for r in result["partitions"] if r["status"] == "success"]
+            print(f"Committed partitions: {[r['partition'] for r in committed]} "
+                  f"({sum(r['loaded'] for r in result['partitions']):,} ratings committed in total)")
+    return result
+
+def main(mode="incremental", workers=1, partitions=None):
+    """Load anime and ratings; mode is 'incremental' (MERGE) or 'full'.
+
+    In full mode, ``workers > 1`` loads ratings over parallel connections.
+    ``partitions`` hash-partitions a newly created ratings table (Oracle).
+    Returns True only if the load completed and both tables hold rows.
+    """
     print("Starting data loading process...")
     connection = get_connection()
     
     if connection:
         try:
-            # Clear existing data
             cursor = connection.cursor()
-            cursor.execute("DELETE FROM ratings")
-            cursor.execute("DELETE FROM anime")
-            connection.commit()
-            print("Cleared existing data from tables")
-            
-            # Load data
-            load_anime_data(connection)
-            load_ratings_data(connection)
+            Schema_Manager.create_schema(connection, partitions=partitions)
+            if mode == "full":
+                complete = full_reload(connection, workers, partitioned=bool(partitions))["success"]
+            else:
+                # incremental_load raises on failure, leaving the tables unchanged
+                incremental_load(connection)
+                complete = True
             
             # Verify the data was loaded
             cursor.execute("SELECT COUNT(*) FROM anime")
@@ -161,18 +574,24 @@ def main():
             print(f"Anime table: {anime_count} rows")
             print(f"Ratings table: {ratings_count} rows")
             
+            if not complete:
+                print("FAILED: the load did not complete; tables hold a partial load")
+                return False
             if anime_count > 0 and ratings_count > 0:
                 print("SUCCESS! Data loading completed!")
                 print("\n READY FOR SQL ANALYSIS!")
-            else:
-                print("WARNING: Tables appear to be empty")
+                return True
+            print("WARNING: Tables appear to be empty")
+            return False
             
         except Exception as e:
             print(f"Error: {e}")
+            return False
         finally:
             connection.close()
     else:
         print("Cannot proceed without connection")
+        return False
 
 if __name__ == "__main__":
     main()
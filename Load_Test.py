@@ -0,0 +1,191 @@
+# Load_Test.py - Headless load generator for the dashboard data layer
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+import Chart_Data
+import Local_DB
+from Dashboard_Data import QUERIES, DashboardDataSource
+
+ANIME_TYPES = ["TV", "Movie", "OVA", "Special", "ONA", "Music"]
+GENRES = ["Action", "Comedy", "Drama", "Romance", "Sci-Fi", "Fantasy", "School", "Shounen"]
+
+def build_standin(db_path, ratings_rows=200000, seed=42):
+    """Create a SQLite stand-in DB from anime.csv and rating.csv (or synthetic ratings)"""
+    anime_df = pd.read_csv('anime.csv')
+    if os.path.exists('rating.csv'):
+        ratings_df = pd.read_csv('rating.csv', nrows=ratings_rows)
+    else:
+        rng = np.random.default_rng(seed)
+        ratings_df = pd.DataFrame({
+            "user_id": rng.integers(1, 70000, ratings_rows),
+            "anime_id": rng.choice(anime_df['anime_id'].to_numpy(), ratings_rows),
+            "rating": rng.integers(1, 11, ratings_rows),
+        })
+    ratings_df = ratings_df[ratings_df['rating'] != -1]
+    Local_DB.create_standin_db(db_path, anime_df, ratings_df).close()
+    return len(anime_df), len(ratings_df)
+
+def random_filters(rng):
+    """Filters an analyst might pick in the dashboard sidebar"""
+    filters = {}
+    if rng.random() < 0.5:
+        filters["anime_type"] = rng.choice(ANIME_TYPES)
+    if rng.random() < 0.3:
+        filters["genre"] = rng.choice(GENRES)
+    if rng.random() < 0.3:
+        filters["min_members"] = rng.choice([1000, 10000, 100000])
+    return filters
+
+def session_requests(rng, count):
+    """One simulated session: a page load followed by filter changes"""
+    requests = [(name, lambda src, n=name: src.fetch(n)) for name in QUERIES]
+    while len(requests) < count:
+        filters = random_filters(rng)
+        key = tuple(sorted(filters.items()))
+        requests.extend([
+            (("genre_top_n", key), lambda src, f=filters: Chart_Data.genre_top_n(src, n=15, **f)),
+            (("rating_histogram", key), lambda src, f=filters: Chart_Data.rating_histogram(src, bins=10, **f)),
+            (("members_rating_series", key), lambda src, f=filters: Chart_Data.members_rating_series(src, 500, **f)),
+            (("raw_sample", key), lambda src, f=filters: Chart_Data.raw_sample(src, "anime", 10, **f)),
+        ])
+    return requests[:count]
+
+def _percentiles(latencies):
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2)}
+
+def run_load_test(db_path, sessions=20, requests_per_session=40, pool_size=1,
+                  use_cache=False, think_time=0.0, seed=42):
+    """Drive the dashboard query functions from concurrent simulated sessions.
+
+    Each session is bound to one of ``pool_size`` data sources (one connection
+    each); ``pool_size=1`` matches the dashboard's single cached connection.
+    ``use_cache`` simulates ``st.cache_data`` with a process-wide memo.
+    """
+    factory = Local_DB.ConnectionFactory(db_path)
+    # An empty storage dir: no snapshot to fall back on, so failures stay visible
+    storage_path = tempfile.mkdtemp(prefix="anime_load_test_storage_")
+    sources = [DashboardDataSource(storage_path=storage_path, connect_factory=factory)
+               for _ in range(pool_size)]
+    for source in sources:
+        source.wait_until_ready()
+
+    cache = {}
+    cache_lock = threading.Lock()
+    counters = {"hits": 0, "errors": 0}
+    latencies = []
+    per_query = {}
+    results_lock = threading.Lock()
+
+    def run_session(session_id):
+        rng = random.Random(seed + session_id)
+        source = sources[session_id % pool_size]
+        for label, request in session_requests(rng, requests_per_session):
+            start = time.perf_counter()
+            try:
+                if use_cache:
+                    with cache_lock:
+                        hit = label in cache
+                        if hit:
+                            counters["hits"] += 1
+                    if not hit:
+                        result = request(source)
+                        with cache_lock:
+                            cache[label] = result
+                else:
+                    request(source)
+            except Exception:
+                with results_lock:
+                    counters["errors"] += 1
+            elapsed = time.perf_counter() - start
+            name = label if isinstance(label, str) else label[0]
+            with results_lock:
+                latencies.append(elapsed)
+                per_query.setdefault(name, []).append(elapsed)
+            if think_time:
+                time.sleep(rng.uniform(0, think_time))
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(run_session, range(sessions)))
+    wall = time.perf_counter() - wall_start
+
+    # fetch() answers a failed live query from the snapshot instead of raising
+    fallbacks = sum(source.live_query_failures for source in sources)
+    queries_run = sum(source.queries_run for source in sources)
+    lock_wait = sum(source.lock_wait_seconds for source in sources)
+    for source in sources:
+        if source.connection is not None:
+            source.connection.close()
+
+    return {
+        "sessions": sessions,
+        "pool_size": pool_size,
+        "use_cache": use_cache,
+        "requests": len(latencies),
+        "errors": counters["errors"] + fallbacks,
+        "live_query_fallbacks": fallbacks,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "latency": _percentiles(latencies),
+        "per_query": {name: _percentiles(values) for name, values in sorted(per_query.items())},
+        "contention": {
+            "connections_opened": factory.opened,
+            "db_queries": queries_run,
+            "cache_hits": counters["hits"],
+            "total_lock_wait_s": round(lock_wait, 3),
+            "avg_lock_wait_ms": round(lock_wait / queries_run * 1000, 2) if queries_run else 0.0,
+            "lock_wait_share": round(lock_wait / sum(latencies), 3) if latencies else 0.0,
+        },
+    }
+
+def print_report(report):
+    """Print a load test report to the console"""
+    print("=" * 60)
+    print(f"LOAD TEST: {report['sessions']} sessions, pool size {report['pool_size']}, "
+          f"cache {'on' if report['use_cache'] else 'off'}")
+    print("=" * 60)
+    latency = report["latency"]
+    print(f"Requests: {report['requests']:,} ({report['errors']} errors, "
+          f"{report['live_query_fallbacks']} of them live-query fallbacks) in {report['wall_seconds']}s")
+    print(f"Throughput: {report['throughput_rps']} req/s")
+    print(f"Latency: p50 {latency['p50_ms']}ms | p95 {latency['p95_ms']}ms | p99 {latency['p99_ms']}ms")
+    contention = report["contention"]
+    print(f"Connections: {contention['connections_opened']} | DB queries: {contention['db_queries']:,} "
+          f"| cache hits: {contention['cache_hits']:,}")
+    print(f"Lock wait: {contention['total_lock_wait_s']}s total, {contention['avg_lock_wait_ms']}ms avg, "
+          f"{contention['lock_wait_share']:.0%} of request time")
+    print("-" * 60)
+    for name, stats in report["per_query"].items():
+        print(f"  {name:<24} p50 {stats['p50_ms']:>8}ms  p95 {stats['p95_ms']:>8}ms  p99 {stats['p99_ms']:>8}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard data layer")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=40, help="requests per session")
+    parser.add_argument("--pool-sizes", default="1,2,4", help="comma separated pool sizes to compare")
+    parser.add_argument("--cache", action="store_true", help="simulate st.cache_data")
+    parser.add_argument("--ratings-rows", type=int, default=200000)
+    parser.add_argument("--db", default=None, help="existing stand-in DB (built if omitted)")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="anime_load_test_"), "standin.db")
+        anime_count, ratings_count = build_standin(db_path, args.ratings_rows)
+        print(f"Built stand-in DB: {anime_count:,} anime, {ratings_count:,} ratings")
+
+    for pool_size in [int(size) for size in args.pool_sizes.split(",")]:
+        print_report(run_load_test(db_path, args.sessions, args.requests, pool_size, args.cache))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Local_DB.py - SQLite stand-in for the Oracle database (tests, benchmarks, load tests)
+import re
+import sqlite3
+import threading
+import pandas as pd
+
+import Schema_Manager
+import Ranking
+
+_FETCH_FIRST = re.compile(r"FETCH\s+FIRST\s+(:?\w+)\s+ROWS?\s+ONLY", re.IGNORECASE)
+_ROWNUM_WHERE = re.compile(r"WHERE\s+ROWNUM\s*(<=|=)\s*(\d+)", re.IGNORECASE)
+_ROWNUM_AND = re.compile(r"AND\s+ROWNUM\s*(<=|=)\s*(\d+)", re.IGNORECASE)
+_FROM_DUAL = re.compile(r"\bFROM\s+dual\b", re.IGNORECASE)
+_POSITIONAL = re.compile(r":(\d+)\b")
+
+def to_sqlite(sql):
+    """Translate the Oracle dialect used in this repo to SQLite"""
+    sql = _FROM_DUAL.sub("", sql)
+    sql = _FETCH_FIRST.sub(r"LIMIT \1", sql)
+    sql = _ROWNUM_AND.sub(lambda m: f"LIMIT {m.group(2)}", sql)
+    sql = _ROWNUM_WHERE.sub(lambda m: f"LIMIT {m.group(2)}", sql)
+    return _POSITIONAL.sub(r"?\1", sql)
+
+def _width_bucket(value, low, high, buckets):
+    """SQLite implementation of Oracle's WIDTH_BUCKET"""
+    if value is None:
+        return None
+    if value < low:
+        return 0
+    if value >= high:
+        return buckets + 1
+    return int((value - low) * buckets / (high - low)) + 1
+
+class StandinCursor:
+    """Cursor wrapper that accepts the Oracle SQL used by the pipeline"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.arraysize = 100
+        self.prefetchrows = 2
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(to_sqlite(sql), params or ())
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(to_sqlite(sql), seq_of_params)
+        return self
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+class StandinConnection:
+    """Minimal oracledb-compatible connection backed by SQLite"""
+
+    dialect = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60,
+                                     isolation_level="DEFERRED")
+        self._conn.create_function("WIDTH_BUCKET", 4, _width_bucket, deterministic=True)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self):
+        return StandinCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+def connect(path):
+    """Open a stand-in connection to the SQLite database at path"""
+    return StandinConnection(path)
+
+def create_standin_db(path, anime_df, ratings_df):
+    """Create the anime/ratings tables at path and fill them from DataFrames"""
+    connection = connect(path)
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS ratings")
+    cursor.execute("DROP TABLE IF EXISTS anime")
+    # rating.csv can repeat (user_id, anime_id), so no ratings primary key here;
+    # a plain user_id index stands in for it
+    Schema_Manager.create_schema(connection, ratings_primary_key=False, indexes=False)
+
+    # Ranking columns as the loaders store them, computed from the same ratings
+    anime_cols = ['anime_id', 'name', 'genre', 'type', 'episodes', 'rating', 'members'] + Ranking.RANKING_COLUMNS
+    anime = Ranking.add_ranking_features(anime_df, ratings_df)[anime_cols]
+    for col in ['episodes', 'rating', 'members']:
+        anime[col] = pd.to_numeric(anime[col], errors='coerce')
+    anime = anime.astype(object).where(anime.notna(), None)
+    cursor.executemany(f"INSERT INTO anime ({', '.join(anime_cols)}) "
+                       f"VALUES ({', '.join(f':{i}' for i in range(1, len(anime_cols) + 1))})",
+                       list(anime.itertuples(index=False, name=None)))
+
+    ratings = ratings_df[['user_id', 'anime_id', 'rating']].astype(object)
+    ratings = ratings.where(ratings.notna(), None)
+    cursor.executemany("INSERT INTO ratings VALUES (:1, :2, :3)",
+                       list(ratings.itertuples(index=False, name=None)))
+    Schema_Manager.create_secondary_indexes(connection, ratings_primary_key=False)
+    Schema_Manager.bump_data_version(connection, ["anime", "ratings"])
+    connection.commit()
+    return connection
+
+class ConnectionFactory:
+    """Callable that opens a new stand-in connection per call (for pools and workers)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.opened += 1
+        return connect(self.path)
@@ -0,0 +1,127 @@
+# Log_Setup.py - Non-blocking logging (QueueHandler/QueueListener) with JSON run records
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DEFAULT_LOG_FILE = "etl_pipeline.log"
+DEFAULT_JSON_FILE = "etl_pipeline.jsonl"
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Extra record attributes copied into the JSON output when present
+STRUCTURED_FIELDS = ("run_id", "event", "stage", "seconds", "rows")
+
+_listener = None
+_run_id = None
+
+def set_run_id(run_id):
+    """Tag every following record with run_id (None to clear)"""
+    global _run_id
+    _run_id = run_id
+    return run_id
+
+def get_run_id():
+    return _run_id
+
+class RunContextFilter(logging.Filter):
+    """Stamp records with the current run id in the emitting thread"""
+
+    def filter(self, record):
+        if getattr(record, "run_id", None) is None:
+            record.run_id = _run_id
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and run fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+def configure_logging(log_file=DEFAULT_LOG_FILE, json_file=DEFAULT_JSON_FILE, level=logging.INFO,
+                      console=True, run_id=None):
+    """Route the root logger through a queue to file, JSON and console handlers.
+
+    Callers only enqueue records; a listener thread does the formatting and
+    disk writes. Meant to be called by entry points, once - repeated calls
+    just update the run id.
+    """
+    global _listener
+    if run_id is not None:
+        set_run_id(run_id)
+    if _listener is not None:
+        return _listener
+
+    handlers = []
+    if log_file:
+        text_handler = logging.FileHandler(log_file, encoding="utf-8")
+        text_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(text_handler)
+    if json_file:
+        json_handler = logging.FileHandler(json_file, encoding="utf-8")
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RunContextFilter())
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.queue_handler = queue_handler
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records and close the handlers"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    logging.getLogger().removeHandler(listener.queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+@contextmanager
+def stage_timer(stage, logger=None):
+    """Log a stage's start and its duration; set ``info['rows']`` inside the block"""
+    logger = logger or logging.getLogger()
+    info = {"rows": None}
+    logger.info(f"STAGE {stage}: started", extra={"event": "stage_start", "stage": stage})
+    start = time.perf_counter()
+    try:
+        yield info
+    except Exception:
+        seconds = round(time.perf_counter() - start, 3)
+        logger.error(f"STAGE {stage}: failed after {seconds}s",
+                     extra={"event": "stage_failed", "stage": stage, "seconds": seconds})
+        raise
+    seconds = round(time.perf_counter() - start, 3)
+    rows = f", {info['rows']:,} rows" if info["rows"] is not None else ""
+    logger.info(f"STAGE {stage}: completed in {seconds}s{rows}",
+                extra={"event": "stage_end", "stage": stage, "seconds": seconds, "rows": info["rows"]})
@@ -0,0 +1,126 @@
+# Output_Writer.py - Concurrent, atomic output writes with a per-run manifest
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+
+def fsync_dir(path):
+    """Make a rename in path durable (no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write(dest_path, write_fn):
+    """Write via write_fn(tmp_path) to a hidden temp file, fsync, then rename into place.
+
+    Readers see either the previous file or the complete new one, never a
+    partial write.
+    """
+    dest_dir, name = os.path.split(dest_path)
+    tmp_path = os.path.join(dest_dir, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write_fn(tmp_path)
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(dest_dir or ".")
+    return dest_path
+
+class OutputWriter:
+    """Write-behind manager for one run's outputs.
+
+    submit() runs independent writes concurrently in a thread pool. Each
+    write is expected to return a result dict with a ``status`` (as
+    LocalStorageManager does). publish() writes the run manifest, atomically,
+    only once every artifact reported success.
+    """
+
+    def __init__(self, manifest_dir, run_id=None, max_workers=4):
+        self.manifest_dir = manifest_dir
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="output")
+        self._futures = {}
+        self._seconds = {}
+        self._start = time.perf_counter()
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._executor.shutdown(wait=True)
+        return False
+
+    def _timed(self, name, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._seconds[name] = round(time.perf_counter() - start, 3)
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Schedule an artifact write; returns its future"""
+        future = self._executor.submit(self._timed, name, fn, args, kwargs)
+        self._futures[name] = future
+        return future
+
+    def record(self, name, result):
+        """Register an artifact written outside the pool (already durable)"""
+        future = Future()
+        future.set_result(result)
+        self._futures[name] = future
+        return future
+
+    def wait(self, names=None):
+        """Block until the named (default: all) writes finish; returns their results"""
+        names = names or list(self._futures)
+        results = {}
+        for name in names:
+            try:
+                results[name] = self._futures[name].result()
+            except Exception as e:
+                results[name] = {"status": "failed", "error": str(e)}
+        return results
+
+    def publish(self, extra=None):
+        """Write the run manifest after every artifact is durable"""
+        results = self.wait()
+        failed = {name: r.get("error", "unknown error") for name, r in results.items()
+                  if r.get("status") != "success"}
+        if failed:
+            logging.error(f"Run {self.run_id} not published, failed artifacts: {failed}")
+            return {"status": "failed", "error": f"failed artifacts: {', '.join(failed)}"}
+
+        wall = round(time.perf_counter() - self._start, 3)
+        manifest = {
+            "run_id": self.run_id,
+            "published": datetime.now().isoformat(),
+            "artifacts": {name: dict(r, seconds=self._seconds.get(name)) for name, r in results.items()},
+            "wall_seconds": wall,
+            "sum_write_seconds": round(sum(self._seconds.values()), 3),
+        }
+        manifest.update(extra or {})
+        path = os.path.join(self.manifest_dir, f"run_{self.run_id}.json")
+
+        def write(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2, default=str)
+
+        atomic_write(path, write)
+        logging.info(f"Published manifest {path} ({len(results)} artifacts, "
+                     f"{wall}s wall vs {manifest['sum_write_seconds']}s of writes)")
+        return {"status": "success", "path": path, "size": os.path.getsize(path)}
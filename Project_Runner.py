@@ -1,8 +1,18 @@
-# Project_Runner.py - Unified controller
+# Project_Runner.py - Unified controller (interactive menu or command line)
+#
+# Keep module-level imports to the standard library: heavy dependencies
+# (pandas, pyarrow, oracledb, streamlit) are imported by the command that
+# needs them, so `status` and `verify` start quickly.
 import os
 import sys
+import glob
+import json
+import sqlite3
+import argparse
 import importlib
 
+import Log_Setup
+
 def safe_import(module_name, function_name=None):
     """Safely import modules and handle errors"""
     try:
@@ -17,7 +27,9 @@ def safe_import(module_name, function_name=None):
         print(f"❌ Error with {module_name}: {e}")
         return None
 
-def run_load_data():
+# Each run_* returns True on success, so the command line can exit non-zero on failure
+
+def run_load_data(mode="incremental", workers=1):
     """Run data loading component"""
     print("\n" + "="*50)
     print("📥 LOADING DATA INTO DATABASE")
@@ -25,11 +37,12 @@ def run_load_data():
     
     load_data = safe_import("Load_Data", "main")
     if load_data:
-        load_data()
-    else:
-        print("Load_Data module not available")
+        return bool(load_data(mode=mode, workers=workers))
+    print("Load_Data module not available")
+    return False
 
-def run_etl_standard():
+def run_etl_standard(stream=False, workers=None, ratings_source="rating.csv", resume=False,
+                     key_filter="exact", keep="first"):
     """Run standard ETL pipeline"""
     print("\n" + "="*50)
     print("🔄 RUNNING STANDARD ETL PIPELINE")
@@ -37,9 +50,10 @@ def run_etl_standard():
     
     etl = safe_import("ETL_Pipeline", "main")
     if etl:
-        etl()
-    else:
-        print("ETL_Pipeline module not available")
+        return bool(etl(stream=stream, ratings_source=ratings_source, workers=workers, resume=resume,
+                        key_filter=key_filter, keep=keep))
+    print("ETL_Pipeline module not available")
+    return False
 
 def run_etl_enhanced():
     """Run enhanced ETL pipeline"""
@@ -49,9 +63,9 @@ def run_etl_enhanced():
     
     etl_enhanced = safe_import("ETL_Pipeline_Enhanced", "main")
     if etl_enhanced:
-        etl_enhanced()
-    else:
-        print("ETL_Pipeline_Enhanced module not available")
+        return etl_enhanced() is not False
+    print("ETL_Pipeline_Enhanced module not available")
+    return False
 
 def run_sql_analysis():
     """Run SQL analysis"""
@@ -62,8 +76,9 @@ def run_sql_analysis():
     sql_analysis = safe_import("SQL_Analysis", "run_sql_analysis")
     if sql_analysis:
         sql_analysis()
-    else:
-        print("SQL_Analysis module not available")
+        return True
+    print("SQL_Analysis module not available")
+    return False
 
 def run_cloud_integration():
     """Run cloud integration"""
@@ -75,8 +90,9 @@ def run_cloud_integration():
     if cloud:
         success_count, results = cloud()
         print(f"Cloud backup completed: {success_count} files processed")
-    else:
-        print("Cloud_Integration module not available")
+        return True
+    print("Cloud_Integration module not available")
+    return False
 
 def run_backup_check():
     """Run backup verification"""
@@ -86,9 +102,9 @@ def run_backup_check():
     
     backup_check = safe_import("Check_Backup", "check_cloud_backups")
     if backup_check:
-        backup_check()
-    else:
-        print("Check_Backup module not available")
+        return backup_check() is not False
+    print("Check_Backup module not available")
+    return False
 
 def run_dashboard():
     """Launch Streamlit dashboard"""
@@ -104,34 +120,155 @@ def run_complete_pipeline():
     print("\n" + "="*60)
     print("🚀 COMPLETE DATA ENGINEERING PIPELINE")
     print("="*60)
+    results = []
     
     # 1. Data Loading
     print("1. 📥 Loading data into database...")
-    run_load_data()
+    results.append(run_load_data())
     
     # 2. ETL Processing
     print("\n2. 🔄 Running enhanced ETL pipeline...")
-    run_etl_enhanced()
+    results.append(run_etl_enhanced())
     
     # 3. SQL Analysis
     print("\n3. 📊 Performing SQL analysis...")
-    run_sql_analysis()
+    results.append(run_sql_analysis())
     
     # 4. Cloud Backup
     print("\n4. ☁️ Backing up to cloud storage...")
-    run_cloud_integration()
+    results.append(run_cloud_integration())
     
     # 5. Backup Verification
     print("\n5. 🔍 Verifying backup integrity...")
-    run_backup_check()
+    results.append(run_backup_check())
     
     # 6. Dashboard info
     print("\n6. 📈 Visualization dashboard ready!")
     run_dashboard()
     
     print("\n" + "="*60)
-    print("✅ COMPLETE PIPELINE FINISHED!")
+    if all(results):
+        print("✅ COMPLETE PIPELINE FINISHED!")
+    else:
+        print(f"❌ PIPELINE FINISHED WITH {results.count(False)} FAILED STEP(S)")
     print("="*60)
+    return all(results)
+
+def run_verification(use_cache=True, report_path=None, timeout=None):
+    """Run the project verification checklist"""
+    verify = safe_import("Project_Verification", "verify_project_completion")
+    return bool(verify and verify(use_cache=use_cache, report_path=report_path, timeout=timeout))
+
+def _latest(pattern):
+    matches = glob.glob(pattern)
+    return max(matches, key=os.path.getmtime) if matches else None
+
+def show_status(storage_path="local_storage"):
+    """Summarize inputs, the last published run, checkpoints and the query cache"""
+    print("=" * 50)
+    print("📋 PROJECT STATUS")
+    print("=" * 50)
+    for name in ("anime.csv", "rating.csv", "etl_pipeline.log"):
+        if os.path.exists(name):
+            print(f"   • {name}: {os.path.getsize(name) / (1024 * 1024):.1f} MB")
+        else:
+            print(f"   • {name}: missing")
+
+    manifest_file = _latest(os.path.join(storage_path, "manifests", "run_*.json"))
+    if manifest_file:
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+        print(f"\nLast published run: {manifest['run_id']} ({manifest.get('published', '?')})")
+        for name, artifact in manifest.get("artifacts", {}).items():
+            records = artifact.get("records")
+            detail = f"{records:,} records" if records is not None else f"{artifact.get('size', 0):,} bytes"
+            print(f"   • {name}: {detail}")
+    else:
+        print("\nNo published ETL run yet")
+
+    checkpoint_runs = glob.glob(os.path.join(storage_path, "checkpoints", "*", "manifest.json"))
+    if checkpoint_runs:
+        with open(max(checkpoint_runs), 'r') as f:
+            stages = json.load(f).get("stages", {})
+        print(f"\nCheckpoints: {len(checkpoint_runs)} runs, latest has {', '.join(stages) or 'no stages'}")
+
+    cache_index = os.path.join(storage_path, "query_cache", "index.db")
+    if os.path.exists(cache_index):
+        index = sqlite3.connect(cache_index)
+        try:
+            entries, size = index.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+            print(f"\nQuery cache: {entries} entries, {size / (1024 * 1024):.1f} MB")
+        except sqlite3.Error:
+            pass
+        finally:
+            index.close()
+    return True
+
+RUN_COMMANDS = ("etl", "etl-enhanced", "load", "sql", "cloud", "backup-check", "all")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Project_Runner.py",
+        description="Data engineering project runner. Without a command, opens the interactive menu.")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="Run a pipeline component")
+    run.add_argument("component", choices=RUN_COMMANDS)
+    run.add_argument("--stream", action="store_true", help="etl: streaming mode over the full input")
+    run.add_argument("--workers", type=int, default=None,
+                     help="etl: shard reader processes; load: parallel connections (full mode)")
+    run.add_argument("--ratings", default="rating.csv", help="etl: rating.csv or a shard directory/glob")
+    run.add_argument("--resume", action="store_true", help="etl: reuse matching stage checkpoints")
+    run.add_argument("--key-filter", choices=("exact", "bloom"), default="exact",
+                     help="etl --stream: orphan check with exact sorted keys or a Bloom filter")
+    # Dedup.KEEP_POLICIES, spelled out so this module never imports numpy
+    run.add_argument("--keep", choices=("first", "last", "max", "min"), default="first",
+                     help="etl: which of several ratings of one anime by one user to keep "
+                          "(--stream supports 'first' only)")
+    run.add_argument("--mode", choices=("incremental", "full"), default="incremental",
+                     help="load: MERGE changes or truncate and reload")
+
+    verify = commands.add_parser("verify", help="Run the project verification checklist")
+    verify.add_argument("--json", metavar="PATH", help="Write a machine-readable report")
+    verify.add_argument("--no-cache", action="store_true", help="Re-run every check")
+    verify.add_argument("--timeout", type=float, default=None, help="Per-check timeout in seconds")
+    commands.add_parser("status", help="Show inputs, last run, checkpoints and cache")
+    history = commands.add_parser("history", help="Index etl_pipeline.log and show recent runs")
+    history.add_argument("--last", type=int, default=30, help="Runs to summarize")
+    commands.add_parser("menu", help="Interactive menu")
+    return parser
+
+def run_command(args):
+    """Dispatch a parsed command; returns a process exit code"""
+    if args.command == "status":
+        return 0 if show_status() else 1
+    if args.command == "history":
+        run_history = safe_import("Run_History", "main")
+        if run_history:
+            run_history(["--last", str(args.last)])
+        return 0
+    if args.command == "verify":
+        return 0 if run_verification(not args.no_cache, args.json, args.timeout) else 1
+
+    Log_Setup.configure_logging()
+    component = args.component
+    if component == "etl":
+        ok = run_etl_standard(stream=args.stream, workers=args.workers, ratings_source=args.ratings,
+                              resume=args.resume, key_filter=args.key_filter, keep=args.keep)
+    elif component == "etl-enhanced":
+        ok = run_etl_enhanced()
+    elif component == "load":
+        ok = run_load_data(mode=args.mode, workers=args.workers or 1)
+    elif component == "sql":
+        ok = run_sql_analysis()
+    elif component == "cloud":
+        ok = run_cloud_integration()
+    elif component == "backup-check":
+        ok = run_backup_check()
+    else:
+        ok = run_complete_pipeline()
+    return 0 if ok else 1
 
 def show_menu():
     """Display the main menu"""
@@ -150,8 +287,9 @@ def show_menu():
     print("9. ❌ Exit")
     print("="*50)
 
-def main():
-    """Main controller function"""
+def interactive():
+    """Interactive menu loop"""
+    Log_Setup.configure_logging()
     while True:
         show_menu()
         
@@ -191,5 +329,17 @@ def main():
             print(f"❌ Error: {e}")
             input("\nPress Enter to continue...")
 
+def main(argv=None):
+    """Main controller function"""
+    parser = build_parser()
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if args.command == "run" and args.component == "etl" and args.stream and args.workers:
+        parser.error("--workers applies to the in-memory ETL, not --stream "
+                     "(the streaming pipeline reads shards with one reader thread)")
+    if args.command in (None, "menu"):
+        interactive()
+        return 0
+    return run_command(args)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,23 +1,31 @@
 # Project_Verification.py
 import os
+import io
+import sys
 import json
+import time
+import hashlib
+import inspect
+import threading
 import subprocess
 from datetime import datetime
 
-def verify_project_completion():
+# Seconds each check may take before it is reported as timed out
+DEFAULT_TIMEOUT = 10.0
+CHECK_TIMEOUTS = {"Database Connection": 15.0}
+VERIFICATION_CACHE = os.path.join("local_storage", "verification_cache.json")
+# How far back check_etl_pipeline looks in etl_pipeline.log
+LOG_TAIL_BYTES = 4 * 1024 * 1024
+
+def verify_project_completion(use_cache=True, report_path=None, timeout=None):
     """Verify all project components are working"""
     print("PROJECT VERIFICATION CHECKLIST")
     print("=" * 60)
     
-    components = {
-        "Database Connection": check_database(),
-        "ETL Pipeline": check_etl_pipeline(),
-        "SQL Analysis": check_sql_analysis(),
-        "Cloud Integration": check_cloud_integration(),
-        "Dashboard": check_dashboard(),
-        "Data Files": check_data_files(),
-        "Requirements": check_requirements()
-    }
+    results = run_checks(use_cache=use_cache, timeout=timeout)
+    for result in results:
+        sys.stdout.write(result["output"])
+    components = {result["name"]: result["passed"] for result in results}
     
     print("\nVERIFICATION RESULTS:")
     print("-" * 40)
@@ -25,9 +33,15 @@ def verify_project_completion():
     total_checks = len(components)
     passed_checks = sum(1 for check in components.values() if check)
     
-    for component, status in components.items():
-        status_symbol = "[PASS]" if status else "[FAIL]"
-        print(f"{status_symbol} {component}")
+    for result in results:
+        status_symbol = "[PASS]" if result["passed"] else "[FAIL]"
+        notes = []
+        if result["status"] in ("timeout", "error"):
+            notes.append(result["status"])
+        if result["cached"]:
+            notes.append("cached")
+        suffix = f" ({', '.join(notes)})" if notes else ""
+        print(f"{status_symbol} {result['name']:<20} {result['seconds']:6.2f}s{suffix}")
     
     print("-" * 40)
     print(f"Overall: {passed_checks}/{total_checks} checks passed")
@@ -37,8 +51,158 @@ def verify_project_completion():
     else:
         print("Some components need attention")
     
+    if report_path:
+        write_report(results, report_path)
+        print(f"Report written to {report_path}")
+    
     return passed_checks == total_checks
 
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout proxy that sends each check thread's prints to its own buffer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def write(self, text):
+        buffer = self.buffers.get(threading.get_ident())
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def _fingerprint(check, inputs):
+    """Hash of the check's code and the size/mtime of its input files"""
+    state = [inspect.getsource(check)]
+    for path in inputs:
+        try:
+            info = os.stat(path)
+            state.append([path, info.st_size, info.st_mtime_ns])
+        except OSError:
+            state.append([path, None])
+    return hashlib.sha256(json.dumps(state).encode("utf-8")).hexdigest()
+
+def _load_cache(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache, path):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def run_checks(checks=None, use_cache=True, timeout=None, cache_path=VERIFICATION_CACHE):
+    """Run checks concurrently, each with its own timeout.
+
+    Checks with declared input files are cached on those files' size and
+    mtime (and the check's code); checks without inputs always run.
+    Returns one result dict per check, in registry order.
+    """
+    checks = checks or CHECKS
+    cache = _load_cache(cache_path) if use_cache else {}
+    results = {}
+    pending = []
+    output = _ThreadOutput(sys.stdout)
+
+    for name, check, inputs in checks:
+        key = _fingerprint(check, inputs) if inputs is not None else None
+        cached = cache.get(name)
+        if key and cached and cached.get("key") == key:
+            results[name] = dict(cached["result"], cached=True)
+            continue
+        buffer = io.StringIO()
+        outcome = {}
+
+        def target(check=check, buffer=buffer, outcome=outcome):
+            output.buffers[threading.get_ident()] = buffer
+            start = time.perf_counter()
+            try:
+                outcome["passed"] = bool(check())
+            except Exception as e:
+                outcome["error"] = str(e)
+            outcome["seconds"] = round(time.perf_counter() - start, 3)
+
+        thread = threading.Thread(target=target, name=f"verify-{name}", daemon=True)
+        pending.append((name, key, thread, buffer, outcome,
+                        timeout or CHECK_TIMEOUTS.get(name, DEFAULT_TIMEOUT)))
+
+    original_stdout = sys.stdout
+    sys.stdout = output
+    try:
+        started = time.perf_counter()
+        for _, _, thread, _, _, _ in pending:
+            thread.start()
+        for name, key, thread, buffer, outcome, limit in pending:
+            # Hung checks are daemon threads: they are abandoned, not joined
+            thread.join(max(0.0, started + limit - time.perf_counter()))
+            if thread.is_alive():
+                status, passed = "timeout", False
+                buffer.write(f"{name}: Timed out after {limit:.0f}s\n")
+            elif "error" in outcome:
+                status, passed = "error", False
+                buffer.write(f"{name}: Check raised {outcome['error']}\n")
+            else:
+                status, passed = ("pass" if outcome["passed"] else "fail"), outcome["passed"]
+            results[name] = {
+                "name": name,
+                "status": status,
+                "passed": passed,
+                "seconds": outcome.get("seconds", limit),
+                "output": buffer.getvalue(),
+                "cached": False,
+            }
+            if key and status in ("pass", "fail"):
+                cache[name] = {"key": key, "result": results[name]}
+    finally:
+        sys.stdout = original_stdout
+
+    if use_cache and pending:
+        _save_cache(cache, cache_path)
+    return [results[name] for name, _, _ in checks]
+
+def write_report(results, path):
+    """Write a machine-readable verification report"""
+    report = {
+        "generated": datetime.now().isoformat(),
+        "passed": sum(1 for r in results if r["passed"]),
+        "total": len(results),
+        "all_passed": all(r["passed"] for r in results),
+        "checks": [dict({k: r[k] for k in ("name", "status", "passed", "seconds", "cached")},
+                        output=r["output"].strip()) for r in results],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def reverse_lines(path, block_size=64 * 1024, max_bytes=LOG_TAIL_BYTES):
+    """Yield a text file's lines from the end, reading at most max_bytes"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        limit = max(0, position - max_bytes)
+        remainder = b""
+        while position > limit:
+            step = min(block_size, position - limit)
+            position -= step
+            f.seek(position)
+            chunk = f.read(step) + remainder
+            lines = chunk.split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", errors="replace")
+        if remainder and limit == 0:
+            yield remainder.decode("utf-8", errors="replace")
+
 def check_database():
     """Check if database is accessible"""
     try:
@@ -46,8 +210,9 @@ def check_database():
         connection = oracledb.connect(
             user=os.getenv('DB_USER', 'system'),
             password=os.getenv('DB_PASSWORD', ''),
-            dsn=os.getenv('DB_DSN', 'YOUR_DSN_HERE')
-)
+            dsn=os.getenv('DB_DSN', 'YOUR_DSN_HERE'),
+            tcp_connect_timeout=5
+        )
         cursor = connection.cursor()
         cursor.execute("SELECT COUNT(*) FROM anime")
         anime_count = cursor.fetchone()[0]
@@ -68,18 +233,13 @@ def check_etl_pipeline():
             print(f"ETL Pipeline: Missing {file}")
             return False
     
-    # Check if ETL has run successfully
-    if os.path.exists('etl_pipeline.log'):
-        with open('etl_pipeline.log', 'r', encoding='utf-8') as f:
-            log_content = f.read()
-            if "ETL Pipeline completed successfully" in log_content:
-                print("ETL Pipeline: Successfully executed")
-                return True
-            else:
-                print("ETL Pipeline: Log exists but no success message")
-                return False
-    print("ETL Pipeline: All files present")
-    return True
+    # Check if ETL has run successfully; only the log tail is read
+    for line in reverse_lines('etl_pipeline.log'):
+        if "ETL Pipeline completed successfully" in line:
+            print("ETL Pipeline: Successfully executed")
+            return True
+    print("ETL Pipeline: Log exists but no success message")
+    return False
 
 def check_sql_analysis():
     """Check SQL analysis component"""
@@ -182,6 +342,17 @@ def check_requirements():
         print("Requirements: File missing")
         return False
 
+# (name, check, input files for caching - None means always run)
+CHECKS = [
+    ("Database Connection", check_database, None),
+    ("ETL Pipeline", check_etl_pipeline, ['ETL_Pipeline.py', 'etl_pipeline.log']),
+    ("SQL Analysis", check_sql_analysis, ['SQL_Analysis.py']),
+    ("Cloud Integration", check_cloud_integration, None),
+    ("Dashboard", check_dashboard, ['Anime_Dashboard.py']),
+    ("Data Files", check_data_files, ['anime.csv', 'rating.csv']),
+    ("Requirements", check_requirements, ['requirements.txt'])
+]
+
 def check_cloud_backups_detailed():
     """Detailed check of cloud backups"""
     print("\n" + "=" * 50)
@@ -269,11 +440,19 @@ def generate_submission_checklist():
     print("=" * 60)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Verify project components")
+    parser.add_argument("--json", metavar="PATH", help="Write a machine-readable report")
+    parser.add_argument("--no-cache", action="store_true", help="Re-run every check")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-check timeout in seconds")
+    args = parser.parse_args()
+    
     # Run verification
     print("PROJECT COMPLETION VERIFICATION")
     print("=" * 60)
     
-    all_passed = verify_project_completion()
+    all_passed = verify_project_completion(use_cache=not args.no_cache, report_path=args.json,
+                                           timeout=args.timeout)
     
     # Detailed cloud analysis
     check_cloud_backups_detailed()
@@ -0,0 +1,206 @@
+# Query_Cache.py - Persistent, size-bounded query result cache shared across processes
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import Schema_Manager
+from Arrow_Query import fetch_arrow, arrow_to_pandas
+
+_TABLE_NAMES = re.compile(r"\b(anime|ratings)\b", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+INDEX_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        sql TEXT,
+        bytes INTEGER NOT NULL,
+        created REAL NOT NULL,
+        last_access REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS entries_last_access_idx ON entries (last_access)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+def normalize_sql(sql):
+    """Collapse whitespace so formatting differences share a cache entry"""
+    return _WHITESPACE.sub(" ", sql).strip().rstrip(";")
+
+def referenced_tables(sql):
+    return sorted({name.lower() for name in _TABLE_NAMES.findall(sql)})
+
+def cache_key(sql, params, versions):
+    """Hash of normalized SQL, bind values and the data versions it depends on"""
+    payload = json.dumps({
+        "sql": normalize_sql(sql),
+        "params": params if params is not None else None,
+        "versions": versions,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class QueryCache:
+    """Disk-backed cache of query results: parquet files plus a SQLite index.
+
+    Entries are keyed by normalized SQL, bind values and the ``data_version``
+    of every table the query references, so a load invalidates them without
+    any explicit purge. The cache is bounded by ``max_bytes`` with LRU
+    eviction and is safe to share between processes.
+    """
+
+    def __init__(self, cache_dir="local_storage/query_cache", max_bytes=256 * 1024 * 1024,
+                 version_ttl=5.0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version_ttl = version_ttl
+        self._versions = None
+        self._versions_read = 0.0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, "index.db")
+        with self._index() as index:
+            for ddl in INDEX_DDL:
+                index.execute(ddl)
+
+    def _index(self):
+        index = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        index.execute("PRAGMA journal_mode=WAL")
+        return _ClosingIndex(index)
+
+    def _count(self, index, name, amount=1):
+        index.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                      "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                      (name, amount))
+
+    def data_versions(self, connection):
+        """Current table versions, re-read at most every ``version_ttl`` seconds.
+
+        Tables missing from the result have no known version (e.g. the
+        schema predates data_version) and are never cached.
+        """
+        now = time.monotonic()
+        if self._versions is None or now - self._versions_read > self.version_ttl:
+            self._versions = Schema_Manager.read_data_versions(connection)
+            self._versions_read = now
+        return self._versions
+
+    def get(self, key):
+        """Return the cached Arrow table for key, or None"""
+        with self._index() as index:
+            row = index.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(row[0]):
+                self._count(index, "misses")
+                return None
+            index.execute("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                          (time.time(), key))
+            self._count(index, "hits")
+        try:
+            return pq.read_table(row[0], memory_map=True)
+        except (OSError, pa.ArrowInvalid):
+            # Evicted by another process between lookup and read
+            return None
+
+    def put(self, key, table, sql=None):
+        """Store an Arrow table under key and evict old entries if over budget"""
+        path = os.path.join(self.cache_dir, f"{key}.parquet")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._index() as index:
+            index.execute("INSERT OR REPLACE INTO entries (key, path, sql, bytes, created, last_access) "
+                          "VALUES (?, ?, ?, ?, ?, ?)",
+                          (key, path, normalize_sql(sql) if sql else None, os.path.getsize(path), now, now))
+            self._evict(index)
+
+    def _evict(self, index):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        total = index.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, path, size in index.execute(
+                "SELECT key, path, bytes FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            index.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._count(index, "evictions", evicted)
+
+    def fetch_arrow(self, connection, sql, params=None):
+        """Arrow table for the query, served from cache when the data is unchanged.
+
+        Queries referencing no versioned table (e.g. only data_version or the
+        data dictionary), or a table with no recorded data_version, bypass
+        the cache: nothing would ever invalidate the entry.
+        """
+        versions = self.data_versions(connection)
+        tables = {t: versions.get(t) for t in referenced_tables(sql)}
+        if not tables or any(version is None for version in tables.values()):
+            return fetch_arrow(connection, sql, params)
+        key = cache_key(sql, params, tables)
+        table = self.get(key)
+        if table is None:
+            table = fetch_arrow(connection, sql, params)
+            try:
+                self.put(key, table, sql)
+            except Exception as e:
+                logging.error(f"Failed to cache query result: {e}")
+        return table
+
+    def fetch_dataframe(self, connection, sql, params=None):
+        """Cached equivalent of Arrow_Query.fetch_dataframe"""
+        return arrow_to_pandas(self.fetch_arrow(connection, sql, params))
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size, across all processes"""
+        with self._index() as index:
+            counters = dict(index.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = index.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._index() as index:
+            for (path,) in index.execute("SELECT path FROM entries").fetchall():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            index.execute("DELETE FROM entries")
+
+class _ClosingIndex:
+    """Context manager that closes the SQLite index connection on exit"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __enter__(self):
+        return self.index
+
+    def __exit__(self, *exc):
+        self.index.close()
+        return False
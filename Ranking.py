@@ -0,0 +1,102 @@
+# Ranking.py - Per-anime ranking features (Bayesian weighted rating, Wilson bound, type percentile)
+import logging
+import numpy as np
+
+from Group_Aggregate import HIGH_RATING
+
+# z of the 95% confidence Wilson interval
+DEFAULT_Z = 1.96
+RANKING_COLUMNS = ["ratings_count", "ratings_mean", "weighted_rating",
+                   "high_rating_lower_bound", "type_percentile"]
+
+class RatingTotals:
+    """Per-anime rating count, sum and high-rating count, accumulated in one pass.
+
+    Arrays are aligned with ``anime_ids``; add() takes the whole ratings
+    frame or one streamed chunk at a time. Unrated (-1) and unknown
+    anime_ids are ignored.
+    """
+
+    def __init__(self, anime_ids):
+        self.anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        self._order = np.argsort(self.anime_ids, kind="stable")
+        self._sorted_ids = self.anime_ids[self._order]
+        size = len(self.anime_ids)
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.sums = np.zeros(size, dtype=np.float64)
+        self.high = np.zeros(size, dtype=np.int64)
+
+    def add(self, ratings_df):
+        if not len(self._sorted_ids):
+            return
+        ids = ratings_df['anime_id'].to_numpy(dtype=np.int64)
+        ratings = ratings_df['rating'].to_numpy(dtype=np.float64)
+        rated = ~np.isnan(ratings) & (ratings != -1)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        known = rated & (self._sorted_ids[positions] == ids)
+        index = self._order[positions[known]]
+        values = ratings[known]
+        size = len(self.anime_ids)
+        self.counts += np.bincount(index, minlength=size)
+        self.sums += np.bincount(index, weights=values, minlength=size)
+        self.high += np.bincount(index, weights=values >= HIGH_RATING, minlength=size).astype(np.int64)
+
+    def add_totals(self, anime_ids, counts, sums, high):
+        """Add per-anime totals aggregated elsewhere (e.g. a GROUP BY); unknown anime_ids are ignored"""
+        ids = np.asarray(anime_ids, dtype=np.int64)
+        if not len(self._sorted_ids) or not len(ids):
+            return
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        known = self._sorted_ids[positions] == ids
+        index = self._order[positions[known]]
+        np.add.at(self.counts, index, np.asarray(counts, dtype=np.int64)[known])
+        np.add.at(self.sums, index, np.asarray(sums, dtype=np.float64)[known])
+        np.add.at(self.high, index, np.asarray(high, dtype=np.int64)[known])
+
+def wilson_lower_bound(successes, trials, z=DEFAULT_Z):
+    """Lower bound of the Wilson score interval for successes/trials (0 where trials == 0)"""
+    successes = np.asarray(successes, dtype=np.float64)
+    trials = np.asarray(trials, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = successes / trials
+        z2 = z * z
+        bound = (p + z2 / (2 * trials)
+                 - z * np.sqrt(p * (1 - p) / trials + z2 / (4 * trials * trials))) / (1 + z2 / trials)
+    return np.where(trials > 0, bound, 0.0)
+
+def bayesian_average(means, counts, prior_mean, prior_votes):
+    """IMDb-style weighted rating: v/(v+m)*R + m/(v+m)*C (C where there are no votes)"""
+    counts = np.asarray(counts, dtype=np.float64)
+    means = np.nan_to_num(np.asarray(means, dtype=np.float64), nan=prior_mean)
+    return (counts * means + prior_votes * prior_mean) / (counts + prior_votes)
+
+def ranking_features(anime_df, totals, prior_votes=None, z=DEFAULT_Z):
+    """anime_df with RANKING_COLUMNS added from RatingTotals aligned to its rows.
+
+    The prior mean C is the mean of all counted ratings; the prior weight m
+    defaults to the median count among rated anime.
+    """
+    counts = totals.counts
+    rated = counts > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(rated, totals.sums / counts, np.nan)
+    prior_mean = float(totals.sums.sum() / counts.sum()) if counts.sum() else 0.0
+    if prior_votes is None:
+        prior_votes = max(float(np.median(counts[rated])), 1.0) if rated.any() else 1.0
+
+    ranked = anime_df.copy()
+    ranked['ratings_count'] = counts
+    ranked['ratings_mean'] = means
+    ranked['weighted_rating'] = bayesian_average(means, counts, prior_mean, prior_votes)
+    ranked['high_rating_lower_bound'] = wilson_lower_bound(totals.high, counts, z)
+    ranked['type_percentile'] = (ranked.groupby(ranked['type'].fillna('Unknown'))['weighted_rating']
+                                 .rank(pct=True))
+    logging.info(f"Ranking features: {int(rated.sum())} rated anime, prior mean {prior_mean:.3f}, "
+                 f"prior weight {prior_votes:g} ratings")
+    return ranked
+
+def add_ranking_features(anime_df, ratings_df, prior_votes=None, z=DEFAULT_Z):
+    """Ranking features for anime_df from an in-memory ratings frame"""
+    totals = RatingTotals(anime_df['anime_id'])
+    totals.add(ratings_df)
+    return ranking_features(anime_df, totals, prior_votes, z)
@@ -0,0 +1,257 @@
+# Run_History.py - Incremental indexer from etl_pipeline.log into a SQLite run-history table
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime
+
+DEFAULT_LOG = "etl_pipeline.log"
+DEFAULT_DB = os.path.join("local_storage", "run_history.db")
+STAGES = ("extract", "transform", "load")
+# Bytes at the start of the log compared to detect rotation/truncation
+HEAD_BYTES = 256
+
+# '2026-03-14 16:17:41,555 - INFO - message' (Log_Setup.TEXT_FORMAT)
+LINE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (.*)$")
+EXTRACTED = re.compile(r"Extracted (\d+) (anime|ratings) records(?: \(sampled from (\d+) total\))?")
+TRANSFORMED = re.compile(r"Transformed (\d+) (anime|ratings) records")
+STAGE_DONE = re.compile(r"STAGE (\w+): completed in ([\d.]+)s")
+STREAM_TOTAL = re.compile(r"STREAM: ([\d,]+) ratings in ([\d.]+)s")
+PHASE_MARKERS = {"EXTRACT:": "extract", "TRANSFORM:": "transform", "LOAD:": "load"}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started TEXT NOT NULL UNIQUE,
+        finished TEXT,
+        status TEXT NOT NULL,
+        mode TEXT,
+        anime_records INTEGER,
+        ratings_records INTEGER,
+        ratings_source_records INTEGER,
+        anime_transformed INTEGER,
+        ratings_transformed INTEGER,
+        extract_seconds REAL,
+        transform_seconds REAL,
+        load_seconds REAL,
+        total_seconds REAL,
+        errors INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS runs_status_idx ON runs (status, started)",
+    """
+    CREATE TABLE IF NOT EXISTS index_state (
+        log_path TEXT PRIMARY KEY,
+        inode INTEGER,
+        head_hash TEXT,
+        offset INTEGER NOT NULL,
+        open_run TEXT
+    )
+    """,
+]
+
+def _parse_time(stamp):
+    return datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S,%f")
+
+def _head_hash(path, length):
+    """Hash of the first ``length`` bytes, to recognise the same file after it grows"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+class RunParser:
+    """Turns log lines into run records; ``run`` holds the run still in progress"""
+
+    def __init__(self, open_run=None):
+        self.run = open_run
+        self.finished = []
+
+    def _close(self, status, stamp=None):
+        run = self.run
+        run["status"] = status
+        if stamp:
+            run["finished"] = stamp
+            end = _parse_time(stamp)
+            run["total_seconds"] = round((end - _parse_time(run["started"])).total_seconds(), 3)
+            # Phase durations from marker timestamps unless a STAGE line gave them
+            phases = run.pop("phase_starts", {})
+            bounds = sorted(phases.items(), key=lambda item: item[1]) + [("end", stamp)]
+            for (stage, begin), (_, until) in zip(bounds, bounds[1:]):
+                key = f"{stage}_seconds"
+                if run.get(key) is None:
+                    run[key] = round((_parse_time(until) - _parse_time(begin)).total_seconds(), 3)
+        run.pop("phase_starts", None)
+        self.finished.append(run)
+        self.run = None
+
+    def feed(self, stamp, level, message):
+        if "Starting ETL Pipeline" in message:
+            if self.run is not None:
+                self._close("incomplete")
+            self.run = {"started": stamp, "status": "running", "mode": "batch", "errors": 0,
+                        "phase_starts": {}}
+            return
+        run = self.run
+        if run is None:
+            return
+        if level in ("ERROR", "CRITICAL"):
+            run["errors"] += 1
+            run["last_error"] = message[:500]
+        for marker, stage in PHASE_MARKERS.items():
+            if message.startswith(marker):
+                run["phase_starts"].setdefault(stage, stamp)
+        match = EXTRACTED.search(message)
+        if match:
+            run[f"{match.group(2)}_records"] = int(match.group(1))
+            if match.group(3):
+                run["ratings_source_records"] = int(match.group(3))
+        match = TRANSFORMED.search(message)
+        if match:
+            run[f"{match.group(2)}_transformed"] = int(match.group(1))
+        match = STAGE_DONE.search(message)
+        if match and match.group(1) in STAGES:
+            run[f"{match.group(1)}_seconds"] = float(match.group(2))
+        match = STREAM_TOTAL.search(message)
+        if match:
+            run["mode"] = "streaming"
+            run["ratings_records"] = int(match.group(1).replace(",", ""))
+        if "ETL Pipeline completed successfully" in message:
+            self._close("success", stamp)
+        elif "ETL Pipeline failed" in message:
+            self._close("failed", stamp)
+
+    def feed_line(self, line):
+        match = LINE.match(line)
+        if match:
+            self.feed(*match.groups())
+
+class RunHistory:
+    """Run-history table kept in step with the log by reading only new bytes"""
+
+    def __init__(self, db_path=DEFAULT_DB, log_path=DEFAULT_LOG):
+        self.db_path = db_path
+        self.log_path = log_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        for ddl in SCHEMA:
+            self.connection.execute(ddl)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def _state(self):
+        row = self.connection.execute(
+            "SELECT inode, head_hash, offset, open_run FROM index_state WHERE log_path = ?",
+            (os.path.abspath(self.log_path),)).fetchone()
+        if row is None:
+            return None, None, 0, None
+        inode, head_hash, offset, open_run = row
+        return inode, head_hash, offset, json.loads(open_run) if open_run else None
+
+    def _read_from(self, path, offset, parser):
+        """Feed complete lines after offset to parser; returns the new offset"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                offset += len(raw)
+                parser.feed_line(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        return offset
+
+    def _rotated_predecessor(self, inode):
+        """The rotated file (etl_pipeline.log.1, ...) that still has our old inode"""
+        directory = os.path.dirname(os.path.abspath(self.log_path))
+        base = os.path.basename(self.log_path)
+        for name in sorted(os.listdir(directory)):
+            if name.startswith(base + ".") and name != base:
+                path = os.path.join(directory, name)
+                if os.stat(path).st_ino == inode:
+                    return path
+        return None
+
+    def index(self):
+        """Index log lines appended since the last call; returns the number of runs added"""
+        if not os.path.exists(self.log_path):
+            return 0
+        inode, head_hash, offset, open_run = self._state()
+        info = os.stat(self.log_path)
+        parser = RunParser(open_run)
+
+        same_file = (inode == info.st_ino and offset <= info.st_size
+                     and head_hash == _head_hash(self.log_path, offset))
+        if inode is not None and not same_file:
+            # Rotated or truncated: finish the old file if it was renamed, then start over
+            previous = self._rotated_predecessor(inode)
+            if previous:
+                self._read_from(previous, offset, parser)
+            offset = 0
+        offset = self._read_from(self.log_path, offset, parser)
+
+        with self.connection:
+            for run in parser.finished:
+                columns = sorted(run)
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO runs ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})",
+                    [run[c] for c in columns])
+            self.connection.execute(
+                "INSERT OR REPLACE INTO index_state (log_path, inode, head_hash, offset, open_run) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(self.log_path), info.st_ino, _head_hash(self.log_path, offset), offset,
+                 json.dumps(parser.run) if parser.run else None))
+        return len(parser.finished)
+
+    def recent_runs(self, limit=30):
+        """Newest runs first, as dicts"""
+        cursor = self.connection.execute(
+            "SELECT * FROM runs ORDER BY started DESC LIMIT ?", (limit,))
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def stage_stats(self, last=30, status="success"):
+        """Average/min/max seconds per stage over the last runs with status"""
+        stats = {}
+        for stage in STAGES + ("total",):
+            column = f"{stage}_seconds"
+            row = self.connection.execute(
+                f"SELECT COUNT({column}), AVG({column}), MIN({column}), MAX({column}) FROM "
+                f"(SELECT {column} FROM runs WHERE status = ? ORDER BY started DESC LIMIT ?)",
+                (status, last)).fetchone()
+            stats[stage] = dict(zip(("runs", "avg", "min", "max"), row))
+        return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index etl_pipeline.log into run history")
+    parser.add_argument("--log", default=DEFAULT_LOG)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--last", type=int, default=30, help="Runs to summarize")
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.db, args.log)
+    try:
+        added = history.index()
+        print(f"Indexed {added} new runs from {args.log}")
+        print(f"\n{'started':<24} {'status':<10} {'mode':<9} {'ratings':>10} "
+              f"{'extract':>8} {'transform':>9} {'load':>7} {'total':>7} {'errors':>6}")
+        for run in history.recent_runs(args.last):
+            def secs(value):
+                return f"{value:.2f}" if value is not None else "-"
+            print(f"{run['started']:<24} {run['status']:<10} {run['mode'] or '-':<9} "
+                  f"{run['ratings_records'] or 0:>10,} {secs(run['extract_seconds']):>8} "
+                  f"{secs(run['transform_seconds']):>9} {secs(run['load_seconds']):>7} "
+                  f"{secs(run['total_seconds']):>7} {run['errors']:>6}")
+        print(f"\nStage seconds over the last {args.last} successful runs:")
+        for stage, s in history.stage_stats(args.last).items():
+            if s["runs"]:
+                print(f"   • {stage:<9} avg {s['avg']:.2f}s  min {s['min']:.2f}s  "
+                      f"max {s['max']:.2f}s  ({s['runs']} runs)")
+    finally:
+        history.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Sampling.py - Deterministic, hash-based ratings samples shared by the ETL and DB loaders
+import numpy as np
+import pandas as pd
+
+import Shard_Input
+import CSV_Reader
+import Integrity
+import Dedup
+
+DEFAULT_SEED = 42
+# "pair": each (user_id, anime_id) rating on its own; "user": all of a user's ratings or none
+SAMPLE_KEYS = ("pair", "user")
+DEFAULT_BY = "pair"
+_GOLDEN = 0x9E3779B97F4A7C15
+
+def mix64(keys, seed=DEFAULT_SEED):
+    """splitmix64 of int64 keys: a bijection, so distinct keys never collide"""
+    # The seed advances the generator's state by whole golden-ratio steps
+    return Integrity.mix64(np.asarray(keys, dtype=np.int64), (seed * _GOLDEN) % 2 ** 64)
+
+def row_hashes(df, by=DEFAULT_BY, seed=DEFAULT_SEED):
+    """Sampling hash of each rating; depends only on its key, never on the file"""
+    if by == "pair":
+        keys = Dedup.pack_keys(df['user_id'].to_numpy(dtype=np.int64), df['anime_id'].to_numpy(dtype=np.int64))
+    elif by == "user":
+        keys = df['user_id'].to_numpy(dtype=np.int64)
+    else:
+        raise ValueError(f"by must be one of {SAMPLE_KEYS}, got {by!r}")
+    return mix64(keys, seed)
+
+def _threshold(fraction):
+    return np.uint64(min(int(fraction * 2.0 ** 64), 2 ** 64 - 1))
+
+def fraction_mask(df, fraction, by=DEFAULT_BY, seed=DEFAULT_SEED):
+    """Rows whose hash falls in the lowest ``fraction`` of the hash space"""
+    return row_hashes(df, by, seed) < _threshold(fraction)
+
+class HashSampler:
+    """Chunk-by-chunk sample: a hash ``fraction`` or the ``n`` lowest hashes.
+
+    Inclusion depends only on a row's key and the seed, so the same ratings
+    are chosen whatever the chunking, and a smaller n (or fraction) picks a
+    subset of a larger one. With by="user" and n, the user at the cut-off
+    may be partly included.
+    """
+
+    def __init__(self, n=None, fraction=None, by=DEFAULT_BY, seed=DEFAULT_SEED):
+        if (n is None) == (fraction is None):
+            raise ValueError("Give exactly one of n or fraction")
+        self.n = n
+        self.fraction = fraction
+        self.by = by
+        self.seed = seed
+        self.rows_seen = 0
+        self._chunks = []
+        self._hashes = []
+        self._order = []
+
+    def add(self, chunk):
+        hashes = row_hashes(chunk, self.by, self.seed)
+        arrival = np.arange(self.rows_seen, self.rows_seen + len(chunk), dtype=np.int64)
+        self.rows_seen += len(chunk)
+        if self.fraction is not None:
+            keep = hashes < _threshold(self.fraction)
+        elif len(chunk) > self.n:
+            # Candidates that could still be in the n lowest; ties are all kept
+            keep = hashes <= np.partition(hashes, self.n - 1)[self.n - 1]
+        else:
+            keep = np.ones(len(chunk), dtype=bool)
+        self._chunks.append(chunk[keep])
+        self._hashes.append(hashes[keep])
+        self._order.append(arrival[keep])
+        if self.n is not None and sum(len(h) for h in self._hashes) > 2 * self.n:
+            self._compact()
+
+    def _compact(self):
+        """Sort candidates by (hash, arrival) and keep the n lowest"""
+        chunk = pd.concat(self._chunks, ignore_index=True)
+        hashes = np.concatenate(self._hashes)
+        order = np.concatenate(self._order)
+        # Equal hashes (repeated pairs) resolve by arrival, for a stable cut-off
+        lowest = np.lexsort((order, hashes))[:self.n]
+        self._chunks = [chunk.iloc[lowest].reset_index(drop=True)]
+        self._hashes = [hashes[lowest]]
+        self._order = [order[lowest]]
+
+    def result(self):
+        """The sample, in hash order"""
+        if not self._chunks:
+            return pd.DataFrame()
+        self._compact()
+        return self._chunks[0]
+
+def sample_frame(df, n=None, fraction=None, by=DEFAULT_BY, seed=DEFAULT_SEED):
+    """Sample an in-memory frame (n larger than the frame returns all rows)"""
+    sampler = HashSampler(n=n, fraction=fraction, by=by, seed=seed)
+    sampler.add(df)
+    return sampler.result()
+
+def sample_source(source, n=None, fraction=None, by=DEFAULT_BY, seed=DEFAULT_SEED,
+                  block_size=CSV_Reader.DEFAULT_BLOCK_SIZE):
+    """Sample rating.csv or shards block by block; returns (sample, rows read).
+
+    Memory holds at most about 2n sampled rows plus one block, never the
+    whole file.
+    """
+    sampler = HashSampler(n=n, fraction=fraction, by=by, seed=seed)
+    for chunk in Shard_Input.iter_chunks(source, block_size):
+        sampler.add(chunk)
+    return sampler.result(), sampler.rows_seen
@@ -0,0 +1,283 @@
+# Schema_Manager.py - DDL and index management for the anime/ratings tables
+import time
+import logging
+
+# Secondary indexes used by the dashboard and SQL_Analysis joins/aggregates. user_id
+# lookups use the ratings primary key (user_id, anime_id), whose leading column it is
+SECONDARY_INDEXES = {
+    "ratings_anime_id_idx": ("ratings", "anime_id"),
+    "anime_type_idx": ("anime", "type"),
+    "anime_weighted_rating_idx": ("anime", "weighted_rating"),
+}
+# Ranking.RANKING_COLUMNS, stored on anime so queries sort without re-aggregating
+# ratings: name -> (Oracle type, SQLite type)
+RANKING_COLUMN_TYPES = {
+    "ratings_count": ("NUMBER(10)", "INTEGER"),
+    "ratings_mean": ("NUMBER", "REAL"),
+    "weighted_rating": ("NUMBER", "REAL"),
+    "high_rating_lower_bound": ("NUMBER", "REAL"),
+    "type_percentile": ("NUMBER", "REAL"),
+}
+# A ratings table created without the primary key (ratings_primary_key=False)
+# gets its own user_id index instead
+USER_ID_INDEXES = {"ratings_user_id_idx": ("ratings", "user_id")}
+# Redundant once ratings has its primary key; create_schema drops them from
+# databases created by earlier versions
+OBSOLETE_INDEXES = ("ratings_user_id_idx",)
+
+def _dialect(connection):
+    """SQL dialect of a connection; the SQLite stand-in reports 'sqlite'"""
+    return getattr(connection, "dialect", "oracle")
+
+def table_ddl(dialect="oracle", ratings_primary_key=True, partitions=None):
+    """CREATE TABLE statements for anime and ratings.
+
+    ``partitions`` hash-partitions ratings by user_id (Oracle only).
+    """
+    if dialect == "sqlite":
+        ranking = "".join(f",\n                {name} {types[1]}" for name, types in RANKING_COLUMN_TYPES.items())
+        anime = f"""
+            CREATE TABLE IF NOT EXISTS anime (
+                anime_id INTEGER PRIMARY KEY,
+                name TEXT,
+                genre TEXT,
+                type TEXT,
+                episodes REAL,
+                rating REAL,
+                members REAL{ranking}
+            )
+        """
+        ratings_pk = ", PRIMARY KEY (user_id, anime_id)" if ratings_primary_key else ""
+        ratings = f"""
+            CREATE TABLE IF NOT EXISTS ratings (
+                user_id INTEGER NOT NULL,
+                anime_id INTEGER NOT NULL,
+                rating REAL{ratings_pk}
+            )
+        """
+        version = """
+            CREATE TABLE IF NOT EXISTS data_version (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at TEXT
+            )
+        """
+        return [anime, ratings, version]
+
+    ranking = "".join(f",\n            {name} {types[0]}" for name, types in RANKING_COLUMN_TYPES.items())
+    anime = f"""
+        CREATE TABLE anime (
+            anime_id NUMBER(10) CONSTRAINT anime_pk PRIMARY KEY,
+            name VARCHAR2(255),
+            genre VARCHAR2(500),
+            type VARCHAR2(50),
+            episodes NUMBER,
+            rating NUMBER(4, 2),
+            members NUMBER{ranking}
+        )
+    """
+    ratings_pk = ",\n            CONSTRAINT ratings_pk PRIMARY KEY (user_id, anime_id)" if ratings_primary_key else ""
+    partition_clause = f"\n        PARTITION BY HASH (user_id) PARTITIONS {int(partitions)}" if partitions else ""
+    ratings = f"""
+        CREATE TABLE ratings (
+            user_id NUMBER(10) NOT NULL,
+            anime_id NUMBER(10) NOT NULL,
+            rating NUMBER(4, 2){ratings_pk}
+        ){partition_clause}
+    """
+    # One row per table, bumped in the same transaction as each load
+    version = """
+        CREATE TABLE data_version (
+            table_name VARCHAR2(30) CONSTRAINT data_version_pk PRIMARY KEY,
+            version NUMBER NOT NULL,
+            updated_at TIMESTAMP
+        )
+    """
+    return [anime, ratings, version]
+
+def bump_data_version(connection, tables):
+    """Increment the data version of tables; commits with the caller's transaction"""
+    cursor = connection.cursor()
+    for table in tables:
+        if _dialect(connection) == "sqlite":
+            cursor.execute("""
+                INSERT INTO data_version (table_name, version, updated_at)
+                VALUES (:1, 1, datetime('now'))
+                ON CONFLICT (table_name) DO UPDATE
+                SET version = version + 1, updated_at = datetime('now')
+            """, [table])
+        else:
+            cursor.execute("""
+                MERGE INTO data_version v
+                USING (SELECT :1 AS table_name FROM dual) s
+                ON (v.table_name = s.table_name)
+                WHEN MATCHED THEN UPDATE SET v.version = v.version + 1, v.updated_at = SYSTIMESTAMP
+                WHEN NOT MATCHED THEN INSERT (table_name, version, updated_at)
+                    VALUES (s.table_name, 1, SYSTIMESTAMP)
+            """, [table])
+
+def read_data_versions(connection):
+    """Return {table_name: version}; empty if the schema predates data_version"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT table_name, version FROM data_version")
+        return {str(name).lower(): int(version) for name, version in cursor.fetchall()}
+    except Exception:
+        return {}
+    finally:
+        cursor.close()
+
+def secondary_indexes(ratings_primary_key=True):
+    """Secondary indexes {name: (table, column)} for a schema with or without the ratings primary key"""
+    return SECONDARY_INDEXES if ratings_primary_key else dict(SECONDARY_INDEXES, **USER_ID_INDEXES)
+
+def index_ddl(name, dialect="oracle", partitioned=False):
+    """CREATE INDEX statement for one of the SECONDARY_INDEXES or USER_ID_INDEXES"""
+    table, column = secondary_indexes(ratings_primary_key=False)[name]
+    if dialect == "sqlite":
+        return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"
+    # Local indexes keep each ratings partition independently maintainable
+    local = " LOCAL" if partitioned and table == "ratings" else ""
+    return f"CREATE INDEX {name} ON {table} ({column}){local}"
+
+def execute_ignoring_exists(cursor, sql):
+    """Run DDL; returns False if the object already exists (ORA-00955)"""
+    try:
+        cursor.execute(sql)
+        return True
+    except Exception as e:
+        if "ORA-00955" in str(e) or "already exists" in str(e):
+            return False
+        raise
+
+def table_columns(cursor, dialect, table):
+    """Lower-case column names of an existing table"""
+    if dialect == "sqlite":
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {str(row[1]).lower() for row in cursor.fetchall()}
+    cursor.execute("SELECT column_name FROM user_tab_columns WHERE table_name = UPPER(:1)", [table])
+    return {str(row[0]).lower() for row in cursor.fetchall()}
+
+def add_ranking_columns(cursor, dialect):
+    """Add RANKING_COLUMN_TYPES to an anime table created before they existed"""
+    missing = [name for name in RANKING_COLUMN_TYPES if name not in table_columns(cursor, dialect, "anime")]
+    for name in missing:
+        column_type = RANKING_COLUMN_TYPES[name][1 if dialect == "sqlite" else 0]
+        cursor.execute(f"ALTER TABLE anime ADD {name} {column_type}")
+    if missing:
+        logging.info(f"Added ranking columns to anime: {missing}")
+
+def create_schema(connection, ratings_primary_key=True, partitions=None, indexes=True):
+    """Create the tables (and secondary indexes) if they do not exist"""
+    dialect = _dialect(connection)
+    cursor = connection.cursor()
+    for ddl in table_ddl(dialect, ratings_primary_key, partitions):
+        execute_ignoring_exists(cursor, ddl)
+    add_ranking_columns(cursor, dialect)
+    # An existing ratings table keeps the key it was created with
+    keyed = has_primary_key(cursor, dialect, "ratings")
+    if keyed:
+        for name in OBSOLETE_INDEXES:
+            if index_exists(cursor, dialect, name):
+                cursor.execute(f"DROP INDEX {name}")
+                logging.info(f"Dropped obsolete index {name}")
+    if indexes:
+        create_secondary_indexes(connection, partitioned=bool(partitions), ratings_primary_key=keyed)
+    connection.commit()
+    logging.info(f"Schema ready ({dialect}, partitions={partitions or 'none'})")
+
+def create_secondary_indexes(connection, partitioned=False, ratings_primary_key=True):
+    """Create any missing secondary indexes; returns seconds per index"""
+    dialect = _dialect(connection)
+    cursor = connection.cursor()
+    timings = {}
+    for name in secondary_indexes(ratings_primary_key):
+        start = time.perf_counter()
+        execute_ignoring_exists(cursor, index_ddl(name, dialect, partitioned))
+        timings[name] = round(time.perf_counter() - start, 3)
+    return timings
+
+def has_primary_key(cursor, dialect, table):
+    """Whether an existing table has a primary key"""
+    if dialect == "sqlite":
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[5] for row in cursor.fetchall())
+    cursor.execute("SELECT 1 FROM user_constraints WHERE table_name = UPPER(:1) AND constraint_type = 'P'",
+                   [table])
+    return cursor.fetchone() is not None
+
+def index_exists(cursor, dialect, name):
+    """Whether an index of this name exists in the current schema"""
+    if dialect == "sqlite":
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :1", [name])
+    else:
+        cursor.execute("SELECT 1 FROM user_indexes WHERE index_name = UPPER(:1)", [name])
+    return cursor.fetchone() is not None
+
+def _drop_index(cursor, dialect, name):
+    """Drop an index if it exists"""
+    try:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}" if dialect == "sqlite" else f"DROP INDEX {name}")
+    except Exception as e:
+        if "ORA-01418" not in str(e):  # index does not exist
+            raise
+
+def drop_secondary_indexes(connection):
+    """Drop the secondary indexes (primary keys are kept)"""
+    dialect = _dialect(connection)
+    cursor = connection.cursor()
+    for name in SECONDARY_INDEXES:
+        _drop_index(cursor, dialect, name)
+
+def disable_secondary_indexes(connection):
+    """Mark secondary indexes UNUSABLE so DML skips maintaining them (Oracle)"""
+    cursor = connection.cursor()
+    cursor.execute("ALTER SESSION SET skip_unusable_indexes = TRUE")
+    for name in SECONDARY_INDEXES:
+        cursor.execute(f"ALTER INDEX {name} UNUSABLE")
+
+def rebuild_secondary_indexes(connection, strategy="drop", partitioned=False):
+    """Bring secondary indexes back after a bulk load; returns seconds per index"""
+    if strategy == "unusable" and _dialect(connection) == "oracle":
+        cursor = connection.cursor()
+        timings = {}
+        for name in SECONDARY_INDEXES:
+            start = time.perf_counter()
+            if partitioned and SECONDARY_INDEXES[name][0] == "ratings":
+                cursor.execute("SELECT partition_name FROM user_ind_partitions "
+                               "WHERE index_name = UPPER(:1)", [name])
+                for (partition_name,) in cursor.fetchall():
+                    cursor.execute(f"ALTER INDEX {name} REBUILD PARTITION {partition_name}")
+            else:
+                cursor.execute(f"ALTER INDEX {name} REBUILD")
+            timings[name] = round(time.perf_counter() - start, 3)
+        return timings
+    return create_secondary_indexes(connection, partitioned)
+
+def bulk_load(connection, load_fn, strategy="drop", partitioned=False):
+    """Run load_fn with secondary indexes dropped/disabled, then rebuild them.
+
+    ``strategy`` is 'drop' (any dialect), 'unusable' (Oracle) or 'keep'.
+    Returns the seconds spent in each phase.
+    """
+    if strategy == "unusable" and _dialect(connection) != "oracle":
+        strategy = "drop"
+    timings = {}
+
+    start = time.perf_counter()
+    if strategy == "drop":
+        drop_secondary_indexes(connection)
+    elif strategy == "unusable":
+        disable_secondary_indexes(connection)
+    timings["disable_indexes"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    try:
+        load_fn()
+    finally:
+        timings["load"] = round(time.perf_counter() - start, 3)
+        start = time.perf_counter()
+        if strategy != "keep":
+            timings["rebuild_per_index"] = rebuild_secondary_indexes(connection, strategy, partitioned)
+        timings["rebuild_indexes"] = round(time.perf_counter() - start, 3)
+    return timings
@@ -0,0 +1,146 @@
+# Shard_Input.py - Parallel ingestion of sharded, compressed CSV inputs
+import os
+import glob
+import time
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pandas as pd
+
+import CSV_Reader
+
+# Extensions pyarrow can decompress while streaming (compression="detect")
+SHARD_EXTENSIONS = (".csv", ".csv.gz", ".csv.zst", ".csv.bz2", ".csv.lz4")
+
+def discover_shards(source):
+    """Resolve a file, directory or glob into a sorted list of shard paths"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    elif any(ch in source for ch in "*?["):
+        paths = glob.glob(source)
+    else:
+        paths = [source]
+    shards = sorted(p for p in paths if os.path.isfile(p) and p.endswith(SHARD_EXTENSIONS))
+    if not shards:
+        raise FileNotFoundError(f"No CSV shards found for {source}")
+    return shards
+
+def is_sharded(source):
+    """True if source needs the shard reader rather than a plain CSV read"""
+    return (os.path.isdir(source) or any(ch in source for ch in "*?[")
+            or not source.endswith(".csv"))
+
+def _parse_shard(index, path, out_dir, column_types, block_size, chunk_filter):
+    """Worker: stream-decompress and parse one shard into an Arrow IPC file"""
+    start = time.perf_counter()
+    column_types = column_types or CSV_Reader.column_types_for(path)
+    # One thread per worker; parallelism comes from the process pool
+    read_options, convert_options = CSV_Reader.arrow_options(column_types, False, block_size)
+    stream = pa.input_stream(path, compression="detect")
+    reader = pacsv.open_csv(stream, read_options=read_options, convert_options=convert_options)
+
+    out_path = os.path.join(out_dir, f"{index:06d}.arrow")
+    rows_in = rows_out = 0
+    writer = None
+    try:
+        for batch in reader:
+            rows_in += batch.num_rows
+            if chunk_filter is not None:
+                df = chunk_filter(batch.to_pandas())
+                batch = pa.RecordBatch.from_pandas(df, schema=batch.schema, preserve_index=False)
+            if writer is None:
+                writer = pa.ipc.new_file(out_path, batch.schema)
+            writer.write_batch(batch)
+            rows_out += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+        stream.close()
+
+    return {
+        "index": index,
+        "shard": path,
+        "output": out_path if writer is not None else None,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def read_shards(source, workers=None, column_types=None, block_size=CSV_Reader.DEFAULT_BLOCK_SIZE,
+                chunk_filter=None):
+    """Read every shard of source into one DataFrame, in shard-name order.
+
+    Shards are decompressed and parsed in ``workers`` processes. Each worker
+    streams its shard block by block, applies ``chunk_filter`` (a picklable
+    DataFrame -> DataFrame function) and spills the result to an Arrow IPC
+    file, so worker memory stays bounded by the block size.
+    Returns (DataFrame, per-shard stats).
+    """
+    shards = discover_shards(source)
+    workers = workers or min(len(shards), os.cpu_count() or 1)
+    out_dir = tempfile.mkdtemp(prefix="anime_shards_")
+    logging.info(f"Reading {len(shards)} shards from {source} with {workers} workers")
+
+    start = time.perf_counter()
+    results = [None] * len(shards)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_parse_shard, i, path, out_dir, column_types,
+                                       block_size, chunk_filter)
+                       for i, path in enumerate(shards)]
+            for done, future in enumerate(as_completed(futures), 1):
+                stats = future.result()
+                results[stats["index"]] = stats
+                logging.info(f"Shard {done}/{len(shards)} {os.path.basename(stats['shard'])}: "
+                             f"{stats['rows_out']:,}/{stats['rows_in']:,} rows, "
+                             f"{stats['bytes'] / (1024 * 1024):.1f} MB in {stats['seconds']}s")
+
+        # Merge in shard order so the output does not depend on scheduling.
+        # Read (not memory-map) so the temp files can be removed on Windows.
+        tables = []
+        for r in results:
+            if r["output"] is not None:
+                with pa.OSFile(r["output"], "rb") as f:
+                    tables.append(pa.ipc.open_file(f).read_all())
+        if tables:
+            df = pa.concat_tables(tables).to_pandas(split_blocks=True)
+        else:
+            df = pd.DataFrame()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    total_rows = sum(r["rows_out"] for r in results)
+    logging.info(f"Read {total_rows:,} rows from {len(shards)} shards "
+                 f"in {time.perf_counter() - start:.2f}s")
+    return df, results
+
+def iter_shard_chunks(source, column_types=None, block_size=CSV_Reader.DEFAULT_BLOCK_SIZE):
+    """Yield (shard_path, DataFrame) blocks from every shard in order.
+
+    Single-process streaming counterpart of read_shards: only one parsed
+    block is held at a time, whatever the total input size.
+    """
+    for path in discover_shards(source):
+        start = time.perf_counter()
+        types = column_types or CSV_Reader.column_types_for(path)
+        read_options, convert_options = CSV_Reader.arrow_options(types, True, block_size)
+        rows = 0
+        with pa.input_stream(path, compression="detect") as stream:
+            reader = pacsv.open_csv(stream, read_options=read_options, convert_options=convert_options)
+            for batch in reader:
+                rows += batch.num_rows
+                yield path, batch.to_pandas()
+        logging.info(f"Shard {os.path.basename(path)}: {rows:,} rows streamed "
+                     f"in {time.perf_counter() - start:.2f}s")
+
+def iter_chunks(source, block_size=CSV_Reader.DEFAULT_BLOCK_SIZE):
+    """Yield DataFrame blocks from a plain CSV or a set of shards"""
+    if is_sharded(source):
+        for _, chunk in iter_shard_chunks(source, block_size=block_size):
+            yield chunk
+    else:
+        yield from CSV_Reader.open_csv(source, engine="arrow", block_size=block_size)
@@ -0,0 +1,270 @@
+# Similarity.py - MinHash/LSH index over anime genre sets and audiences (rater sets)
+import logging
+import numpy as np
+import pandas as pd
+
+import Output_Writer
+import Dedup
+import Sampling
+import User_Profiles
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+INDEX_KINDS = ("genre", "audience")
+# b bands of r rows make pairs near Jaccard (1/b) ** (1/r) collide half the time: 0.5 for
+# genres (16 x 4; looser would pull in most anime sharing one common genre) and 0.18 for
+# audiences (32 x 2), whose overlaps are much lower
+KIND_BANDS = {"genre": 16, "audience": 32}
+
+def lsh_threshold(num_perm, bands):
+    """Jaccard at which a pair shares a bucket about half the time"""
+    return (1 / bands) ** (bands / num_perm)
+
+def _gather(indptr, indices, rows):
+    """Elements of the given CSR rows, with the position in ``rows`` each came from"""
+    lengths = indptr[rows + 1] - indptr[rows]
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, indices[np.repeat(indptr[rows], lengths) + offsets]
+
+def _permutations(num_perm, seed):
+    """Multipliers (odd) and offsets of the num_perm hash permutations"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    return a, b
+
+def _group_minima(elements, starts, num_perm, seed):
+    """(groups x num_perm) minimum permuted hash of each run of elements beginning at starts"""
+    hashes = Sampling.mix64(elements, seed)
+    a, b = _permutations(num_perm, seed)
+    minima = np.empty((len(starts), num_perm), dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        for i in range(num_perm):
+            permuted = ((a[i] * hashes + b[i]) >> np.uint64(32)).astype(np.uint32)
+            minima[:, i] = np.minimum.reduceat(permuted, starts)
+    return minima
+
+def minhash_signatures(indptr, indices, num_perm=DEFAULT_NUM_PERM, seed=Sampling.DEFAULT_SEED):
+    """uint32 MinHash signature (rows x num_perm) of each CSR row's set.
+
+    Each element is hashed once (splitmix64); permutation i is the
+    multiply-add a_i * h + b_i mod 2**64, keeping the high 32 bits. Empty
+    sets get all-ones signatures.
+    """
+    rows = len(indptr) - 1
+    signatures = np.full((rows, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    nonempty = np.flatnonzero(np.diff(indptr) > 0)
+    if len(nonempty):
+        signatures[nonempty] = _group_minima(indices, indptr[nonempty], num_perm, seed)
+    return signatures
+
+def band_keys(signatures, bands):
+    """One uint64 bucket key per (row, band), from the band's slice of the signature"""
+    rows_per_band = signatures.shape[1] // bands
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    for band in range(bands):
+        key = np.zeros(len(signatures), dtype=np.uint64)
+        for column in range(band * rows_per_band, (band + 1) * rows_per_band):
+            key = Sampling.mix64((key ^ signatures[:, column].astype(np.uint64)).view(np.int64), band)
+        keys[:, band] = key
+    return keys
+
+class SimilarityIndex:
+    """Banded LSH over MinHash signatures of one set per anime.
+
+    Sets are CSR arrays (indptr, indices) aligned with ``anime_ids``, kept
+    for exact Jaccard re-ranking. An index built from signatures alone
+    (indptr and indices None, set ``sizes`` given) re-ranks by the MinHash
+    estimate instead. Each band is a sorted array of bucket keys with the
+    anime rows in that order, so a query is one binary search per band
+    plus work proportional to the candidates found.
+    """
+
+    def __init__(self, anime_ids, indptr, indices, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 seed=Sampling.DEFAULT_SEED, signatures=None, buckets=None, sizes=None):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        self.num_perm, self.bands, self.seed = num_perm, bands, seed
+        if indptr is None:
+            if signatures is None or sizes is None:
+                raise ValueError("an index without sets needs signatures and sizes")
+            self.indptr = self.indices = None
+            self.sizes = np.asarray(sizes, dtype=np.int64)
+        else:
+            self.indptr = np.asarray(indptr, dtype=np.int64)
+            self.indices = np.asarray(indices, dtype=np.int32)
+            self.sizes = np.diff(self.indptr)
+        if signatures is None:
+            signatures = minhash_signatures(self.indptr, self.indices, num_perm, seed)
+        self.signatures = signatures
+        # Every row's bucket keys, so a query never rehashes its signature
+        self.row_keys = band_keys(signatures, bands)
+        if buckets is None:
+            # Empty sets would all share one bucket; they are never candidates
+            nonempty = np.flatnonzero(self.sizes > 0)
+            keys = self.row_keys[nonempty].T
+            order = np.argsort(keys, axis=1)
+            buckets = (np.take_along_axis(keys, order, axis=1), nonempty[order].astype(np.int32))
+        self.bucket_keys, self.bucket_rows = buckets
+        self._rows = pd.Index(self.anime_ids)
+
+    def __len__(self):
+        return len(self.anime_ids)
+
+    @property
+    def exact(self):
+        """True when the sets are kept, so scores are exact Jaccard"""
+        return self.indptr is not None
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.anime_ids, self.indptr, self.indices, self.sizes,
+                                              self.signatures, self.row_keys, self.bucket_keys,
+                                              self.bucket_rows) if array is not None)
+
+    def row(self, anime_id):
+        row = int(self._rows.get_indexer([anime_id])[0])
+        if row < 0:
+            raise KeyError(f"anime_id {anime_id} is not in the index")
+        return row
+
+    def candidates(self, row):
+        """Rows sharing at least one band bucket with ``row`` (itself excluded)"""
+        if not self.sizes[row]:
+            return np.zeros(0, dtype=np.int64)
+        keys = self.row_keys[row]
+        found = []
+        for band in range(self.bands):
+            low = np.searchsorted(self.bucket_keys[band], keys[band], "left")
+            high = np.searchsorted(self.bucket_keys[band], keys[band], "right")
+            found.append(self.bucket_rows[band, low:high])
+        found = np.unique(np.concatenate(found)).astype(np.int64)
+        return found[found != row]
+
+    def jaccard(self, row, others):
+        """Jaccard similarity of row's set with each of ``others``.
+
+        Exact when the sets are kept; otherwise the share of signature
+        positions that agree, an unbiased estimate with standard error
+        about sqrt(J (1 - J) / num_perm).
+        """
+        if not self.exact:
+            agree = (self.signatures[others] == self.signatures[row]).mean(axis=1)
+            return np.where((self.sizes[others] > 0) & (self.sizes[row] > 0), agree, 0.0)
+        query = self.indices[self.indptr[row]:self.indptr[row + 1]]
+        owner, elements = _gather(self.indptr, self.indices, others)
+        if not len(query):
+            return np.zeros(len(others))
+        positions = np.minimum(np.searchsorted(query, elements), len(query) - 1)
+        shared = np.bincount(owner, weights=query[positions] == elements, minlength=len(others))
+        sizes = self.indptr[others + 1] - self.indptr[others]
+        return shared / (len(query) + sizes - shared)
+
+    def similar(self, anime_id, k=10, min_jaccard=0.0, exact=False):
+        """Up to k most similar anime by Jaccard among the LSH candidates.
+
+        exact=True scores every anime instead: the full O(N) scan LSH avoids.
+        """
+        row = self.row(anime_id)
+        if exact:
+            candidates = np.flatnonzero(np.arange(len(self.anime_ids)) != row)
+        else:
+            candidates = self.candidates(row)
+        scores = self.jaccard(row, candidates)
+        keep = scores >= min_jaccard
+        candidates, scores = candidates[keep], scores[keep]
+        # Highest Jaccard first, ties by anime_id
+        order = np.lexsort((self.anime_ids[candidates], -scores))[:k]
+        return pd.DataFrame({"anime_id": self.anime_ids[candidates[order]], "jaccard": scores[order]})
+
+    def save(self, path):
+        """Write the index as one .npz file, atomically"""
+        def write(tmp_path):
+            sets = {"indptr": self.indptr, "indices": self.indices} if self.exact else {}
+            with open(tmp_path, "wb") as f:
+                np.savez(f, anime_ids=self.anime_ids, sizes=self.sizes, **sets,
+                         signatures=self.signatures, bucket_keys=self.bucket_keys,
+                         bucket_rows=self.bucket_rows,
+                         params=np.array([self.num_perm, self.bands, self.seed], dtype=np.int64))
+        Output_Writer.atomic_write(path, write)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            num_perm, bands, seed = (int(value) for value in data['params'])
+            exact = 'indptr' in data.files
+            return cls(data['anime_ids'], data['indptr'] if exact else None,
+                       data['indices'] if exact else None, num_perm, bands, seed,
+                       signatures=data['signatures'], buckets=(data['bucket_keys'], data['bucket_rows']),
+                       sizes=None if exact else data['sizes'])
+
+def genre_sets(anime_df):
+    """(anime_ids, indptr, indices): each anime's genre codes"""
+    matrix = User_Profiles.GenreMatrix(anime_df)
+    return matrix.anime_ids, matrix.indptr, matrix.indices
+
+def audience_sets(anime_df, ratings_df):
+    """(anime_ids, indptr, indices): the distinct user_ids in ratings_df of each anime"""
+    anime_ids = anime_df['anime_id'].to_numpy(dtype=np.int64)
+    rows = pd.Index(anime_ids).get_indexer(ratings_df['anime_id'].to_numpy(dtype=np.int64))
+    users = ratings_df['user_id'].to_numpy(dtype=np.int64)
+    known = rows >= 0
+    # One sort of packed (row, user) keys groups each anime's users and drops repeats
+    pairs = np.unique(Dedup.pack_keys(rows[known], users[known]))
+    indptr = np.r_[0, np.cumsum(np.bincount(pairs >> np.int64(32), minlength=len(anime_ids)))]
+    return anime_ids, indptr, (pairs & np.int64(0xFFFFFFFF)).astype(np.int32)
+
+class AudienceSignatures:
+    """MinHash signatures of each anime's audience, accumulated over streamed chunks.
+
+    A signature is a running minimum, so a repeated (user, anime) pair
+    changes nothing and memory is anime x num_perm however many ratings
+    arrive; the sets themselves are not kept (see SimilarityIndex).
+    Ratings of unknown anime are ignored.
+    """
+
+    def __init__(self, anime_df, num_perm=DEFAULT_NUM_PERM, seed=Sampling.DEFAULT_SEED):
+        self.anime_ids = anime_df['anime_id'].to_numpy(dtype=np.int64)
+        self.num_perm, self.seed = num_perm, seed
+        self._rows = pd.Index(self.anime_ids)
+        self.signatures = np.full((len(self.anime_ids), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        self.sizes = np.zeros(len(self.anime_ids), dtype=np.int64)
+
+    def add(self, ratings_df):
+        rows = self._rows.get_indexer(ratings_df['anime_id'].to_numpy(dtype=np.int64))
+        users = ratings_df['user_id'].to_numpy(dtype=np.int64)
+        known = rows >= 0
+        rows, users = rows[known], users[known]
+        if not len(rows):
+            return
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        present = rows[starts]
+        # The same element hash as audience_sets, so both paths agree on signatures
+        minima = _group_minima(users[order].astype(np.int32), starts, self.num_perm, self.seed)
+        self.signatures[present] = np.minimum(self.signatures[present], minima)
+        self.sizes += np.bincount(rows, minlength=len(self.sizes))
+
+    def result(self, bands=None):
+        index = SimilarityIndex(self.anime_ids, None, None, self.num_perm, bands or KIND_BANDS["audience"],
+                                self.seed, signatures=self.signatures, sizes=self.sizes)
+        logging.info(f"Similarity index (audience, streamed): {len(index)} anime, "
+                     f"{index.nbytes / 1024 ** 2:.1f} MB")
+        return index
+
+def build_index(kind, anime_df, ratings_df=None, num_perm=DEFAULT_NUM_PERM, bands=None):
+    """SimilarityIndex of the given kind: "genre" or "audience" (needs ratings_df)"""
+    if kind == "genre":
+        sets = genre_sets(anime_df)
+    elif kind == "audience":
+        sets = audience_sets(anime_df, ratings_df)
+    else:
+        raise ValueError(f"kind must be one of {INDEX_KINDS}, got {kind!r}")
+    index = SimilarityIndex(*sets, num_perm=num_perm, bands=bands or KIND_BANDS[kind])
+    logging.info(f"Similarity index ({kind}): {len(index)} anime, {len(index.indices)} set elements, "
+                 f"{index.nbytes / 1024 ** 2:.1f} MB")
+    return index
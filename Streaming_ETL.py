@@ -0,0 +1,386 @@
+# Streaming_ETL.py - Overlapped extract -> transform -> load with bounded queues
+import os
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import Shard_Input
+from ETL_Pipeline import LocalStorageManager, transform_anime, transform_ratings, drop_unrated
+import CSV_Reader
+import Output_Writer
+import Log_Setup
+import Validation
+import Integrity
+import Dedup
+import Ranking
+import User_Profiles
+import Similarity
+import Dashboard_Data
+
+_DONE = object()
+
+# Output columns of transform_ratings, typed up front so the parquet schema never
+# depends on which chunk arrives first (an empty chunk would type rating_date as null)
+RATINGS_SCHEMA = pa.schema(
+    [(name, pa.type_for_alias(t)) for name, t in CSV_Reader.COLUMN_TYPES["rating.csv"].items()]
+    + [("is_high_rating", pa.bool_()), ("rating_date", pa.date32())])
+
+class StageStats:
+    """Rows, chunks and busy/wait time for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.chunks = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "rows_per_second": round(self.rows / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+class RatingsAccumulator:
+    """Running quality-report aggregates over streamed ratings chunks.
+
+    Memory is bounded by the number of distinct users/anime, not by rows.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.rating_sum = 0.0
+        self.rating_counts = np.zeros(11, dtype=np.int64)
+        self.users = set()
+        self.anime = set()
+
+    def update(self, chunk):
+        ratings = chunk['rating'].to_numpy()
+        self.records += len(chunk)
+        self.rating_sum += float(ratings.sum())
+        self.rating_counts += np.bincount(np.clip(ratings, 0, 10).astype(np.int64), minlength=11)
+        self.users.update(np.unique(chunk['user_id'].to_numpy()).tolist())
+        self.anime.update(np.unique(chunk['anime_id'].to_numpy()).tolist())
+
+    def ratings_summary(self):
+        distribution = {rating: int(count) for rating, count in enumerate(self.rating_counts) if count}
+        top = dict(sorted(distribution.items(), key=lambda item: item[1], reverse=True)[:10])
+        return {
+            "total_records": self.records,
+            "unique_users": len(self.users),
+            "unique_anime": len(self.anime),
+            "rating_distribution": top,
+        }
+
+    @property
+    def mean(self):
+        return self.rating_sum / self.records if self.records else float("nan")
+
+def _put(q, item, stats):
+    start = time.perf_counter()
+    q.put(item)
+    stats.wait_seconds += time.perf_counter() - start
+
+def _get(q, stats):
+    start = time.perf_counter()
+    item = q.get()
+    stats.wait_seconds += time.perf_counter() - start
+    return item
+
+def stream_ratings(source, output_path, block_size=8 * 1024 * 1024, queue_size=4,
+                   compression="snappy", quarantine_path=None, rules=None, keep=Dedup.DEFAULT_KEEP,
+                   totals=None, profiles=None, audiences=None, bins=None):
+    """Stream ratings through reader, transformer and writer threads.
+
+    Stages are connected by queues of at most ``queue_size`` chunks, so
+    memory stays at roughly (2 * queue_size + 3) blocks regardless of input
+    size. The writer appends one parquet row group per chunk; rows failing
+    ``rules`` (default Validation.RATINGS_RULES), and (user_id, anime_id)
+    pairs already seen in any earlier chunk, go to ``quarantine_path``
+    instead. Written chunks are also added to ``totals`` (Ranking.RatingTotals),
+    ``profiles`` (User_Profiles.ProfileAccumulator), ``audiences``
+    (Similarity.AudienceSignatures) and ``bins`` (Dashboard_Data.RatingBins)
+    when given.
+    Returns (per-stage stats, RatingsAccumulator, QuarantineWriter).
+    """
+    rules = rules or Validation.RATINGS_RULES
+    deduper = Dedup.StreamingDeduper(keep)
+    raw_q = queue.Queue(maxsize=queue_size)
+    clean_q = queue.Queue(maxsize=queue_size)
+    stats = {name: StageStats(name) for name in ("read", "transform", "write")}
+    accumulator = RatingsAccumulator()
+    quarantine = Validation.QuarantineWriter(
+        quarantine_path or os.path.join(os.path.dirname(output_path), "ratings_quarantine.parquet"))
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        stage = stats["read"]
+        try:
+            chunks = Shard_Input.iter_chunks(source, block_size)
+            while not stop.is_set():
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                stage.busy_seconds += time.perf_counter() - start
+                if chunk is None:
+                    break
+                stage.rows += len(chunk)
+                stage.chunks += 1
+                _put(raw_q, chunk, stage)
+        except Exception as e:
+            errors.append(("read", e))
+            stop.set()
+        finally:
+            raw_q.put(_DONE)
+
+    def transformer():
+        stage = stats["transform"]
+        try:
+            while True:
+                chunk = _get(raw_q, stage)
+                if chunk is _DONE:
+                    break
+                if stop.is_set():
+                    continue  # drain so the reader is never blocked
+                start = time.perf_counter()
+                valid, rejected = Validation.validate(chunk, rules)
+                valid, duplicates = deduper.dedupe(drop_unrated(valid))
+                if len(duplicates):
+                    rejected = pd.concat([rejected, duplicates])
+                clean = transform_ratings(valid)
+                stage.busy_seconds += time.perf_counter() - start
+                stage.rows += len(clean)
+                stage.chunks += 1
+                _put(clean_q, (clean, rejected), stage)
+        except Exception as e:
+            errors.append(("transform", e))
+            stop.set()
+            while raw_q.get() is not _DONE:
+                pass
+        finally:
+            clean_q.put(_DONE)
+
+    def writer():
+        stage = stats["write"]
+        parquet_writer = None
+        try:
+            # Opened before the first chunk, so an input with no surviving rows
+            # still produces a valid (empty) file
+            parquet_writer = pq.ParquetWriter(output_path, RATINGS_SCHEMA, compression=compression)
+            while True:
+                item = _get(clean_q, stage)
+                if item is _DONE:
+                    break
+                if stop.is_set():
+                    continue
+                chunk, rejected = item
+                start = time.perf_counter()
+                quarantine.write(rejected)
+                parquet_writer.write_table(pa.Table.from_pandas(
+                    chunk[RATINGS_SCHEMA.names], schema=RATINGS_SCHEMA, preserve_index=False))
+                accumulator.update(chunk)
+                if totals is not None:
+                    totals.add(chunk)
+                if profiles is not None:
+                    profiles.add(chunk)
+                if audiences is not None:
+                    audiences.add(chunk)
+                if bins is not None:
+                    bins.add(chunk)
+                stage.busy_seconds += time.perf_counter() - start
+                stage.rows += len(chunk)
+                stage.chunks += 1
+        except Exception as e:
+            errors.append(("write", e))
+            stop.set()
+            while clean_q.get() is not _DONE:
+                pass
+        finally:
+            if parquet_writer is not None:
+                parquet_writer.close()
+
+    threads = [threading.Thread(target=fn, name=f"etl-{fn.__name__}", daemon=True)
+               for fn in (reader, transformer, writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        stage, error = errors[0]
+        quarantine.close(keep=False)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise RuntimeError(f"Streaming {stage} stage failed: {error}") from error
+    return stats, accumulator, quarantine
+
+def _write_similarity_index(storage, kind, anime_df, audiences):
+    """Build and save one Similarity index; the audience one from the streamed signatures"""
+    if kind == "audience":
+        index = audiences.result()
+    else:
+        index = Similarity.build_index(kind, anime_df)
+    return storage.save_index(index, f"similar_{kind}.npz", "features")
+
+def run_streaming(ratings_source='rating.csv', storage=None, block_size=8 * 1024 * 1024, queue_size=4,
+                  key_filter="exact", keep=Dedup.DEFAULT_KEEP):
+    """Streaming ETL: anime in memory (small), ratings through bounded queues.
+
+    Ratings referencing an anime_id outside the valid anime are quarantined;
+    ``key_filter`` picks the exact sorted key array or a Bloom filter.
+    Repeated (user_id, anime_id) ratings are dropped across chunk
+    boundaries; only keep="first" can be applied in one pass. Besides the
+    queues, state grows only with distinct keys: 8 bytes per (user_id,
+    anime_id) pair for dedup and one profile row per user. The audience
+    index keeps MinHash signatures, not sets (Similarity.AudienceSignatures).
+    Like ETL_Pipeline.load_local, returns {"success": False, "error": ...}
+    when an artifact failed and the run manifest was not published.
+    """
+    if keep not in Dedup.STREAMING_KEEP_POLICIES:
+        raise ValueError(f"Streaming dedup supports keep={Dedup.STREAMING_KEEP_POLICIES}, got {keep!r}")
+    storage = storage or LocalStorageManager(base_path="local_storage")
+    start = time.perf_counter()
+    logging.info(f"STREAM: Processing {ratings_source} with queue size {queue_size}")
+
+    anime_df = CSV_Reader.read_csv('anime.csv')
+    anime_valid, anime_quarantine = Validation.validate(anime_df, Validation.ANIME_RULES)
+    anime_clean = transform_anime(anime_valid)
+    anime_keys = Integrity.anime_keys(anime_valid['anime_id'], key_filter)
+    totals = Ranking.RatingTotals(anime_clean['anime_id'])
+    profiles = User_Profiles.ProfileAccumulator(anime_clean)
+    audiences = Similarity.AudienceSignatures(anime_clean)
+    bins = Dashboard_Data.RatingBins()
+
+    with Output_Writer.OutputWriter(storage.manifests_path, run_id=Log_Setup.get_run_id()) as writer:
+        if len(anime_quarantine):
+            writer.submit("anime_quarantine", storage.save_dataframe,
+                          anime_quarantine, "anime_quarantine.parquet", "quarantine")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ratings_path = os.path.join(storage.backups_path, f"ratings_transformed_{timestamp}.parquet")
+        quarantine_path = os.path.join(storage.base_path, "quarantine",
+                                       f"ratings_quarantine_{timestamp}.parquet")
+        outcome = []
+        # The parquet file only appears under its final name once complete
+        Output_Writer.atomic_write(ratings_path, lambda tmp: outcome.extend(
+            stream_ratings(ratings_source, tmp, block_size, queue_size, quarantine_path=quarantine_path,
+                           rules=Integrity.ratings_rules(anime_keys), keep=keep, totals=totals,
+                           profiles=profiles, audiences=audiences, bins=bins)))
+        stats, accumulator, quarantine = outcome
+        # Ranking features need every rating, so the anime output follows the stream
+        anime_clean = Ranking.ranking_features(anime_clean, totals)
+        writer.submit("anime", storage.save_dataframe, anime_clean, "anime_transformed.parquet", "backups")
+        writer.submit("user_profiles", storage.save_dataframe,
+                      profiles.result(), "user_profiles.parquet", "features")
+        for kind in Similarity.INDEX_KINDS:
+            writer.submit(f"similar_{kind}", _write_similarity_index,
+                          storage, kind, anime_clean, audiences)
+        Dashboard_Data.write_dashboard_summary(writer, storage, anime_clean, bins,
+                                               stats["write"].rows, len(accumulator.users))
+        if quarantine.close():
+            writer.record("ratings_quarantine", {"status": "success", "path": quarantine_path,
+                                                 "records": quarantine.rows,
+                                                 "size": os.path.getsize(quarantine_path)})
+            logging.warning(f"Quarantined {quarantine.rows} ratings records: {quarantine.by_rule}")
+        similar = [f"similar_{kind}" for kind in Similarity.INDEX_KINDS]
+        written = writer.wait(["anime", "user_profiles"] + similar)
+        anime_result, profiles_result = written["anime"], written["user_profiles"]
+        similarity_results = {kind: written[f"similar_{kind}"] for kind in Similarity.INDEX_KINDS}
+        elapsed = time.perf_counter() - start
+
+        for name, stage in stats.items():
+            s = stage.as_dict()
+            logging.info(f"STREAM {name}: {s['rows']:,} rows in {s['chunks']} chunks, "
+                         f"busy {s['busy_seconds']}s ({s['rows_per_second']:,.0f} rows/s), "
+                         f"waiting {s['wait_seconds']}s",
+                         extra={"event": "stage_end", "stage": f"stream_{name}",
+                                "seconds": s['busy_seconds'], "rows": s['rows']})
+        logging.info(f"STREAM: {stats['read'].rows:,} ratings in {elapsed:.2f}s "
+                     f"({stats['read'].rows / elapsed:,.0f} rows/s end to end)")
+
+        quality_report = {
+            "etl_timestamp": datetime.now().isoformat(),
+            "mode": "streaming",
+            "data_summary": {
+                "anime": {
+                    "total_records": len(anime_clean),
+                    "columns": list(anime_clean.columns),
+                    "missing_values": anime_clean.isnull().sum().to_dict(),
+                    "data_types": anime_clean.dtypes.astype(str).to_dict()
+                },
+                "ratings": accumulator.ratings_summary()
+            },
+            "key_metrics": {
+                "avg_anime_rating": float(anime_clean['rating'].mean()),
+                "avg_user_rating": accumulator.mean,
+                "total_members_sum": int(anime_clean['members'].sum()),
+                "high_rated_anime": int((anime_clean['rating'] >= 8).sum())
+            },
+            "stage_throughput": {name: stage.as_dict() for name, stage in stats.items()},
+            "validation": {"anime": Validation.summarize(anime_quarantine),
+                           "ratings": quarantine.summary()},
+            "integrity": dict(Integrity.orphan_summary(None, anime_keys),
+                              orphan_ratings=quarantine.by_rule.get(Integrity.ORPHAN_RULE, 0))
+        }
+        report_future = writer.submit("quality_report", storage.save_json,
+                                      quality_report, "quality_report.json", "reports")
+
+        ratings_result = {
+            "status": "success",
+            "path": ratings_path,
+            "records": stats["write"].rows,
+            "size": os.path.getsize(ratings_path)
+        }
+        writer.record("ratings", ratings_result)
+        report_result = report_future.result()
+        summary = {
+            "extraction": {
+                "timestamp": datetime.now().isoformat(),
+                "mode": "streaming",
+                "anime_records": len(anime_clean),
+                "ratings_records": stats["read"].rows,
+                "unique_anime": anime_clean['anime_id'].nunique(),
+                "unique_users": len(accumulator.users)
+            },
+            "transformations": {
+                "anime_columns_added": ["popularity_score", "etl_processed_date"] + Ranking.RANKING_COLUMNS,
+                "ratings_columns_added": ["is_high_rating", "rating_date"],
+                "invalid_ratings_removed": stats["read"].rows - stats["transform"].rows,
+                "rows_quarantined": {"anime": len(anime_quarantine), "ratings": quarantine.rows}
+            },
+            "storage": {
+                "anime_backup": anime_result,
+                "ratings_backup": ratings_result,
+                "user_profiles": profiles_result,
+                "similarity_indexes": similarity_results,
+                "quality_report": report_result
+            },
+            "elapsed_seconds": round(elapsed, 3)
+        }
+        summary_result = writer.submit("summary", storage.save_json,
+                                       summary, "etl_summary.json", "summaries").result()
+        manifest_result = writer.publish({"mode": "streaming"})
+
+    if manifest_result["status"] != "success":
+        return {"success": False, "error": manifest_result["error"]}
+
+    return {
+        "success": True,
+        "anime_records": len(anime_clean),
+        "ratings_read": stats["read"].rows,
+        "ratings_written": stats["write"].rows,
+        "stages": {name: stage.as_dict() for name, stage in stats.items()},
+        "backups": {"anime": anime_result, "ratings": ratings_result},
+        "features": {"user_profiles": profiles_result, "similarity_indexes": similarity_results},
+        "reports": {"quality": report_result, "summary": summary_result},
+        "manifest": manifest_result
+    }
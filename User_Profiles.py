@@ -0,0 +1,200 @@
+# User_Profiles.py - Per-user rating and genre-affinity features from a sparse ratings x genre product
+import re
+import logging
+import numpy as np
+import pandas as pd
+
+import Integrity
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # scipy is in requirements.txt; the numpy path is a fallback for the same product
+    sp = None
+
+GENRE_SEPARATOR = ", "
+# Placeholder genre of anime without one; not a genre of its own
+UNKNOWN_GENRE = "Unknown"
+PROFILE_COLUMNS = ["rating_count", "rating_mean", "rating_std"]
+# Ratings expanded per (rating, genre) pair at a time on the numpy path
+EXPANSION_BLOCK = 4_000_000
+
+def genre_column(genre):
+    """Feature column for a genre: "Slice of Life" -> "genre_slice_of_life" """
+    return "genre_" + re.sub(r"[^0-9a-z]+", "_", genre.lower()).strip("_")
+
+class GenreMatrix:
+    """Anime x genre 0/1 indicator matrix in CSR form (indptr, indices).
+
+    Row i is anime_ids[i]; column j is genres[j] (sorted). Anime ids map
+    to rows through a table indexed by id when the id range is compact
+    (as for anime_id), else by binary search; unknown ids map to -1.
+    """
+
+    def __init__(self, anime_df):
+        self.anime_ids = anime_df['anime_id'].to_numpy(dtype=np.int64)
+        lists = anime_df['genre'].fillna("").astype(str).str.split(GENRE_SEPARATOR)
+        # Positional index, so explode() tags each genre with its anime's row
+        lists.index = np.arange(len(anime_df))
+        pairs = lists.explode().str.strip()
+        pairs = pairs[pairs.notna() & (pairs != "") & (pairs != UNKNOWN_GENRE)]
+        genres, codes = np.unique(pairs.to_numpy(dtype=str), return_inverse=True)
+        self.genres = list(genres)
+        positions = pairs.index.to_numpy(dtype=np.int64)
+        order = np.lexsort((codes, positions))
+        positions, codes = positions[order], codes[order]
+        keep = np.r_[True, (positions[1:] != positions[:-1]) | (codes[1:] != codes[:-1])]
+        self.indices = codes[keep].astype(np.int32)
+        self.indptr = np.r_[0, np.cumsum(np.bincount(positions[keep], minlength=len(anime_df)))]
+        self._order = np.argsort(self.anime_ids, kind="stable")
+        self._sorted_ids = self.anime_ids[self._order]
+        self._table = None
+        if len(self.anime_ids):
+            self.low, high = int(self._sorted_ids[0]), int(self._sorted_ids[-1])
+            if high - self.low + 1 <= Integrity.DENSE_SPAN_PER_KEY * len(self.anime_ids):
+                self._table = np.full(high - self.low + 1, -1, dtype=np.int64)
+                # Reversed, so a repeated id keeps its first row
+                self._table[self.anime_ids[::-1] - self.low] = np.arange(len(self.anime_ids))[::-1]
+
+    @property
+    def shape(self):
+        return len(self.anime_ids), len(self.genres)
+
+    def rows(self, anime_ids):
+        """Matrix row of each anime id (-1 when unknown)"""
+        ids = np.asarray(anime_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        if self._table is not None:
+            offsets = ids - self.low
+            inside = (offsets >= 0) & (offsets < len(self._table))
+            return np.where(inside, self._table[np.where(inside, offsets, 0)], -1)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[positions] == ids, self._order[positions], -1)
+
+    def to_sparse(self):
+        return sp.csr_matrix((np.ones(len(self.indices), dtype=np.float64), self.indices, self.indptr),
+                             shape=self.shape)
+
+def _product_numpy(matrix, users, rows, weights, n_users):
+    """(users x anime weights) @ genre matrix by expanding each rating into its genres.
+
+    ``weights`` is a list of per-rating value arrays, None for all ones;
+    returns one dense users x genres array per entry.
+    """
+    genres = len(matrix.genres)
+    out = [np.zeros(n_users * genres, dtype=np.float64) for _ in weights]
+    lengths = matrix.indptr[rows + 1] - matrix.indptr[rows]
+    ends = np.cumsum(lengths)
+    start = 0
+    while start < len(rows):
+        # Cut blocks on rating boundaries so each holds about EXPANSION_BLOCK pairs
+        stop = max(int(np.searchsorted(ends, ends[start] - lengths[start] + EXPANSION_BLOCK, "right")),
+                   start + 1)
+        block_lengths = lengths[start:stop]
+        total = int(block_lengths.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(block_lengths) - block_lengths, block_lengths)
+        genre = matrix.indices[np.repeat(matrix.indptr[rows[start:stop]], block_lengths) + offsets]
+        cell = np.repeat(users[start:stop], block_lengths) * genres + genre
+        for total, values in zip(out, weights):
+            if values is not None:
+                values = np.repeat(values[start:stop], block_lengths)
+            total += np.bincount(cell, weights=values, minlength=n_users * genres)
+        start = stop
+    return [total.reshape(n_users, genres) for total in out]
+
+def _product_scipy(matrix, users, rows, weights, n_users):
+    genre_matrix = matrix.to_sparse()
+    ones = np.ones(len(rows))
+    return [(sp.csr_matrix((ones if values is None else values, (users, rows)),
+                           shape=(n_users, len(matrix.anime_ids))) @ genre_matrix).toarray()
+            for values in weights]
+
+class ProfileAccumulator:
+    """Per-user sufficient statistics, accumulated over a frame or streamed chunks.
+
+    Arrays are indexed by user_id (dense in this dataset) and grow as
+    larger ids arrive. Unrated (-1) ratings and unknown anime are ignored.
+    Genre sums come from one sparse product per chunk of the chunk's
+    ratings (users x anime) with the GenreMatrix.
+    """
+
+    def __init__(self, anime_df, use_scipy=None):
+        self.matrix = GenreMatrix(anime_df)
+        self.use_scipy = (sp is not None) if use_scipy is None else use_scipy
+        if self.use_scipy and sp is None:
+            raise ImportError("scipy is not installed")
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0, dtype=np.float64)
+        self.squares = np.zeros(0, dtype=np.float64)
+        genres = len(self.matrix.genres)
+        self.genre_counts = np.zeros((0, genres), dtype=np.float64)
+        self.genre_sums = np.zeros((0, genres), dtype=np.float64)
+
+    def _grow(self, size):
+        if size <= len(self.counts):
+            return
+        size = max(size, 2 * len(self.counts))
+        extra = size - len(self.counts)
+        self.counts = np.r_[self.counts, np.zeros(extra, dtype=np.int64)]
+        self.sums = np.r_[self.sums, np.zeros(extra)]
+        self.squares = np.r_[self.squares, np.zeros(extra)]
+        self.genre_counts = np.vstack([self.genre_counts, np.zeros((extra, len(self.matrix.genres)))])
+        self.genre_sums = np.vstack([self.genre_sums, np.zeros((extra, len(self.matrix.genres)))])
+
+    def add(self, ratings_df):
+        user_ids = ratings_df['user_id'].to_numpy(dtype=np.int64)
+        ratings = ratings_df['rating'].to_numpy(dtype=np.float64)
+        rows = self.matrix.rows(ratings_df['anime_id'].to_numpy(dtype=np.int64))
+        known = ~np.isnan(ratings) & (ratings != -1) & (rows >= 0) & (user_ids >= 0)
+        user_ids, ratings, rows = user_ids[known], ratings[known], rows[known]
+        if not len(user_ids):
+            return
+        self._grow(int(user_ids.max()) + 1)
+        size = len(self.counts)
+        chunk_counts = np.bincount(user_ids, minlength=size)
+        self.counts += chunk_counts
+        self.sums += np.bincount(user_ids, weights=ratings, minlength=size)
+        self.squares += np.bincount(user_ids, weights=ratings * ratings, minlength=size)
+
+        # The product only spans this chunk's users, renumbered 0..k-1 without a sort
+        present = chunk_counts > 0
+        chunk_users = np.flatnonzero(present)
+        local = (np.cumsum(present) - 1)[user_ids]
+        product = _product_scipy if self.use_scipy else _product_numpy
+        counts, sums = product(self.matrix, local, rows, [None, ratings], len(chunk_users))
+        self.genre_counts[chunk_users] += counts
+        self.genre_sums[chunk_users] += sums
+
+    def result(self):
+        return profile_table(self)
+
+def profile_table(acc):
+    """float32 feature table, one row per user with at least one rating.
+
+    genre_* is the user's genre affinity: the sum of their mean-centred
+    ratings of anime in that genre over their rating count, i.e. row u of
+    (R - mean_u) @ G / n_u. Positive means the genre is rated above the
+    user's own average, weighted by how much of their watching it is.
+    """
+    rated = np.flatnonzero(acc.counts)
+    counts = acc.counts[rated].astype(np.float64)
+    means = acc.sums[rated] / counts
+    variances = np.maximum(acc.squares[rated] / counts - means * means, 0.0)
+    affinity = (acc.genre_sums[rated] - means[:, None] * acc.genre_counts[rated]) / counts[:, None]
+
+    profiles = pd.DataFrame({"user_id": rated.astype(np.int32),
+                             "rating_count": acc.counts[rated].astype(np.int32),
+                             "rating_mean": means.astype(np.float32),
+                             "rating_std": np.sqrt(variances).astype(np.float32)})
+    features = pd.DataFrame(affinity.astype(np.float32),
+                            columns=[genre_column(genre) for genre in acc.matrix.genres])
+    profiles = pd.concat([profiles, features], axis=1)
+    logging.info(f"User profiles: {len(profiles)} users x {len(acc.matrix.genres)} genres "
+                 f"({profiles.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB)")
+    return profiles
+
+def user_profiles(anime_df, ratings_df, use_scipy=None):
+    """Profile table for an in-memory ratings frame"""
+    acc = ProfileAccumulator(anime_df, use_scipy)
+    acc.add(ratings_df)
+    return acc.result()
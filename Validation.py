@@ -0,0 +1,168 @@
+# Validation.py - Declarative, vectorized data-validation rules with quarantine output
+import os
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import Output_Writer
+
+# Column added to quarantined rows: comma-separated names of the rules they failed
+FAILED_COLUMN = "failed_rules"
+ANIME_TYPES = ("TV", "OVA", "Movie", "Special", "ONA", "Music", "Unknown")
+
+class Rule:
+    """A named check; ``check(df)`` returns a boolean mask of rows that pass"""
+
+    def __init__(self, name, check):
+        self.name = name
+        self.check = check
+
+    def __repr__(self):
+        return f"Rule({self.name!r})"
+
+def _numeric(series):
+    # Raw CSV columns may be strings ('Unknown' episodes); those count as missing
+    return pd.to_numeric(series, errors="coerce")
+
+def not_null(column):
+    return Rule(f"{column}_not_null", lambda df: df[column].notna().to_numpy())
+
+def unique(column):
+    """Every value after its first occurrence fails"""
+    return Rule(f"{column}_unique", lambda df: ~df[column].duplicated(keep="first").to_numpy())
+
+def in_range(column, low=None, high=None, also=(), nullable=True, null_values=()):
+    """low <= value <= high, or one of the ``also`` sentinel values.
+
+    With ``nullable``, missing values and the ``null_values`` placeholders
+    pass; anything else that is not a number fails.
+    """
+    def check(df):
+        values = _numeric(df[column]).to_numpy(dtype="float64", na_value=np.nan)
+        ok = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            if low is not None:
+                ok &= values >= low
+            if high is not None:
+                ok &= values <= high
+        if also:
+            ok |= np.isin(values, also)
+        if nullable:
+            ok |= (df[column].isna() | df[column].isin(null_values)).to_numpy(dtype=bool)
+        return ok
+    bounds = f"{'' if low is None else low}..{'' if high is None else high}"
+    return Rule(f"{column}_range[{bounds}]", check)
+
+def allowed_values(column, values, nullable=True):
+    def check(df):
+        ok = df[column].isin(values).to_numpy()
+        if nullable:
+            ok |= df[column].isna().to_numpy()
+        return ok
+    return Rule(f"{column}_allowed", check)
+
+ANIME_RULES = [
+    not_null("anime_id"),
+    unique("anime_id"),
+    allowed_values("type", ANIME_TYPES),
+    in_range("episodes", low=0, null_values=("Unknown",)),
+    in_range("rating", low=0, high=10),
+    in_range("members", low=0),
+]
+
+RATINGS_RULES = [
+    not_null("user_id"),
+    not_null("anime_id"),
+    not_null("rating"),
+    in_range("rating", low=1, high=10, also=(-1,), nullable=False),
+]
+
+def evaluate(df, rules):
+    """Failure bitmask per row: bit i is set when rules[i] fails"""
+    if len(rules) > 63:
+        raise ValueError("At most 63 rules per rule set")
+    failed = np.zeros(len(df), dtype=np.int64)
+    for bit, rule in enumerate(rules):
+        failed |= (~np.asarray(rule.check(df), dtype=bool)).astype(np.int64) << bit
+    return failed
+
+def _rule_names(failed, rules):
+    """Comma-separated rule names for each bitmask, resolved once per distinct mask"""
+    masks, inverse = np.unique(failed, return_inverse=True)
+    names = np.array([",".join(rule.name for bit, rule in enumerate(rules) if mask >> bit & 1)
+                      for mask in masks], dtype=object)
+    return names[inverse]
+
+def validate(df, rules):
+    """Split df into (valid rows, quarantined rows with a failed_rules column)"""
+    failed = evaluate(df, rules)
+    bad = failed != 0
+    quarantine = df[bad].copy()
+    quarantine[FAILED_COLUMN] = _rule_names(failed[bad], rules)
+    return df[~bad], quarantine
+
+def rule_counts(quarantine):
+    """Number of quarantined rows per failed rule"""
+    if quarantine is None or quarantine.empty:
+        return {}
+    counts = quarantine[FAILED_COLUMN].str.split(",").explode().value_counts()
+    return {name: int(count) for name, count in counts.items()}
+
+def summarize(quarantine):
+    """Validation section for the quality report"""
+    return {
+        "rows_quarantined": 0 if quarantine is None else len(quarantine),
+        "by_rule": rule_counts(quarantine),
+    }
+
+class QuarantineWriter:
+    """Append quarantined chunks to one parquet file as they arrive.
+
+    The file is written under a hidden temporary name and renamed into
+    place by close(); nothing is created when no row was quarantined.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.by_rule = {}
+        self._tmp_path = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, quarantine):
+        if quarantine.empty:
+            return
+        table = pa.Table.from_pandas(quarantine, preserve_index=False)
+        if self._writer is None:
+            directory, name = os.path.split(self.path)
+            os.makedirs(directory or ".", exist_ok=True)
+            self._tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+        self.rows += len(quarantine)
+        for rule, count in rule_counts(quarantine).items():
+            self.by_rule[rule] = self.by_rule.get(rule, 0) + count
+
+    def close(self, keep=True):
+        """Publish the file (or discard it with keep=False); returns its path or None"""
+        if self._writer is None:
+            return None
+        self._writer.close()
+        self._writer = None
+        if not keep:
+            os.remove(self._tmp_path)
+            return None
+        with open(self._tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(self._tmp_path, self.path)
+        Output_Writer.fsync_dir(os.path.dirname(self.path) or ".")
+        logging.info(f"Quarantined {self.rows} rows to {self.path}")
+        return self.path
+
+    def summary(self):
+        return {"rows_quarantined": self.rows, "by_rule": dict(self.by_rule)}